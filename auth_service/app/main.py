@@ -1,12 +1,16 @@
 from fastapi import FastAPI, Depends, HTTPException
+from auth_service.app.rpc import install_rpc_server
 from database_sharing_service.app import schemas
-from database_sharing_service.app.config import settings
-from database_sharing_service.app.crud import *
-from database_sharing_service.app.database import get_db
+from database_sharing_service.app.authentication import AuthenticationError, auth_engine
+from database_sharing_service.app.crud import get_user_credentials
+from database_sharing_service.app.database import get_read_db, install_read_routing
+from database_sharing_service.app.health import check_database, check_hash_queue, install_health
 from database_sharing_service.app.logging_config import get_logger
+from database_sharing_service.app.metrics import install_metrics
+from database_sharing_service.app.profiling import install_profiling
+from database_sharing_service.app.responses import FastJSONResponse
+from database_sharing_service.app.tracing import install_tracing
 from sqlalchemy.orm import Session
-from jose import jwt, JWTError
-import uvicorn
 
 auth_app = FastAPI(
     title="Auth Service API",
@@ -18,15 +22,22 @@ auth_app = FastAPI(
             "description": "Operations related to user authentication, such as token generation and validation.",
         },
     ],
+    default_response_class=FastJSONResponse,
 )
 
 logger = get_logger("Auth_Service")
+install_profiling(auth_app)
+install_tracing(auth_app, "auth_service")
+install_metrics(auth_app)
+install_read_routing(auth_app)
+auth_admission = install_health(auth_app, {"database": check_database, "hash_queue": check_hash_queue})
+auth_rpc_server = install_rpc_server(auth_app)
 
 
 @auth_app.post("/generate-token", response_model=schemas.TokenResponse, tags=["Authentication"],
                summary="Generate JWT Token",
                description="Generate a JWT token for the given email.")
-def generate_token(request: schemas.TokenRequest, db: Session = Depends(get_db)):
+def generate_token(request: schemas.TokenRequest, db: Session = Depends(get_read_db)):
     """
     Generate a JWT token for the given email.
 
@@ -37,21 +48,13 @@ def generate_token(request: schemas.TokenRequest, db: Session = Depends(get_db))
     """
 
     # Query the database for a user with the provided email.
-    user = get_user_by_email(db, request.email)
+    user = get_user_credentials(db, request.email)
 
-    # Verify the user's email address and password.
-    if not user:
-        logger.warning(f"Failed login attempt with non-existent email: {request.email}")
-        raise HTTPException(status_code=400, detail="Invalid email or password")
-    if not verify_password(request.password, user.hashed_password):
-        logger.warning(f"Failed login attempt for email: {request.email} with incorrect password")
-        raise HTTPException(status_code=400, detail="Invalid email or password")
-
-    # Generate token.
-    token = generate_auth_token(user.id, user.email, settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-
-    logger.info(f"Token generated for email: {request.email}")
-    return schemas.TokenResponse(access_token=token, token_type="bearer")
+    # Verify the user's email address and password, then generate the token.
+    try:
+        return auth_engine.issue_token(user, request.email, request.password)
+    except AuthenticationError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
 
 
 @auth_app.post("/validate-token", response_model=schemas.TokenData, tags=["Authentication"],
@@ -65,35 +68,13 @@ def validate_token(token: str):
 
     Returns the extracted user information if the token is valid.
     """
-
-    # Define an HTTP exception to be raised if the token validation fails
-    credentials_exception = HTTPException(
-        status_code=401,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
-    # Decode the JWT token using the secret key and algorithm
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        if payload.get("type") != "auth":
-            logger.warning("Token validation failed: Invalid token type for authentication.")
-            raise HTTPException(status_code=400, detail="Invalid credentials")
-        email: str = payload.get("email")
-        if email is None:
-            logger.warning("Token validation failed: missing email in payload.")
-            raise credentials_exception
-        token_data = schemas.TokenData(email=email, id=encrypt_user_id(payload.get("id")))
-    except JWTError as e:
-        logger.error(f"Token validation failed: {str(e)}")
-        raise credentials_exception
-    except Exception as e:
-        logger.error(f"Unexpected error during token validation: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
-
-    logger.info(f"Token validated successfully for email: {email}")
-    return token_data
+        return auth_engine.validate_token(token)
+    except AuthenticationError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("main:auth_app", host="0.0.0.0", port=8002, reload=True)
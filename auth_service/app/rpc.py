@@ -0,0 +1,129 @@
+import asyncio
+import os
+
+from fastapi import FastAPI
+
+from database_sharing_service.app.authentication import AuthenticationError, auth_engine
+from database_sharing_service.app.config import settings
+from database_sharing_service.app.crud import get_user_credentials
+from database_sharing_service.app.database import get_session_router, is_primary_pin_token, primary_pin
+from database_sharing_service.app.logging_config import get_logger
+from database_sharing_service.app.metrics import registry
+from database_sharing_service.app.rpc import RPCProtocolError, encode_frame, parse_address, read_frame
+
+logger = get_logger("Auth_RPC")
+
+rpc_requests = registry.counter("rpc_requests_total", "Internal RPC requests served, by method and status.",
+                                ("method", "status"))
+
+
+def _generate_token(params: dict) -> dict:
+    db = get_session_router().read_session()
+    try:
+        user = get_user_credentials(db, params["email"])
+        return auth_engine.issue_token(user, params["email"], params["password"]).model_dump()
+    finally:
+        db.close()
+
+
+def _validate_token(params: dict) -> dict:
+    return auth_engine.validate_token(params["token"]).model_dump()
+
+
+# method -> (handler, whether it blocks on the database or bcrypt and must run off the event loop)
+METHODS = {
+    "generate_token": (_generate_token, True),
+    "validate_token": (_validate_token, False),
+}
+
+
+def handle_request(request: dict) -> dict:
+    """
+    Run one RPC request and build its response: {"id", "status": 200, "result"} or {"id", "status", "detail"},
+    with the status codes the HTTP endpoints would answer with. Reads go to the primary only when `primary`
+    carries the internal `primary_pin_token`, as with the HTTP pin header.
+    """
+    method = request.get("method")
+    response = {"id": request.get("id")}
+    if method not in METHODS:
+        response.update(status=404, detail=f"Unknown method {method!r}")
+        return response
+    try:
+        with primary_pin(is_primary_pin_token(request.get("primary"))):
+            response.update(status=200, result=METHODS[method][0](request.get("params") or {}))
+    except AuthenticationError as e:
+        response.update(status=e.status_code, detail=e.detail)
+    except (KeyError, TypeError) as e:
+        response.update(status=422, detail=f"Invalid params: {e}")
+    except Exception as e:
+        logger.error(f"RPC {method} failed: {e}")
+        response.update(status=500, detail="Internal Server Error")
+    return response
+
+
+class AuthRPCServer:
+    """
+    Serves `generate_token` and `validate_token` over length-prefixed msgpack frames (see
+    `database_sharing_service.app.rpc`) on a TCP or Unix socket, for the User Service's `RPCAuthClient`.
+
+    Connections are persistent and carry one request at a time; clients get concurrency from several
+    connections. Skips HTTP parsing, routing and pydantic validation, so it is for trusted internal callers only.
+    """
+
+    def __init__(self, address: str):
+        self.address = address
+        self._server = None
+        self._writers = set()
+
+    async def start(self):
+        family, target = parse_address(self.address)
+        if family == "unix":
+            if os.path.exists(target):
+                os.unlink(target)
+            self._server = await asyncio.start_unix_server(self._serve, path=target)
+        else:
+            # reuse_port lets every worker of a multi-worker deployment listen on the same port.
+            self._server = await asyncio.start_server(self._serve, *target, reuse_port=True)
+        logger.info(f"Auth RPC listening on {self.address}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Idle client connections would otherwise keep their handlers waiting for a next request.
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        self._writers.add(writer)
+        try:
+            while (request := await read_frame(reader)) is not None:
+                method = METHODS.get(request.get("method"))
+                if method is not None and method[1]:
+                    response = await loop.run_in_executor(None, handle_request, request)
+                else:
+                    response = handle_request(request)
+                rpc_requests.inc(method=str(request.get("method")), status=str(response["status"]))
+                writer.write(encode_frame(response))
+                await writer.drain()
+        except (RPCProtocolError, ConnectionError) as e:
+            logger.warning(f"Dropping RPC connection: {e}")
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+def install_rpc_server(app: FastAPI):
+    """
+    Serve the internal RPC protocol next to `app` on AUTH_RPC_LISTEN, if set.
+
+    Returns the server, or None when disabled.
+    """
+    if not settings.AUTH_RPC_LISTEN:
+        return None
+    server = AuthRPCServer(settings.AUTH_RPC_LISTEN)
+    app.add_event_handler("startup", server.start)
+    app.add_event_handler("shutdown", server.stop)
+    return server
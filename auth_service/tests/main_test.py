@@ -17,7 +17,7 @@ mock_user = models.User(id=1, email="test@example.com", user_name="string",
 
 
 def test_generate_token_success(mocker):
-    mock_get_user_by_email = mocker.patch("auth_service.app.main.get_user_by_email", return_value=mock_user)
+    mock_get_user_by_email = mocker.patch("auth_service.app.main.get_user_credentials", return_value=mock_user)
     response = client.post(
         "/generate-token",
         json={"email": mock_user.email, "password": mock_password}
@@ -32,7 +32,7 @@ def test_generate_token_success(mocker):
 
 
 def test_generate_token_invalid_email(mocker):
-    mock_get_user_by_email = mocker.patch("auth_service.app.main.get_user_by_email", return_value=None)
+    mock_get_user_by_email = mocker.patch("auth_service.app.main.get_user_credentials", return_value=None)
     response = client.post(
         "/generate-token",
         json={"email": "wrong_email", "password": mock_password}
@@ -45,7 +45,7 @@ def test_generate_token_invalid_email(mocker):
 
 
 def test_generate_token_invalid_password(mocker):
-    mock_get_user_by_email = mocker.patch("auth_service.app.main.get_user_by_email", return_value=mock_user)
+    mock_get_user_by_email = mocker.patch("auth_service.app.main.get_user_credentials", return_value=mock_user)
     response = client.post(
         "/generate-token",
         json={"email": mock_user.email, "password": "123456789"}
@@ -78,6 +78,15 @@ def test_validate_token_invalid():
     assert response.json() == {"detail": "Could not validate credentials"}
 
 
+def test_validate_token_of_another_type():
+    response = client.post(
+        "/validate-token",
+        params={"token": generate_active_token(mock_user.email, settings.ACCESS_TOKEN_EXPIRE_MINUTES)}
+    )
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid credentials"}
+
+
 def test_validate_token_expired():
     mock_token = generate_auth_token(mock_user.email, mock_user.id, -1)
 
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from auth_service.app import rpc
+from auth_service.app.rpc import handle_request
+from database_sharing_service.app import models
+from database_sharing_service.app.crud import generate_auth_token, hash_password
+from database_sharing_service.app.database import Base, SessionRouter, primary_pin_token, reads_pinned_to_primary
+from database_sharing_service.app.rpc import parse_address
+
+mock_password = "123456"
+
+
+@pytest.fixture
+def users(mocker, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'auth.db'}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        db.add(models.User(email="test@example.com", user_name="string", hashed_password=hash_password(mock_password)))
+        db.commit()
+    mocker.patch("auth_service.app.rpc.get_session_router", return_value=SessionRouter(session_factory))
+
+
+def test_generate_token_answers_like_the_http_endpoint(users):
+    response = handle_request({"id": 1, "method": "generate_token",
+                               "params": {"email": "test@example.com", "password": mock_password}})
+
+    assert response["id"] == 1
+    assert response["status"] == 200
+    assert response["result"]["token_type"] == "bearer"
+
+    rejected = handle_request({"id": 2, "method": "generate_token",
+                               "params": {"email": "test@example.com", "password": "wrong"}})
+    assert rejected == {"id": 2, "status": 400, "detail": "Invalid email or password"}
+
+
+def test_validate_token():
+    token = generate_auth_token(7, "test@example.com", 5)
+
+    response = handle_request({"id": 3, "method": "validate_token", "params": {"token": token}})
+
+    assert response["status"] == 200
+    assert response["result"]["email"] == "test@example.com"
+    assert handle_request({"id": 4, "method": "validate_token", "params": {"token": "invalid"}})["status"] == 401
+
+
+def test_reads_are_pinned_to_the_primary_only_with_the_internal_token(mocker):
+    mocker.patch.dict(rpc.METHODS, {"pinned": (lambda params: reads_pinned_to_primary(), False)})
+
+    assert handle_request({"id": 7, "method": "pinned", "primary": primary_pin_token()})["result"] is True
+    for forged in (True, 1, "1", None):
+        assert handle_request({"id": 8, "method": "pinned", "primary": forged})["result"] is False
+
+
+def test_unknown_methods_and_missing_params_are_rejected():
+    assert handle_request({"id": 5, "method": "drop_tables"})["status"] == 404
+    assert handle_request({"id": 6, "method": "validate_token", "params": {}})["status"] == 422
+
+
+def test_parse_address():
+    assert parse_address("unix:/run/auth.sock") == ("unix", "/run/auth.sock")
+    assert parse_address("auth_service:8012") == ("tcp", ("auth_service", 8012))
+    with pytest.raises(ValueError):
+        parse_address("auth_service")
@@ -0,0 +1,108 @@
+"""
+Internal auth transport benchmark: the User Service's auth calls over HTTP/JSON (`AuthClient`) vs the
+msgpack RPC socket (`RPCAuthClient`), against the same in-process Auth Service.
+
+Each client runs `--requests` calls per operation from `--concurrency` threads; login is dominated by
+bcrypt either way, validate shows the per-hop transport overhead. Requires msgpack.
+
+    python -m benchmarks.auth_rpc --requests 2000 --concurrency 8
+    python -m benchmarks.auth_rpc --unix      # RPC over a Unix domain socket instead of TCP
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+from benchmarks import report
+from benchmarks.harness import ServiceStack, _free_port
+
+PASSWORD = "bench-password"
+EMAIL = "rpc-bench@example.com"
+
+
+def _drive(operations: dict, requests_per_op: int, concurrency: int) -> dict:
+    """
+    Run the operations one after the other and summarize each over its own duration.
+    """
+    endpoints = {}
+    for name, operation in operations.items():
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        lock = threading.Lock()
+        remaining = iter(range(requests_per_op))
+
+        def worker():
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                began = time.perf_counter()
+                ok = operation()
+                took = time.perf_counter() - began
+                with lock:
+                    if ok:
+                        latencies[name].append(took)
+                    else:
+                        errors[name] += 1
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        endpoints.update(report.summarize(latencies, errors, time.perf_counter() - started, {})["endpoints"])
+    return endpoints
+
+
+def run(requests_per_op: int, concurrency: int, unix: bool) -> dict:
+    tmpdir = tempfile.TemporaryDirectory(prefix="xsource-rpc-")
+    address = f"unix:{os.path.join(tmpdir.name, 'auth.sock')}" if unix else f"127.0.0.1:{_free_port()}"
+    try:
+        with ServiceStack(env={"AUTH_RPC_LISTEN": address}) as stack:
+            from user_service.clients.auth_client import AuthClient
+            from user_service.clients.rpc_auth_client import RPCAuthClient
+
+            requests.post(f"{stack.user_url}/signup",
+                          json={"email": EMAIL, "user_name": "bench", "password": PASSWORD}).raise_for_status()
+            clients = {"http": AuthClient(stack.auth_url), "rpc": RPCAuthClient(address, pool_size=concurrency)}
+            token = clients["http"].authenticate_user(EMAIL, PASSWORD)
+            endpoints = {}
+            for transport, client in clients.items():
+                operations = {
+                    f"{transport}.validate": lambda client=client: client.validate_token(token) is not None,
+                    f"{transport}.login": lambda client=client: client.authenticate_user(EMAIL, PASSWORD) is not None,
+                }
+                client.validate_token(token)  # open the connections outside the measurement
+                endpoints.update(_drive(operations, requests_per_op, concurrency))
+            clients["rpc"].close()
+    finally:
+        tmpdir.cleanup()
+    return {"meta": {"requests": requests_per_op, "concurrency": concurrency, "rpc_address": "unix" if unix else "tcp"},
+            "endpoints": endpoints}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Calls per operation and transport.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--unix", action="store_true", help="Serve the RPC over a Unix domain socket.")
+    parser.add_argument("--output", help="Write the JSON result to this file.")
+    args = parser.parse_args(argv)
+
+    result = run(args.requests, args.concurrency, args.unix)
+    for name, stats in result["endpoints"].items():
+        print(f"{name:<14} {stats['throughput_rps']:>9} rps  p50 {stats['p50_ms']:>8} ms  "
+              f"p99 {stats['p99_ms']:>8} ms  errors {stats['errors']}")
+    if args.output:
+        report.dump(result, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Email transport benchmark: messages per second through each transport against the local fake SMTP server.
+
+Sends `--messages` emails with `--concurrency` in flight through FastAPI-Mail (a new SMTP session per
+message), the pooled aiosmtplib transport and the in-memory sink, and reports the SMTP sessions each opened.
+
+    python -m benchmarks.email_transport --messages 500 --concurrency 16
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from benchmarks import report
+from benchmarks.fake_smtp import FakeSMTPServer
+from database_sharing_service.app.config import settings
+from email_service.app.transports import FastMailTransport, MemoryTransport, OutgoingEmail, SMTPPoolTransport
+
+TRANSPORTS = ("fastapi_mail", "smtp_pool", "memory")
+
+
+def _build(name: str, server: FakeSMTPServer, pool_size: int):
+    if name == "fastapi_mail":
+        return FastMailTransport()
+    if name == "smtp_pool":
+        return SMTPPoolTransport(server.host, server.port, pool_size, username=settings.MAIL_USERNAME,
+                                 password=settings.MAIL_PASSWORD, sender=settings.MAIL_FROM)
+    return MemoryTransport()
+
+
+async def _drive(transport, messages: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await transport.send(OutgoingEmail([f"bench-{i}@example.com"], "Benchmark", f"<p>message {i}</p>"))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(messages)))
+    took = time.perf_counter() - started
+    await transport.close()
+    return took
+
+
+def run(messages: int, concurrency: int, pool_size: int, transports=TRANSPORTS) -> dict:
+    results = {}
+    server = FakeSMTPServer().start()
+    try:
+        # FastAPI-Mail reads its connection from the settings; point it at the fake server without TLS.
+        settings.SMTP_SERVER, settings.SMTP_PORT = server.host, server.port
+        settings.MAIL_STARTTLS = settings.MAIL_SSL_TLS = False
+        for name in transports:
+            sessions, received = server.sessions_opened, server.messages_received
+            took = asyncio.run(_drive(_build(name, server, pool_size), messages, concurrency))
+            results[name] = {"messages": messages, "seconds": round(took, 4),
+                             "messages_per_s": round(messages / took, 1),
+                             "smtp_sessions": server.sessions_opened - sessions,
+                             "smtp_messages": server.messages_received - received}
+    finally:
+        server.stop()
+    return {"meta": {"concurrency": concurrency, "pool_size": pool_size}, "transports": results}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--output", help="Write the JSON result to this file.")
+    args = parser.parse_args(argv)
+
+    result = run(args.messages, args.concurrency, args.pool_size)
+    for name, stats in result["transports"].items():
+        print(f"{name:<13} {stats['messages_per_s']:>9} msg/s  {stats['seconds']:>8} s  "
+              f"smtp sessions {stats['smtp_sessions']}")
+    if args.output:
+        report.dump(result, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+
+
+class FakeSMTPServer:
+    """
+    Minimal in-process SMTP server that accepts every message and only counts it.
+
+    It speaks just enough of RFC 5321 (EHLO/HELO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT)
+    for `fastapi_mail` and `aiosmtplib` clients, without STARTTLS.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.messages_received = 0
+        self.sessions_opened = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="fake-smtp", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5)
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.sessions_opened += 1
+        writer.write(b"220 fake-smtp ready\r\n")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8", "replace").strip().upper()
+                if command.startswith("EHLO"):
+                    writer.write(b"250-fake-smtp\r\n250-AUTH PLAIN LOGIN\r\n250-PIPELINING\r\n250 8BITMIME\r\n")
+                elif command.startswith("HELO"):
+                    writer.write(b"250 fake-smtp\r\n")
+                elif command.startswith("AUTH LOGIN"):
+                    for _ in range(2 - len(command.split()[2:])):
+                        writer.write(b"334 \r\n")
+                        await writer.drain()
+                        await reader.readline()
+                    writer.write(b"235 Authentication successful\r\n")
+                elif command.startswith("AUTH"):
+                    if len(command.split()) < 3:
+                        writer.write(b"334 \r\n")
+                        await writer.drain()
+                        await reader.readline()
+                    writer.write(b"235 Authentication successful\r\n")
+                elif command.startswith("DATA"):
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    await writer.drain()
+                    while (await reader.readline()) not in (b".\r\n", b".\n", b""):
+                        pass
+                    self.messages_received += 1
+                    writer.write(b"250 OK: queued\r\n")
+                elif command.startswith("QUIT"):
+                    writer.write(b"221 Bye\r\n")
+                    await writer.drain()
+                    break
+                else:
+                    # MAIL FROM, RCPT TO, RSET and NOOP are all accepted unconditionally.
+                    writer.write(b"250 OK\r\n")
+                await writer.drain()
+        finally:
+            writer.close()
@@ -0,0 +1,111 @@
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import uvicorn
+
+from benchmarks.fake_smtp import FakeSMTPServer
+
+
+def _free_port(host: str = "127.0.0.1") -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class _ServerThread:
+    def __init__(self, app, host: str, port: int):
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning",
+                                                    access_log=False))
+        self.thread = threading.Thread(target=self.server.run, name=f"uvicorn-{port}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("uvicorn server did not start in time")
+            time.sleep(0.01)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+class ServiceStack:
+    """
+    Boots `user_app`, `auth_app` and `email_app` in this process against a throwaway SQLite
+    database and a local fake SMTP server.
+
+    The service settings are read from the environment at import time, so the stack must be
+    started before anything imports the service modules.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", database_url: str | None = None, env: dict | None = None,
+                 log_level: int = logging.WARNING):
+        self.host = host
+        self.log_level = log_level
+        self._tmpdir = None
+        if database_url is None:
+            self._tmpdir = tempfile.TemporaryDirectory(prefix="xsource-bench-")
+            database_url = f"sqlite:///{os.path.join(self._tmpdir.name, 'bench.db')}"
+        self.database_url = database_url
+        self.extra_env = env or {}
+        self.smtp = FakeSMTPServer(host)
+        self.user_url = self.auth_url = self.email_url = None
+        self._servers = []
+
+    def start(self):
+        self.smtp.start()
+        user_port, auth_port, email_port = _free_port(), _free_port(), _free_port()
+        self.user_url = f"http://{self.host}:{user_port}"
+        self.auth_url = f"http://{self.host}:{auth_port}"
+        self.email_url = f"http://{self.host}:{email_port}"
+        os.environ.update({
+            "DATABASE_URL": self.database_url,
+            "AUTH_SERVICE_URL": self.auth_url,
+            "EMAIL_SERVICE_URL": self.email_url,
+            "SMTP_SERVER": self.host,
+            "SMTP_PORT": str(self.smtp.port),
+            "MAIL_STARTTLS": "false",
+            "MAIL_SSL_TLS": "false",
+            "MAIL_USE_CREDENTIALS": "false",
+            "MAIL_FROM": "bench@example.com",
+            **self.extra_env,
+        })
+
+        from database_sharing_service.app import models  # noqa: F401 - registers the users table
+        from database_sharing_service.app.database import Base, get_engines
+        from user_service.app.main import user_app
+        from auth_service.app.main import auth_app
+        from email_service.app.main import email_app
+
+        for engine in get_engines().values():
+            Base.metadata.create_all(bind=engine)
+        # The service loggers log every request at INFO, which would dominate the measurements.
+        for name in ("User_Service", "Auth_Service", "Email_Service", "Auth_Engine", "AuthClient",
+                     "LocalAuthClient"):
+            logging.getLogger(name).setLevel(self.log_level)
+
+        for app, port in ((auth_app, auth_port), (email_app, email_port), (user_app, user_port)):
+            server = _ServerThread(app, self.host, port)
+            server.start()
+            self._servers.append(server)
+        return self
+
+    def stop(self):
+        for server in reversed(self._servers):
+            server.stop()
+        self._servers.clear()
+        self.smtp.stop()
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
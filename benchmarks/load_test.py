@@ -0,0 +1,191 @@
+"""
+Load test for the user/auth/email service trio.
+
+Boots the three apps against SQLite and a fake SMTP server, drives a weighted mix of
+signup, login, validate, user fetch and password reset requests at a fixed concurrency and
+reports throughput and p50/p95/p99 latency per endpoint.
+
+    python -m benchmarks.load_test --concurrency 16 --duration 30 --output bench.json
+
+Record a baseline first, then compare later runs against it:
+
+    python -m benchmarks.load_test --output baseline.json
+    python -m benchmarks.load_test --baseline baseline.json   # exits 1 on regression
+"""
+import argparse
+import itertools
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import requests
+
+from benchmarks import report
+from benchmarks.harness import ServiceStack, _free_port
+
+DEFAULT_MIX = {"signup": 1, "login": 3, "validate": 3, "user_fetch": 2, "reset": 1}
+PASSWORD = "bench-password"
+
+
+class Account:
+    def __init__(self, email: str, token: str, encrypted_id: str):
+        self.email = email
+        self.token = token
+        self.encrypted_id = encrypted_id
+
+
+class Workload:
+    """
+    One operation per endpoint of the mix. Each returns True when the response was the expected one.
+    """
+
+    def __init__(self, stack: ServiceStack, accounts: list[Account]):
+        self.stack = stack
+        self.accounts = accounts
+        self._counter = itertools.count()
+
+    def _account(self) -> Account:
+        return random.choice(self.accounts)
+
+    def signup(self, session: requests.Session) -> bool:
+        email = f"bench-{uuid.uuid4().hex[:12]}-{next(self._counter)}@example.com"
+        response = session.post(f"{self.stack.user_url}/signup",
+                                json={"email": email, "user_name": "bench", "password": PASSWORD})
+        return response.status_code == 200
+
+    def login(self, session: requests.Session) -> bool:
+        response = session.post(f"{self.stack.user_url}/login",
+                                json={"email": self._account().email, "password": PASSWORD})
+        return response.status_code == 200
+
+    def validate(self, session: requests.Session) -> bool:
+        response = session.post(f"{self.stack.auth_url}/validate-token", params={"token": self._account().token})
+        return response.status_code == 200
+
+    def user_fetch(self, session: requests.Session) -> bool:
+        response = session.get(f"{self.stack.user_url}/user/{self._account().encrypted_id}")
+        return response.status_code == 200
+
+    def reset(self, session: requests.Session) -> bool:
+        response = session.post(f"{self.stack.user_url}/password-reset-request",
+                                data={"email": self._account().email})
+        return response.status_code == 200
+
+
+def seed_accounts(stack: ServiceStack, count: int) -> list[Account]:
+    """
+    Sign up `count` users through the public API and collect a token and encrypted id for each.
+    """
+    accounts = []
+    with requests.Session() as session:
+        for i in range(count):
+            email = f"seed-{i}-{uuid.uuid4().hex[:8]}@example.com"
+            session.post(f"{stack.user_url}/signup",
+                         json={"email": email, "user_name": "seed", "password": PASSWORD}).raise_for_status()
+            login = session.post(f"{stack.user_url}/login", json={"email": email, "password": PASSWORD})
+            login.raise_for_status()
+            token = login.json()["access_token"]
+            validated = session.post(f"{stack.auth_url}/validate-token", params={"token": token})
+            validated.raise_for_status()
+            accounts.append(Account(email, token, validated.json()["id"]))
+    return accounts
+
+
+def run(stack: ServiceStack, mix: dict[str, int], concurrency: int, duration: float, warmup: float,
+        seed_users: int) -> dict:
+    workload = Workload(stack, seed_accounts(stack, seed_users))
+    operations = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in operations]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    def worker():
+        with requests.Session() as session:
+            while True:
+                name = random.choices(operations, weights)[0]
+                began = time.perf_counter()
+                if began >= stop_at:
+                    return
+                try:
+                    ok = getattr(workload, name)(session)
+                except requests.RequestException:
+                    ok = False
+                took = time.perf_counter() - began
+                if began < measure_from:
+                    continue
+                with lock:
+                    if ok:
+                        latencies[name].append(took)
+                    else:
+                        errors[name] += 1
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    config = {"mix": mix, "concurrency": concurrency, "duration_s": duration, "warmup_s": warmup,
+              "seed_users": seed_users}
+    result = report.summarize(latencies, errors, duration, config)
+    result["meta"]["smtp_messages"] = stack.smtp.messages_received
+    return result
+
+
+def _parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation '{name}', expected one of {sorted(DEFAULT_MIX)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds.")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before measuring.")
+    parser.add_argument("--seed-users", type=int, default=20)
+    parser.add_argument("--mix", type=_parse_mix, default=DEFAULT_MIX,
+                        help="Comma separated operation=weight pairs, e.g. login=5,validate=5.")
+    parser.add_argument("--auth-mode", choices=("remote", "rpc", "local"), default="remote",
+                        help="How the User Service authenticates logins (see AUTH_MODE).")
+    parser.add_argument("--output", help="Write the JSON result to this file.")
+    parser.add_argument("--baseline", help="Compare against this JSON result and exit 1 on regression.")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    env = {"AUTH_MODE": args.auth_mode}
+    if args.auth_mode == "rpc":
+        env["AUTH_RPC_LISTEN"] = env["AUTH_RPC_ADDRESS"] = f"127.0.0.1:{_free_port()}"
+    with ServiceStack(env=env) as stack:
+        result = run(stack, args.mix, args.concurrency, args.duration, args.warmup, args.seed_users)
+        result["meta"]["config"]["auth_mode"] = args.auth_mode
+
+    for name, stats in result["endpoints"].items():
+        print(f"{name:<12} {stats['requests']:>7} req  {stats['throughput_rps']:>8} rps  "
+              f"p50 {stats['p50_ms']:>8} ms  p95 {stats['p95_ms']:>8} ms  p99 {stats['p99_ms']:>8} ms  "
+              f"errors {stats['errors']}")
+    print(f"total        {result['total_throughput_rps']} rps")
+    if args.output:
+        report.dump(result, args.output)
+
+    if args.baseline:
+        regressions = report.compare(result, report.load(args.baseline), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Lookup micro-benchmark: the per-call cost of the user read paths against a throwaway SQLite database.
+
+Compares the ORM lookups (`get_user_by_email`, `get_user_by_id`: a legacy Query built per call, loading a
+tracked `User`) with the projected lambda-statement variants the read paths use (`get_user_credentials`,
+`get_user_profile`).
+
+    python -m benchmarks.queries --users 1000 --iterations 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from benchmarks import report
+from database_sharing_service.app import crud, models
+from database_sharing_service.app.database import Base
+
+
+def _seed(engine, users: int):
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.execute(insert(models.User), [{"email": f"bench-{i}@example.com", "user_name": "bench",
+                                          "hashed_password": "x" * 60, "source": "web"} for i in range(users)])
+        db.commit()
+
+
+def _time_per_call(engine, lookup, keys: list) -> float:
+    """
+    Microseconds per lookup, one session per lookup as in a request.
+    """
+    started = time.perf_counter()
+    for key in keys:
+        with Session(engine) as db:
+            lookup(db, key)
+    return round((time.perf_counter() - started) / len(keys) * 1e6, 2)
+
+
+def run(users: int, iterations: int) -> dict:
+    with tempfile.TemporaryDirectory(prefix="xsource-queries-") as tmpdir:
+        engine = create_engine(f"sqlite:///{os.path.join(tmpdir, 'bench.db')}")
+        _seed(engine, users)
+        emails = [f"bench-{random.randrange(users)}@example.com" for _ in range(iterations)]
+        ids = [random.randrange(1, users + 1) for _ in range(iterations)]
+        lookups = {
+            "by_email": {"orm": (crud.get_user_by_email, emails), "projected": (crud.get_user_credentials, emails)},
+            "by_id": {"orm": (crud.get_user_by_id, ids), "projected": (crud.get_user_profile, ids)},
+        }
+        results = {}
+        for name, variants in lookups.items():
+            for lookup, keys in variants.values():  # warm the statement caches
+                _time_per_call(engine, lookup, keys[:100])
+            results[name] = {variant: _time_per_call(engine, lookup, keys)
+                             for variant, (lookup, keys) in variants.items()}
+        engine.dispose()
+    return {"meta": {"users": users, "iterations": iterations}, "lookups_us": results}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--output", help="Write the JSON result to this file.")
+    args = parser.parse_args(argv)
+
+    result = run(args.users, args.iterations)
+    for name, timings in result["lookups_us"].items():
+        print(f"{name:<9} " + "  ".join(f"{variant} {us:>8} us" for variant, us in timings.items()))
+    if args.output:
+        report.dump(result, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import json
+import math
+import platform
+import time
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of `samples` (0 for an empty list).
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: dict[str, list[float]], errors: dict[str, int], elapsed: float, config: dict) -> dict:
+    """
+    Build the JSON-serialisable result of a run.
+
+    - **latencies**: Per-endpoint latencies of successful requests, in seconds.
+    - **errors**: Per-endpoint count of failed requests.
+    - **elapsed**: Wall-clock duration of the measured phase, in seconds.
+    - **config**: The run parameters, stored alongside the numbers so baselines stay comparable.
+    """
+    endpoints = {}
+    for name in sorted(set(latencies) | set(errors)):
+        samples = latencies.get(name, [])
+        failed = errors.get(name, 0)
+        total = len(samples) + failed
+        endpoints[name] = {
+            "requests": total,
+            "errors": failed,
+            "error_rate": round(failed / total, 4) if total else 0.0,
+            "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(samples, 50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        }
+    completed = sum(len(samples) for samples in latencies.values())
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "elapsed_s": round(elapsed, 3),
+            "config": config,
+        },
+        "total_throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float = 0.2) -> list[str]:
+    """
+    Compare a run against a stored baseline.
+
+    An endpoint regresses when its p95 or p99 latency grows, or its throughput drops, by more
+    than `tolerance` (a fraction), or when its error rate increases at all.
+
+    Returns a human readable line per regression; an empty list means the check passed.
+    """
+    regressions = []
+    for name, base in baseline.get("endpoints", {}).items():
+        current = result["endpoints"].get(name)
+        if current is None:
+            regressions.append(f"{name}: missing from the current run")
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if base[key] and current[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {current[key]} > baseline {base[key]} (+{tolerance:.0%})")
+        if base["throughput_rps"] and current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput_rps {current['throughput_rps']} < baseline "
+                               f"{base['throughput_rps']} (-{tolerance:.0%})")
+        if current["error_rate"] > base["error_rate"]:
+            regressions.append(f"{name}: error_rate {current['error_rate']} > baseline {base['error_rate']}")
+    return regressions
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def dump(result: dict, path: str):
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+        f.write("\n")
@@ -0,0 +1,76 @@
+"""
+Serialization micro-benchmark: the cost of turning each endpoint's payload into response bytes.
+
+Compares FastAPI's stock path (`jsonable_encoder` + `JSONResponse`), the shared `FastJSONResponse`
+and, for model responses, a plain `model_dump_json`. Payloads mirror what the endpoints return.
+
+    python -m benchmarks.serialization --iterations 20000
+"""
+import argparse
+import sys
+import timeit
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from benchmarks import report
+from database_sharing_service.app import schemas
+from database_sharing_service.app.responses import FastJSONResponse, user_response
+
+_ROW = SimpleNamespace(email="bench@example.com", user_name="bench", is_active=True, source="web",
+                       user_identity="student", hashed_password="$2b$12$" + "x" * 53)
+
+
+def _payloads() -> dict:
+    return {
+        "user_fetch": schemas.User.model_validate(_ROW),
+        "login": {"access_token": "e" * 180, "token_type": "bearer"},
+        "validate": schemas.TokenData(email="bench@example.com", id="g" * 120),
+        "message": {"status": "200", "message": "User created successfully"},
+    }
+
+
+def _strategies(payload) -> dict:
+    strategies = {
+        "stdlib": lambda: JSONResponse(jsonable_encoder(payload)).body,
+        "fast": lambda: FastJSONResponse(payload).body,
+    }
+    if hasattr(payload, "model_dump_json"):
+        strategies["model_dump_json"] = lambda: payload.model_dump_json().encode()
+    return strategies
+
+
+def run(iterations: int) -> dict:
+    """
+    Microseconds per serialization, keyed by endpoint and strategy.
+    """
+    results = {}
+    for endpoint, payload in _payloads().items():
+        results[endpoint] = {name: round(timeit.timeit(fn, number=iterations) / iterations * 1e6, 3)
+                             for name, fn in _strategies(payload).items()}
+    # The user fetch endpoint skips model validation entirely and renders the ORM row directly.
+    results["user_fetch"]["fast_from_row"] = round(
+        timeit.timeit(lambda: user_response(_ROW).body, number=iterations) / iterations * 1e6, 3)
+    results["user_fetch"]["stdlib_from_row"] = round(
+        timeit.timeit(lambda: JSONResponse(jsonable_encoder(schemas.User.model_validate(_ROW))).body,
+                      number=iterations) / iterations * 1e6, 3)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--output", help="Write the JSON result to this file.")
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations)
+    for endpoint, timings in results.items():
+        print(f"{endpoint:<12} " + "  ".join(f"{name} {us:>7} us" for name, us in timings.items()))
+    if args.output:
+        report.dump(results, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import each service app.
+
+Each measurement runs in a new subprocess so nothing is cached between runs. With
+`--top N` the slowest imports (cumulative, from `python -X importtime`) are listed too.
+
+    python -m benchmarks.startup --runs 5 --top 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SERVICES = {
+    "user_service": "user_service.app.main",
+    "auth_service": "auth_service.app.main",
+    "email_service": "email_service.app.main",
+}
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+_MEASURE = "import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [PROJECT_ROOT, env.get("PYTHONPATH")]))
+    return env
+
+
+def import_time(module: str) -> float:
+    output = subprocess.run([sys.executable, "-c", _MEASURE.format(module=module)], cwd=PROJECT_ROOT, env=_env(),
+                            check=True, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, top: int) -> list[tuple[str, float]]:
+    """
+    The `top` modules with the highest cumulative import time, in milliseconds.
+    """
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=PROJECT_ROOT,
+                            env=_env(), check=True, capture_output=True, text=True).stderr
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings.append((name.strip(), int(cumulative) / 1000))
+    return sorted(timings, key=lambda item: item[1], reverse=True)[:top]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="Also list the N slowest imports per service.")
+    parser.add_argument("--output", help="Write the JSON result to this file.")
+    args = parser.parse_args(argv)
+
+    result = {}
+    for service, module in SERVICES.items():
+        samples = [import_time(module) for _ in range(args.runs)]
+        result[service] = {"median_ms": round(statistics.median(samples) * 1000, 2),
+                           "min_ms": round(min(samples) * 1000, 2),
+                           "max_ms": round(max(samples) * 1000, 2)}
+        print(f"{service:<14} median {result[service]['median_ms']:>8} ms  min {result[service]['min_ms']:>8} ms  "
+              f"max {result[service]['max_ms']:>8} ms")
+        if args.top:
+            result[service]["slowest_imports"] = slowest_imports(module, args.top)
+            for name, cumulative_ms in result[service]["slowest_imports"]:
+                print(f"    {cumulative_ms:>9.1f} ms  {name}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
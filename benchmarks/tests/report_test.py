@@ -0,0 +1,58 @@
+import smtplib
+
+from benchmarks import report
+from benchmarks.fake_smtp import FakeSMTPServer
+
+
+def _result(p95_ms, throughput_rps, error_rate=0.0):
+    return {"endpoints": {"login": {"p95_ms": p95_ms, "p99_ms": p95_ms, "throughput_rps": throughput_rps,
+                                    "error_rate": error_rate}}}
+
+
+def test_percentile_nearest_rank():
+    samples = [float(i) for i in range(1, 101)]
+    assert report.percentile(samples, 50) == 50.0
+    assert report.percentile(samples, 95) == 95.0
+    assert report.percentile(samples, 99) == 99.0
+    assert report.percentile([], 99) == 0.0
+
+
+def test_summarize_reports_per_endpoint_stats():
+    result = report.summarize({"login": [0.1, 0.2, 0.3, 0.4]}, {"login": 1, "reset": 2}, 2.0, {"concurrency": 1})
+
+    assert result["endpoints"]["login"]["requests"] == 5
+    assert result["endpoints"]["login"]["error_rate"] == 0.2
+    assert result["endpoints"]["login"]["throughput_rps"] == 2.0
+    assert result["endpoints"]["login"]["p50_ms"] == 200.0
+    assert result["endpoints"]["reset"]["error_rate"] == 1.0
+    assert result["meta"]["config"] == {"concurrency": 1}
+
+
+def test_compare_passes_within_tolerance():
+    assert report.compare(_result(110, 95), _result(100, 100), tolerance=0.2) == []
+
+
+def test_compare_flags_latency_throughput_and_error_regressions():
+    regressions = report.compare(_result(150, 50, error_rate=0.1), _result(100, 100), tolerance=0.2)
+
+    assert any("p95_ms" in line for line in regressions)
+    assert any("throughput_rps" in line for line in regressions)
+    assert any("error_rate" in line for line in regressions)
+
+
+def test_compare_flags_missing_endpoint():
+    assert report.compare({"endpoints": {}}, _result(100, 100)) == ["login: missing from the current run"]
+
+
+def test_fake_smtp_server_counts_messages():
+    server = FakeSMTPServer().start()
+    try:
+        with smtplib.SMTP(server.host, server.port) as smtp:
+            smtp.login("user", "password")
+            smtp.sendmail("from@example.com", ["to@example.com"], "Subject: hi\r\n\r\nbody")
+            smtp.sendmail("from@example.com", ["to@example.com"], "Subject: hi again\r\n\r\nbody")
+    finally:
+        server.stop()
+
+    assert server.messages_received == 2
+    assert server.sessions_opened == 1
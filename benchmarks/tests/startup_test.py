@@ -0,0 +1,25 @@
+import subprocess
+import sys
+
+from benchmarks.startup import PROJECT_ROOT, SERVICES, _env
+
+# Heavy modules that must only load on first use, not when a service is imported.
+LAZY_MODULES = ("fastapi_mail", "psycopg2", "uvicorn", "passlib.handlers.bcrypt")
+# The Email Service has no database, so it must not load SQLAlchemy at all.
+SERVICE_LAZY_MODULES = {"email_service": ("sqlalchemy",)}
+
+
+def _loaded(modules: list[str], lazy: tuple[str, ...]) -> str:
+    check = (f"import sys; import {', '.join(modules)}; "
+             f"print(','.join(m for m in {lazy!r} if m in sys.modules))")
+    return subprocess.run([sys.executable, "-c", check], cwd=PROJECT_ROOT, env=_env(), check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def test_services_import_without_heavy_dependencies():
+    assert _loaded(list(SERVICES.values()), LAZY_MODULES) == ""
+
+
+def test_services_import_without_dependencies_they_do_not_use():
+    for service, lazy in SERVICE_LAZY_MODULES.items():
+        assert _loaded([SERVICES[service]], lazy) == "", service
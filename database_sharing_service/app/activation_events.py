@@ -0,0 +1,322 @@
+import asyncio
+import threading
+
+from cryptography.fernet import InvalidToken
+from fastapi import FastAPI, HTTPException, Path, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from . import schemas
+from .config import settings
+from .crud import decrypt_user_id, get_active_user_ids, get_user_profile
+from .database import get_session_router
+from .health import AdmissionState
+from .logging_config import get_logger
+from .metrics import registry
+from .responses import FastJSONResponse
+
+logger = get_logger("Activation_Events")
+
+ACTIVATION_STATUS_PATH = "/activation-status/"
+# How long an EventSource waits before reconnecting once a stream ends
+SSE_RETRY_MS = 1000
+
+activation_waiters = registry.gauge("activation_waiters", "Clients waiting for a user to activate.")
+activation_notifications = registry.counter("activation_notifications_total",
+                                            "Activations delivered to waiting clients, by how they were noticed.",
+                                            ("via",))
+
+
+class ActivationHub:
+    """
+    The clients of one worker waiting for users to activate.
+
+    Waiters of the same user share one future, so an idle waiter costs a counter in a dictionary slot next to
+    its suspended request, and no task or queue of its own. `notify` may be called from any thread.
+    """
+
+    def __init__(self, broker, max_waiters: int = 0):
+        self.broker = broker
+        self.max_waiters = max_waiters
+        # public user id -> [future (True once activated, False on shutdown), number of waiters]
+        self._waiting = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        broker.attach(self)
+
+    def __len__(self):
+        return self._count
+
+    def pending(self) -> list[int]:
+        with self._lock:
+            return [user_id for user_id, (future, _) in self._waiting.items() if not future.done()]
+
+    def subscribe(self, user_id: int) -> asyncio.Future | None:
+        """
+        Start waiting for `user_id` on the running event loop. Returns the future to await, or None when
+        `max_waiters` clients are already waiting. Every subscription must be ended with `unsubscribe`.
+        """
+        with self._lock:
+            if 0 < self.max_waiters <= self._count:
+                return None
+            entry = self._waiting.get(user_id)
+            if entry is None:
+                entry = self._waiting[user_id] = [asyncio.get_running_loop().create_future(), 0]
+            entry[1] += 1
+            self._count += 1
+            activation_waiters.set(self._count)
+        return entry[0]
+
+    def unsubscribe(self, user_id: int):
+        with self._lock:
+            entry = self._waiting[user_id]
+            entry[1] -= 1
+            if not entry[1]:
+                del self._waiting[user_id]
+            self._count -= 1
+            activation_waiters.set(self._count)
+
+    def publish(self, user_id: int):
+        """
+        Announce that `user_id` was activated, to the waiters of every hub the broker reaches.
+        """
+        self.broker.publish(user_id)
+
+    def notify(self, user_ids, via: str = "publish"):
+        """
+        Wake the waiters of `user_ids` on this hub.
+        """
+        with self._lock:
+            futures = [self._waiting[user_id][0] for user_id in user_ids if user_id in self._waiting]
+        self._wake(futures, True, via)
+
+    def close(self):
+        """
+        Wake every waiter with False, ending the streams before shutdown.
+        """
+        with self._lock:
+            futures = [future for future, _ in self._waiting.values()]
+        self._wake(futures, False, "shutdown")
+
+    @staticmethod
+    def _wake(futures, result: bool, via: str):
+        for future in futures:
+            try:
+                future.get_loop().call_soon_threadsafe(_resolve, future, result, via)
+            except RuntimeError:  # Its event loop is already closed
+                pass
+
+
+def _resolve(future: asyncio.Future, result: bool, via: str):
+    if not future.done():
+        future.set_result(result)
+        if result:
+            activation_notifications.inc(via=via)
+
+
+class LocalBroker:
+    """
+    Delivers published activations to the hubs attached in this process. With several workers, a waiter
+    only hears of activations handled by its own worker; the others see the user active when they next
+    connect. Several hubs on one broker also stand in for several workers in tests.
+    """
+
+    def __init__(self):
+        self.hubs = []
+
+    def attach(self, hub: ActivationHub):
+        self.hubs.append(hub)
+
+    def publish(self, user_id: int):
+        for hub in self.hubs:
+            hub.notify((user_id,))
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class DatabaseBroker(LocalBroker):
+    """
+    Also notices activations handled by other workers or processes: every `interval` seconds, checks the
+    users waited on in this process with one query per shard on the primary, in place of a query per client
+    poll. Activations published in this process still wake their waiters at once.
+    """
+
+    def __init__(self, interval: float, session_factory=None):
+        super().__init__()
+        self.interval = interval
+        self.session_factory = session_factory
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self) -> set[int]:
+        """
+        Check the waited on users once and wake the waiters of those now active. Returns their ids.
+        """
+        user_ids = {user_id for hub in self.hubs for user_id in hub.pending()}
+        if not user_ids:
+            return set()
+        with (self.session_factory or get_session_router().primary)() as db:
+            activated = get_active_user_ids(db, user_ids)
+        for hub in self.hubs:
+            hub.notify(activated, via="poll")
+        return activated
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Activation poll failed: {str(e)}")
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="activation-poll", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def create_activation_broker():
+    if settings.ACTIVATION_EVENTS_BACKEND == "database":
+        return DatabaseBroker(settings.ACTIVATION_POLL_SECONDS)
+    if settings.ACTIVATION_EVENTS_BACKEND != "memory":
+        raise ValueError(f"Unknown ACTIVATION_EVENTS_BACKEND '{settings.ACTIVATION_EVENTS_BACKEND}', "
+                         "expected memory or database")
+    return LocalBroker()
+
+
+def _read_is_active(user_id: int) -> bool | None:
+    db = get_session_router().read_session()
+    try:
+        profile = get_user_profile(db, user_id)
+    finally:
+        db.close()
+    return None if profile is None else profile.is_active
+
+
+def _event(is_active: bool) -> bytes:
+    return b"event: status\ndata: " + FastJSONResponse({"is_active": is_active}).body + b"\n\n"
+
+
+class _Subscription:
+    """
+    One client's wait on a hub, released once by whichever ends first: the event stream, or the response
+    sending it, which may fail or be cancelled before the stream is ever started.
+    """
+
+    def __init__(self, hub: ActivationHub, user_id: int):
+        self.hub = hub
+        self.user_id = user_id
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.hub.unsubscribe(self.user_id)
+
+
+async def _activation_stream(subscription: _Subscription, activated: asyncio.Future, is_active: bool,
+                             wait: float, heartbeat: float):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n".encode() + _event(is_active)
+        while not is_active and (remaining := deadline - loop.time()) > 0:
+            await asyncio.wait((activated,), timeout=min(heartbeat, remaining))
+            if not activated.done():
+                yield b": keep-alive\n\n"
+            elif not activated.result():
+                break
+            else:
+                is_active = True
+                yield _event(True)
+    finally:
+        subscription.release()
+
+
+class _ActivationStreamResponse(StreamingResponse):
+    def __init__(self, subscription: _Subscription, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.subscription = subscription
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.subscription.release()
+
+
+def install_activation_events(app: FastAPI, admission: AdmissionState | None = None) -> ActivationHub:
+    """
+    Add `GET /activation-status/{user_id}` to `app`, which waits for the user to activate (see `ActivationHub`)
+    instead of having clients poll `GET /user/{user_id}`; its long-lived requests are exempt from `admission`.
+
+    Returns the hub, whose `publish` the activation endpoint calls.
+    """
+    hub = ActivationHub(create_activation_broker(), settings.ACTIVATION_MAX_WAITERS)
+    if admission is not None:
+        admission.exempt_prefixes += (ACTIVATION_STATUS_PATH,)
+
+    async def shutdown():
+        hub.close()
+        await run_in_threadpool(hub.broker.stop)
+
+    app.add_event_handler("startup", hub.broker.start)
+    app.add_event_handler("shutdown", shutdown)
+
+    @app.get(ACTIVATION_STATUS_PATH + "{user_id}", response_model=schemas.ActivationStatus, tags=["Users"],
+             summary="Wait for Activation",
+             description="Wait until the user's account is activated. Streams server-sent `status` events when "
+                         "requested with `Accept: text/event-stream`, else answers once activated or after `wait`.")
+    async def activation_status(request: Request,
+                                user_id: str = Path(..., description="The ID of the user to wait for"),
+                                wait: float = Query(settings.ACTIVATION_WAIT_SECONDS, ge=0,
+                                                    le=settings.ACTIVATION_WAIT_SECONDS,
+                                                    description="Longest time to wait, in seconds")):
+        """
+        Wait for a user account to be activated.
+
+        - **user_id**: The unique identifier of the user.
+        - **wait**: Longest time to wait, in seconds.
+
+        Returns whether the account is active. An event stream sends the current status, keep-alive comments
+        while waiting and a final status event once activated; clients reconnect when it ends without one.
+        """
+        try:
+            public_id = int(decrypt_user_id(user_id))
+        except (InvalidToken, ValueError):
+            raise HTTPException(status_code=404, detail="User not found")
+        activated = hub.subscribe(public_id)
+        if activated is None:
+            raise HTTPException(status_code=503, detail="Too many clients waiting, retry later",
+                                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)})
+        streaming = False
+        try:
+            # Subscribed before reading, so an activation committed in between still wakes us.
+            is_active = await run_in_threadpool(_read_is_active, public_id)
+            if is_active is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            if "text/event-stream" in request.headers.get("accept", ""):
+                streaming = True
+                subscription = _Subscription(hub, public_id)
+                return _ActivationStreamResponse(
+                    subscription,
+                    _activation_stream(subscription, activated, is_active, wait,
+                                       settings.ACTIVATION_HEARTBEAT_SECONDS),
+                    media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+            if not is_active:
+                await asyncio.wait((activated,), timeout=wait)
+                is_active = activated.done() and activated.result()
+            return {"is_active": is_active}
+        finally:
+            if not streaming:
+                hub.unsubscribe(public_id)
+
+    return hub
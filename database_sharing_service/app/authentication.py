@@ -0,0 +1,77 @@
+from jose import JWTError, jwt
+
+from . import schemas
+from .config import settings
+from .crud import encrypt_user_id, generate_auth_token, verify_password
+from .logging_config import get_logger
+
+logger = get_logger("Auth_Engine")
+
+
+class AuthenticationError(Exception):
+    """
+    Authentication failure, carrying the HTTP status and detail the Auth Service answers with.
+    """
+
+    def __init__(self, status_code: int, detail: str, headers: dict | None = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.headers = headers
+
+
+class AuthEngine:
+    """
+    Token issuing and validation logic shared by the Auth Service endpoints and the in-process auth
+    client of the User Service, so both deployments behave identically.
+    """
+
+    def issue_token(self, user, email: str, password: str) -> schemas.TokenResponse:
+        """
+        Check `password` against `user` (the result of looking up `email`, possibly None) and mint an auth token.
+
+        Raises AuthenticationError(400) when the user does not exist or the password is wrong.
+        """
+        if not user:
+            logger.warning(f"Failed login attempt with non-existent email: {email}")
+            raise AuthenticationError(400, "Invalid email or password")
+        if not verify_password(password, user.hashed_password):
+            logger.warning(f"Failed login attempt for email: {email} with incorrect password")
+            raise AuthenticationError(400, "Invalid email or password")
+
+        token = generate_auth_token(user.public_id, user.email, settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        logger.info(f"Token generated for email: {email}")
+        return schemas.TokenResponse(access_token=token, token_type="bearer")
+
+    def validate_token(self, token: str) -> schemas.TokenData:
+        """
+        Decode an auth token and return its email and encrypted user id.
+
+        Raises AuthenticationError(401) for invalid or expired tokens, (400) for tokens of another type.
+        """
+        credentials_error = AuthenticationError(401, "Could not validate credentials",
+                                                headers={"WWW-Authenticate": "Bearer"})
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            if payload.get("type") != "auth":
+                logger.warning("Token validation failed: Invalid token type for authentication.")
+                raise AuthenticationError(400, "Invalid credentials")
+            email: str = payload.get("email")
+            if email is None:
+                logger.warning("Token validation failed: missing email in payload.")
+                raise credentials_error
+            token_data = schemas.TokenData(email=email, id=encrypt_user_id(payload.get("id")))
+        except AuthenticationError:
+            raise
+        except JWTError as e:
+            logger.error(f"Token validation failed: {str(e)}")
+            raise credentials_error
+        except Exception as e:
+            logger.error(f"Unexpected error during token validation: {str(e)}")
+            raise AuthenticationError(500, "Internal Server Error")
+
+        logger.info(f"Token validated successfully for email: {email}")
+        return token_data
+
+
+auth_engine = AuthEngine()
@@ -10,17 +10,75 @@ load_dotenv(dotenv_path)
 class Settings:
     DATABASE_URL = os.getenv('DATABASE_URL',
                              default='postgresql')  #postgresql://postgresadmin@psql-i-xtech:mW%23M%2Ch8ykXNAonOMdDO3Jlbq5GFrqO@psql-i-xtech.postgres.database.azure.com:5432/xsource_db?sslmode=require
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', default='').split(',')
+                             if url.strip()]  # read-only replicas; empty routes every read to DATABASE_URL
+    REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', default='5'))  # reads pinned after a write
+    REPLICA_RETRY_SECONDS = float(os.getenv('REPLICA_RETRY_SECONDS', default='10'))  # skip a failed replica this long
+    DATABASE_SHARD_URLS = [url.strip() for url in os.getenv('DATABASE_SHARD_URLS', default='').split(',')
+                           if url.strip()]  # users sharded by email hash over these; replaces DATABASE_URL
+    SHARD_MAP_PATH = os.getenv('SHARD_MAP_PATH', default='')  # bucket -> shard JSON; empty spreads buckets evenly
+    UNACTIVATED_ACCOUNT_TTL_HOURS = float(os.getenv('UNACTIVATED_ACCOUNT_TTL_HOURS', default='72'))
+    CLEANUP_INTERVAL_SECONDS = float(os.getenv('CLEANUP_INTERVAL_SECONDS', default='0'))  # 0 disables the job
+    CLEANUP_BATCH_SIZE = int(os.getenv('CLEANUP_BATCH_SIZE', default='200'))
+    CLEANUP_BATCH_PAUSE_SECONDS = float(os.getenv('CLEANUP_BATCH_PAUSE_SECONDS', default='0.1'))
+    CLEANUP_MODE = os.getenv('CLEANUP_MODE', default='delete')  # delete or archive
+    IDEMPOTENCY_STORE = os.getenv('IDEMPOTENCY_STORE', default='memory')  # memory or database
+    IDEMPOTENCY_TTL_SECONDS = float(os.getenv('IDEMPOTENCY_TTL_SECONDS', default='86400'))
+    IDEMPOTENCY_LOCK_SECONDS = float(os.getenv('IDEMPOTENCY_LOCK_SECONDS', default='60'))  # in-flight claim lifetime
+    IDEMPOTENCY_MAX_KEYS = int(os.getenv('IDEMPOTENCY_MAX_KEYS', default='10000'))  # memory store bound
+    EMAIL_COALESCE_WINDOW_SECONDS = float(os.getenv('EMAIL_COALESCE_WINDOW_SECONDS', default='60'))  # 0 disables
+    EMAIL_MAX_PER_RECIPIENT_PER_HOUR = int(os.getenv('EMAIL_MAX_PER_RECIPIENT_PER_HOUR', default='10'))  # 0: no cap
+    STATS_REFRESH_SECONDS = float(os.getenv('STATS_REFRESH_SECONDS', default='5'))  # /stats/users staleness bound
+    STATS_RECONCILE_SECONDS = float(os.getenv('STATS_RECONCILE_SECONDS', default='3600'))  # recount; 0 disables
+    ACTIVATION_EVENTS_BACKEND = os.getenv('ACTIVATION_EVENTS_BACKEND', default='memory')  # memory or database
+    ACTIVATION_POLL_SECONDS = float(os.getenv('ACTIVATION_POLL_SECONDS', default='1'))  # database backend interval
+    ACTIVATION_WAIT_SECONDS = float(os.getenv('ACTIVATION_WAIT_SECONDS', default='30'))  # Longest long-poll or stream
+    ACTIVATION_HEARTBEAT_SECONDS = float(os.getenv('ACTIVATION_HEARTBEAT_SECONDS', default='10'))  # SSE keep-alive
+    ACTIVATION_MAX_WAITERS = int(os.getenv('ACTIVATION_MAX_WAITERS', default='10000'))  # per worker; 0: no limit
     SECRET_KEY = os.getenv('SECRET_KEY', default='default_secret_key')
     ALGORITHM = 'HS256'
     ACCESS_TOKEN_EXPIRE_MINUTES = 30
     SMTP_SERVER = os.getenv('SMTP_SERVER', default='smtp.example.com')
-    SMTP_PORT = 587
+    SMTP_PORT = int(os.getenv('SMTP_PORT', default='587'))
+    MAIL_STARTTLS = os.getenv('MAIL_STARTTLS', default='true').lower() == 'true'
+    MAIL_SSL_TLS = os.getenv('MAIL_SSL_TLS', default='false').lower() == 'true'
+    MAIL_USE_CREDENTIALS = os.getenv('MAIL_USE_CREDENTIALS', default='true').lower() == 'true'
     MAIL_USERNAME = os.getenv('MAIL_USERNAME', default='your_email@example.com')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD', default='your_password')
     MAIL_FROM = os.getenv('MAIL_FROM', default='your_email@example.com')
+    EMAIL_TRANSPORT = os.getenv('EMAIL_TRANSPORT', default='fastapi_mail')  # fastapi_mail, smtp_pool, memory or file
+    SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', default='4'))  # Persistent connections of the smtp_pool transport
+    EMAIL_FILE_SINK_DIR = os.getenv('EMAIL_FILE_SINK_DIR', default='mail_sink')  # Where the file transport writes .eml files
     EMAIL_SERVICE_URL = os.getenv('EMAIL_SERVICE_URL', default='http://localhost:8003/')
     AUTH_SERVICE_URL = os.getenv('AUTH_SERVICE_URL', default='http://localhost:8002/')
+    AUTH_MODE = os.getenv('AUTH_MODE', default='remote')  # remote (HTTP to the Auth Service), rpc or local (in-process)
+    AUTH_RPC_LISTEN = os.getenv('AUTH_RPC_LISTEN', default='')  # host:port or unix:/path; empty disables
+    AUTH_RPC_ADDRESS = os.getenv('AUTH_RPC_ADDRESS', default='127.0.0.1:8012')  # Where AUTH_MODE=rpc connects
+    AUTH_RPC_POOL_SIZE = int(os.getenv('AUTH_RPC_POOL_SIZE', default='16'))  # Idle RPC connections kept per worker
     FERNET_KEY = os.getenv('FERNET_KEY', default='default_fernet_key')
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', default='false').lower() == 'true'
+    PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', default='0.01'))
+    PROFILING_HEADER = os.getenv('PROFILING_HEADER', default='X-Profile')
+    PROFILING_TOP_N = int(os.getenv('PROFILING_TOP_N', default='50'))
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', default='')  # Bearer token of the /admin endpoints; empty disables them
+    TRACING_ENABLED = os.getenv('TRACING_ENABLED', default='false').lower() == 'true'
+    TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', default='0.1'))
+    TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', default='memory')  # memory, file or otlp
+    TRACING_FILE_PATH = os.getenv('TRACING_FILE_PATH', default='traces/spans.jsonl')
+    TRACING_OTLP_ENDPOINT = os.getenv('TRACING_OTLP_ENDPOINT', default='http://localhost:4318')
+    ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', default='100'))  # 0 disables shedding
+    ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv('ADMISSION_RETRY_AFTER_SECONDS', default='1'))
+    HASH_CONCURRENCY = int(os.getenv('HASH_CONCURRENCY', default=str(os.cpu_count() or 1)))
+    HASH_QUEUE_MAX_WAITING = int(os.getenv('HASH_QUEUE_MAX_WAITING', default='32'))
+    HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv('HEALTH_CHECK_TIMEOUT_SECONDS', default='1.0'))
+    CLIENT_CONNECT_TIMEOUT_SECONDS = float(os.getenv('CLIENT_CONNECT_TIMEOUT_SECONDS', default='1.0'))
+    CLIENT_READ_TIMEOUT_SECONDS = float(os.getenv('CLIENT_READ_TIMEOUT_SECONDS', default='5.0'))
+    CLIENT_RETRY_ATTEMPTS = int(os.getenv('CLIENT_RETRY_ATTEMPTS', default='3'))
+    CLIENT_RETRY_BACKOFF_SECONDS = float(os.getenv('CLIENT_RETRY_BACKOFF_SECONDS', default='0.05'))
+    CLIENT_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv('CLIENT_RETRY_BACKOFF_MAX_SECONDS', default='1.0'))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', default='5'))
+    CIRCUIT_RECOVERY_SECONDS = float(os.getenv('CIRCUIT_RECOVERY_SECONDS', default='10'))
+    AUTH_VALIDATE_HEDGE_DELAY_SECONDS = float(os.getenv('AUTH_VALIDATE_HEDGE_DELAY_SECONDS', default='0'))  # 0 disables
 
 
 settings = Settings()
@@ -1,40 +1,303 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
 from datetime import timedelta, datetime
+from functools import lru_cache
+from typing import NamedTuple
 
 from jose import jwt
+from sqlalchemy import delete, event, func, insert, inspect, lambda_stmt, select, update
+from sqlalchemy.ext.horizontal_shard import set_shard_id
 from sqlalchemy.orm import Session
 
 from . import models
 from .config import settings
-from .models import User
+from .models import User, UserStat
+from .profiling import stage
+from .sharding import encode_user_id, locate_user_id, normalize_email, shard_id_for_email
 from passlib.context import CryptContext
 from cryptography.fernet import Fernet
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-cipher_suite = Fernet(settings.FERNET_KEY)
+class HashQueue:
+    """
+    Bounds how many bcrypt operations run at once and counts the callers waiting for a slot.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.waiting = 0
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        with self._lock:
+            self.waiting += 1
+        try:
+            self._slots.acquire()
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+
+hash_queue = HashQueue(settings.HASH_CONCURRENCY)
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context() -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+@lru_cache(maxsize=None)
+def get_cipher_suite() -> Fernet:
+    return Fernet(settings.FERNET_KEY)
+
+
+def _on_shard(query, shard_id: str | None):
+    # A sharded session runs the query on that shard only; without sharding there is a single database.
+    return query if shard_id is None else query.options(set_shard_id(shard_id))
 
 
 def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+    # Loads a tracked `User` for callers that change it; read-only paths use `get_user_credentials`
+    # Matches the unique index on lower(email); the shard is chosen from the same normalised email
+    email = normalize_email(email)
+    query = _on_shard(db.query(User).filter(func.lower(User.email) == email), shard_id_for_email(email))
+    with stage("db", "get_user_by_email"):
+        return query.first()
 
 
 def get_user_by_id(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    """
+    Look a user up by public id (`User.public_id`, as carried in auth tokens).
+    """
+    located = locate_user_id(user_id)
+    if located is None:
+        return None
+    shard_id, user_id = located
+    query = _on_shard(db.query(models.User).filter(models.User.id == user_id), shard_id)
+    with stage("db", "get_user_by_id"):
+        return query.first()
+
+
+class UserCredentials(NamedTuple):
+    """
+    The columns needed to check a password and mint an auth token (see `AuthEngine.issue_token`).
+    """
+    public_id: int
+    email: str
+    hashed_password: str
+    is_active: bool
+
+
+class UserProfile(NamedTuple):
+    """
+    The columns of the public user representation, `schemas.User`.
+    """
+    email: str
+    user_name: str
+    is_active: bool
+    source: str | None
+    user_identity: str | None
+
+
+def _shard_bind(shard_id: str | None) -> dict | None:
+    return None if shard_id is None else {"shard_id": shard_id}
+
+
+def get_user_credentials(db: Session, email: str) -> UserCredentials | None:
+    """
+    Read-only variant of `get_user_by_email` for logins. Selects four columns into a plain tuple instead of
+    loading a tracked `User`, and the lambda statement is built and cache-keyed once rather than per call.
+    """
+    email = normalize_email(email)
+    shard_id = shard_id_for_email(email)
+    statement = lambda_stmt(lambda: select(User.id, User.email, User.hashed_password, User.is_active)
+                            .where(func.lower(User.email) == email))
+    with stage("db", "get_user_credentials"):
+        row = db.execute(statement, bind_arguments=_shard_bind(shard_id)).first()
+    if row is None:
+        return None
+    public_id = row.id if shard_id is None else encode_user_id(int(shard_id), row.id)
+    return UserCredentials(public_id, row.email, row.hashed_password, row.is_active)
+
+
+def get_user_profile(db: Session, user_id: int) -> UserProfile | None:
+    """
+    Read-only variant of `get_user_by_id` returning just the public profile columns.
+    """
+    located = locate_user_id(user_id)
+    if located is None:
+        return None
+    shard_id, user_id = located
+    statement = lambda_stmt(lambda: select(User.email, User.user_name, User.is_active, User.source,
+                                           User.user_identity).where(User.id == user_id))
+    with stage("db", "get_user_profile"):
+        row = db.execute(statement, bind_arguments=_shard_bind(shard_id)).first()
+    return None if row is None else UserProfile(*row)
+
+
+def get_active_user_ids(db: Session, user_ids, batch_size: int = 500) -> set[int]:
+    """
+    The public ids among `user_ids` whose users are active, in one query per shard and `batch_size` ids.
+    """
+    by_shard = {}
+    for user_id in user_ids:
+        located = locate_user_id(user_id)
+        if located is None:
+            continue
+        shard_id, local_id = located
+        by_shard.setdefault(shard_id, {})[local_id] = user_id
+    active = set()
+    for shard_id, public_ids in by_shard.items():
+        local_ids = list(public_ids)
+        for start in range(0, len(local_ids), batch_size):
+            statement = select(User.id).where(User.id.in_(local_ids[start:start + batch_size]),
+                                              User.is_active == True)  # noqa: E712
+            with stage("db", "get_active_user_ids"):
+                rows = db.execute(statement, bind_arguments=_shard_bind(shard_id)).scalars().all()
+            active.update(public_ids[local_id] for local_id in rows)
+    return active
+
+
+def get_inactive_users(db: Session, after_id: int = 0, limit: int = 100, shard_id: str | None = None):
+    """
+    The next `limit` not yet activated users with an id above `after_id`, in id order (keyset pagination).
+    Ids are per shard, so a sharded database is paged one `shard_id` (see `database.get_shard_ids`) at a time.
+    """
+    query = (db.query(User).filter(User.is_active == False, User.id > after_id)  # noqa: E712
+             .order_by(User.id).limit(limit))
+    with stage("db", "get_inactive_users"):
+        return _on_shard(query, shard_id).all()
+
+
+def count_users(db: Session, source: str | None = None, user_identity: str | None = None) -> int:
+    """
+    Number of users, optionally only those with the given `source` and/or `user_identity`.
+    """
+    query = db.query(func.count(User.id))
+    if source is not None:
+        query = query.filter(User.source == source)
+    if user_identity is not None:
+        query = query.filter(User.user_identity == user_identity)
+    with stage("db", "count_users"):
+        # One row per shard when the count fans out over a sharded database
+        return sum(count for count, in query.all())
+
+
+def _stats_key(source, user_identity, is_active) -> tuple[str, str, bool]:
+    return source or "", user_identity or "", bool(is_active)
+
+
+def bump_user_stats(db: Session, shard_id: str | None, key: tuple[str, str, bool], delta: int):
+    """
+    Add `delta` to the `user_stats` counter of `key` (see `_stats_key`) on `shard_id`, in the caller's transaction.
+    """
+    bind_arguments = _shard_bind(shard_id)
+    table = UserStat.__table__
+    dialect = db.get_bind(UserStat, **(bind_arguments or {})).dialect.name
+    values = dict(zip(("source", "user_identity", "is_active"), key), count=delta)
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        statement = upsert(table).values(**values)
+        statement = statement.on_conflict_do_update(index_elements=list(table.primary_key.columns),
+                                                    set_={"count": table.c.count + statement.excluded.count})
+        db.execute(statement, bind_arguments=bind_arguments)
+        return
+    match = (table.c.source == key[0], table.c.user_identity == key[1], table.c.is_active == key[2])
+    if not db.execute(update(table).where(*match).values(count=table.c.count + delta),
+                      bind_arguments=bind_arguments).rowcount:
+        db.execute(insert(table).values(**values), bind_arguments=bind_arguments)
+
+
+def _track_user_stats(session: Session, flush_context):
+    # Runs inside every flush, so the counters change in the same transaction as the users they count.
+    deltas = Counter()
+    for user in session.new:
+        if isinstance(user, User):
+            deltas[shard_id_for_email(user.email), _stats_key(user.source, user.user_identity, user.is_active)] += 1
+    for user in session.deleted:
+        if isinstance(user, User):
+            deltas[inspect(user).identity_token, _stats_key(user.source, user.user_identity, user.is_active)] -= 1
+    for user in session.dirty:
+        if not isinstance(user, User):
+            continue
+        state = inspect(user)
+        before, after = [], []
+        for name in ("source", "user_identity", "is_active"):
+            history = state.attrs[name].history
+            before.append((history.deleted or history.unchanged or [None])[0])
+            after.append(getattr(user, name))
+        if _stats_key(*before) != _stats_key(*after):
+            shard_id = state.identity_token
+            deltas[shard_id, _stats_key(*before)] -= 1
+            deltas[shard_id, _stats_key(*after)] += 1
+    for (shard_id, key), delta in deltas.items():
+        if delta:
+            bump_user_stats(session, shard_id, key, delta)
+
+
+event.listen(Session, "after_flush", _track_user_stats)
+
+
+def subtract_user_stats(db: Session, *criteria):
+    """
+    Take the users matching `criteria` off the counters, ahead of a bulk delete (which bypasses the flush hook).
+    Runs on the database `db` is bound to; pass a per-shard session when sharded.
+    """
+    columns = (User.source, User.user_identity, User.is_active)
+    for source, user_identity, is_active, count in db.execute(
+            select(*columns, func.count()).where(*criteria).group_by(*columns)).all():
+        bump_user_stats(db, None, _stats_key(source, user_identity, is_active), -count)
+
+
+def remove_stale_users(db: Session, user_ids: list[int], sent_before: datetime, archive: bool = False) -> int:
+    """
+    Delete (or move to `archived_users`) those of `user_ids` that are still inactive and whose latest activation
+    email went out before `sent_before`. The conditions are re-checked in the statements themselves, so an
+    account activated since it was selected is kept. The caller commits.
+
+    Returns the number of accounts removed.
+    """
+    stale = (User.id.in_(user_ids), User.is_active == False, User.activation_sent_at < sent_before)  # noqa: E712
+    with stage("db", "remove_stale_users"):
+        subtract_user_stats(db, *stale)
+        if archive:
+            columns = [column.key for column in User.__table__.columns]
+            archived = ["user_id" if key == "id" else key for key in columns]
+            db.execute(insert(models.ArchivedUser).from_select(
+                archived, select(*(getattr(User, key) for key in columns)).where(*stale)))
+        return db.execute(delete(User).where(*stale)).rowcount
 
 
 def create_user(db: Session, user_create):
     #uuid
-    hashed_password = pwd_context.hash(user_create.password)
+    hashed_password = hash_password(user_create.password)
     db_user = User(email=user_create.email, user_name=user_create.user_name, hashed_password=hashed_password,
                    source=user_create.source, user_identity=user_create.user_identity)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    with stage("db", "create_user"):
+        db.add(db_user)
+        db.commit()
+        db.refresh(db_user)
     return db_user
 
 
+def hash_password(plain_password):
+    with stage("hash", "hash_password"), hash_queue.slot():
+        return get_pwd_context().hash(plain_password)
+
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    with stage("hash", "verify_password"), hash_queue.slot():
+        return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def generate_auth_token(user_id: int, email: str, expiration: int) -> str:
@@ -62,10 +325,10 @@ def generate_active_token(email: str, expiration: int) -> str:
 
 
 def encrypt_user_id(user_id: int) -> str:
-    encrypted_identity = cipher_suite.encrypt(str(user_id).encode('utf-8'))
+    encrypted_identity = get_cipher_suite().encrypt(str(user_id).encode('utf-8'))
     return encrypted_identity.decode('utf-8')
 
 
 def decrypt_user_id(encrypted_id: str) -> str:
-    decrypted_identity = cipher_suite.decrypt(encrypted_id.encode('utf-8'))
+    decrypted_identity = get_cipher_suite().decrypt(encrypted_id.encode('utf-8'))
     return decrypted_identity.decode('utf-8')
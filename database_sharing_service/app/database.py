@@ -1,21 +1,334 @@
-from sqlalchemy import create_engine
+import hashlib
+import hmac
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from http.cookies import SimpleCookie
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session, sessionmaker
 from .config import settings
+from .logging_config import get_logger
+from .metrics import registry
+from .sharding import get_shard_map, shard_id_for_email
 
-# Create the SQLAlchemy engine using the PostgreSQL URL
-engine = create_engine(settings.DATABASE_URL)
-
-# Create a configured "Session" class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+logger = get_logger("Database")
 
 # Base class for our classes definitions.
 Base = declarative_base()
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
+# Read-your-writes: after a write, the client's reads are pinned to the primary for REPLICA_STICKY_SECONDS.
+PRIMARY_PIN_COOKIE = "db_primary_until"
+# Set by the service clients so a downstream service honours the caller's pin. Its value is derived from
+# SECRET_KEY, so external clients can't pin their reads to the primary with it.
+PRIMARY_PIN_HEADER = "X-DB-Read-Primary"
+
+read_sessions = registry.counter("db_read_sessions_total",
+                                 "Read-only sessions handed out, by the database they were routed to.", ("target",))
+
+
+def _create_engine(url: str, **kwargs):
+    # SQLite connections are shared between the threadpool workers FastAPI runs sync endpoints on
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    return create_engine(url, connect_args=connect_args, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def get_engine():
+    """
+    Create the SQLAlchemy engine on first use, so importing a service doesn't load the database driver.
+    """
+    return _create_engine(settings.DATABASE_URL)
+
+
+@lru_cache(maxsize=None)
+def get_shard_engines() -> dict:
+    """
+    Engine per shard identifier ("0", "1", ...) when DATABASE_SHARD_URLS is set, else empty.
+    """
+    return {str(index): _create_engine(url) for index, url in enumerate(settings.DATABASE_SHARD_URLS)}
+
+
+def get_engines() -> dict:
+    """
+    Every database the users live in: the shards, or the single primary.
+    """
+    return get_shard_engines() or {"primary": get_engine()}
+
+
+def get_shard_ids() -> list[str | None]:
+    """
+    Shard identifiers to iterate for per-shard work; `[None]` (the whole database) when sharding is off.
+    """
+    return list(get_shard_engines()) or [None]
+
+
+def _choose_shard(mapper, instance, clause=None, **kw):
+    # New rows go to the shard owning their email.
+    if instance is None or instance.email is None:
+        raise ValueError("Cannot choose a shard without a user email; run per-shard statements with set_shard_id")
+    return shard_id_for_email(instance.email)
+
+
+def _all_shards(*args, **kw):
+    # Identity lookups and unrouted queries fan out to every shard; crud routes the hot lookups.
+    return list(get_shard_engines())
+
+
+@lru_cache(maxsize=None)
+def get_sessionmaker():
+    # Create a configured "Session" class
+    if get_shard_map() is not None:
+        return sessionmaker(class_=ShardedSession, autocommit=False, autoflush=False, shards=get_shard_engines(),
+                            shard_chooser=_choose_shard, identity_chooser=_all_shards, execute_chooser=_all_shards)
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+class _RoutingState:
+    """
+    Routing state of the current request. Mutable, so that sessions opened on threadpool workers (which
+    run in a copy of the request context) can record their writes where the middleware sees them.
+    """
+
+    def __init__(self, pinned: bool = False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_routing_state: ContextVar[_RoutingState | None] = ContextVar("db_routing_state", default=None)
+
+
+def _record_write(session, flush_context):
+    state = _routing_state.get()
+    if state is not None:
+        state.wrote = True
+
+
+def reads_pinned_to_primary() -> bool:
+    """
+    True when the current request wrote, or its client wrote within the last REPLICA_STICKY_SECONDS.
+    """
+    state = _routing_state.get()
+    return state is not None and (state.pinned or state.wrote)
+
+
+@lru_cache(maxsize=None)
+def primary_pin_token() -> str:
+    """
+    The PRIMARY_PIN_HEADER value the services accept from each other.
+    """
+    return hmac.new(settings.SECRET_KEY.encode(), b"db-read-primary", hashlib.sha256).hexdigest()
+
+
+def is_primary_pin_token(value) -> bool:
+    """
+    True when `value`, received from another service, is the `primary_pin_token`.
+    """
+    return isinstance(value, str) and hmac.compare_digest(value.encode(), primary_pin_token().encode())
+
+
+def _sign_pin_expiry(until: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), b"db-read-primary:" + until.encode(), hashlib.sha256).hexdigest()
+
+
+def primary_pin_headers() -> dict:
+    """
+    Headers that carry the current request's primary pin to a downstream service.
+    """
+    return {PRIMARY_PIN_HEADER: primary_pin_token()} if reads_pinned_to_primary() else {}
+
+
+@contextmanager
+def primary_pin(pinned: bool):
+    """
+    Route the reads of the enclosed block as for a request carrying (or not) the primary pin; for entry
+    points other than HTTP requests, such as the internal RPC server.
+    """
+    token = _routing_state.set(_RoutingState(pinned))
+    try:
+        yield
+    finally:
+        _routing_state.reset(token)
+
+
+class ReplicaPool:
+    """
+    Read replicas handed out round-robin. A replica that fails to connect is skipped for `retry_after` seconds.
+    """
+
+    def __init__(self, urls: list[str], retry_after: float):
+        # pool_pre_ping detects connections to a replica that went away since they were pooled
+        self.engines = [_create_engine(url, pool_pre_ping=True) for url in urls]
+        self.sessionmakers = {engine: sessionmaker(autocommit=False, autoflush=False, bind=engine)
+                              for engine in self.engines}
+        self.retry_after = retry_after
+        self._down_until = {}
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+
+    def candidates(self) -> list:
+        """
+        The healthy replicas, starting with the next one in round-robin order.
+        """
+        now = time.monotonic()
+        with self._lock:
+            start = next(self._next) % len(self.engines)
+            rotated = self.engines[start:] + self.engines[:start]
+            return [engine for engine in rotated if self._down_until.get(engine, 0.0) <= now]
+
+    def mark_down(self, engine):
+        with self._lock:
+            self._down_until[engine] = time.monotonic() + self.retry_after
+
+
+class SessionRouter:
+    """
+    Hands out sessions on the primary for read-write work and on a replica for read-only work.
+
+    Reads stay on the primary when no replica is configured or healthy, and while the current
+    request is pinned (see `reads_pinned_to_primary`). Read sessions must not be used for writes.
+    """
+
+    def __init__(self, primary: sessionmaker, replicas: ReplicaPool | None = None):
+        self.primary = primary
+        self.replicas = replicas
+
+    def write_session(self) -> Session:
+        session = self.primary()
+        event.listen(session, "after_flush", _record_write)
+        return session
+
+    def read_session(self) -> Session:
+        if self.replicas is None:
+            read_sessions.inc(target="primary")
+            return self.primary()
+        if reads_pinned_to_primary():
+            read_sessions.inc(target="pinned")
+            return self.primary()
+        for engine in self.replicas.candidates():
+            session = self.replicas.sessionmakers[engine]()
+            try:
+                # Connect now, so an unreachable replica is detected before the endpoint queries it.
+                session.connection()
+            except DBAPIError as e:
+                session.close()
+                self.replicas.mark_down(engine)
+                logger.warning(f"Replica {engine.url!r} unavailable, skipping it for "
+                               f"{self.replicas.retry_after}s: {e.orig}")
+                continue
+            read_sessions.inc(target="replica")
+            return session
+        read_sessions.inc(target="fallback")
+        return self.primary()
+
+
+@lru_cache(maxsize=None)
+def get_session_router() -> SessionRouter:
+    replicas = None
+    if settings.DATABASE_REPLICA_URLS and settings.DATABASE_SHARD_URLS:
+        logger.warning("DATABASE_REPLICA_URLS is ignored while the users table is sharded")
+    elif settings.DATABASE_REPLICA_URLS:
+        replicas = ReplicaPool(settings.DATABASE_REPLICA_URLS, settings.REPLICA_RETRY_SECONDS)
+    return SessionRouter(get_sessionmaker(), replicas)
+
+
+def __getattr__(name):
+    # `engine` and `SessionLocal` used to be built at import time; keep them importable.
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Dependency to get a read-write DB session on the primary
+def get_write_db():
+    db = get_session_router().write_session()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Dependency to get a read-only DB session, on a replica when one is available
+def get_read_db():
+    db = get_session_router().read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+get_db = get_write_db
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware pinning a client's reads to the primary after it wrote: a request that flushed
+    changes gets a cookie valid for `sticky_seconds`, and requests carrying it (or the
+    PRIMARY_PIN_HEADER set by an upstream service) read from the primary. The header is only honoured
+    with the internal `primary_pin_token`, and the cookie only with its signed expiry no more than
+    `sticky_seconds` ahead; anything else a client sends in them is ignored.
+    """
+
+    def __init__(self, app, sticky_seconds: float):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+        self._header = PRIMARY_PIN_HEADER.lower().encode()
+        self._token = primary_pin_token().encode()
+
+    def _pinned(self, headers) -> bool:
+        for name, value in headers:
+            if name == self._header and hmac.compare_digest(value, self._token):
+                return True
+            if name == b"cookie":
+                morsel = SimpleCookie(value.decode("latin-1")).get(PRIMARY_PIN_COOKIE)
+                if morsel is not None and self._valid_pin(morsel.value):
+                    return True
+        return False
+
+    def _valid_pin(self, value: str) -> bool:
+        until, _, signature = value.partition("-")
+        if not hmac.compare_digest(signature, _sign_pin_expiry(until)):
+            return False
+        try:
+            remaining = float(until) - time.time()
+        except ValueError:
+            return False
+        return 0 < remaining <= self.sticky_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        state = _routing_state.get() or _RoutingState()
+        state.pinned = state.pinned or self._pinned(scope["headers"])
+        token = _routing_state.set(state)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and state.wrote:
+                until = f"{time.time() + self.sticky_seconds:.3f}"
+                cookie = (f"{PRIMARY_PIN_COOKIE}={until}-{_sign_pin_expiry(until)}; "
+                          f"Max-Age={math.ceil(self.sticky_seconds)}; Path=/; HttpOnly; SameSite=Lax")
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _routing_state.reset(token)
+
+
+def install_read_routing(app):
+    """
+    Enable read-your-writes pinning on `app` when read replicas are configured.
+    """
+    if settings.DATABASE_REPLICA_URLS and not settings.DATABASE_SHARD_URLS and settings.REPLICA_STICKY_SECONDS > 0:
+        app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=settings.REPLICA_STICKY_SECONDS)
@@ -0,0 +1,164 @@
+from typing import Callable
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from .config import settings
+from .logging_config import get_logger
+
+logger = get_logger("Health")
+
+# Probe endpoints are never shed, so the orchestrator can still see an overloaded worker.
+PROBE_PATHS = ("/healthz", "/readyz")
+
+
+class AdmissionState:
+    """
+    In-flight request counter shared between the admission middleware and the readiness probe.
+    A `max_in_flight` of 0 disables shedding.
+    """
+
+    def __init__(self, max_in_flight: int, retry_after: int):
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.shed = 0
+        # Paths of long-lived requests (e.g. activation status streams) that are not counted or shed
+        self.exempt_prefixes: tuple[str, ...] = ()
+
+    @property
+    def saturated(self) -> bool:
+        return 0 < self.max_in_flight <= self.in_flight
+
+
+class AdmissionController:
+    """
+    ASGI middleware that rejects HTTP requests with 503 and a Retry-After header once `max_in_flight`
+    requests are already being handled, so overload degrades into fast rejections instead of timeouts.
+    """
+
+    def __init__(self, app, state: AdmissionState):
+        self.app = app
+        self.state = state
+
+    async def __call__(self, scope, receive, send):
+        state = self.state
+        if scope["type"] != "http" or scope["path"] in PROBE_PATHS or scope["path"].startswith(state.exempt_prefixes):
+            await self.app(scope, receive, send)
+            return
+        if state.saturated:
+            state.shed += 1
+            response = JSONResponse({"detail": "Service overloaded, retry later"}, status_code=503,
+                                    headers={"Retry-After": str(state.retry_after)})
+            await response(scope, receive, send)
+            return
+        # The event loop is single threaded, so the counter needs no lock.
+        state.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            state.in_flight -= 1
+
+
+def check_database() -> tuple[bool, dict]:
+    """
+    Ready when the connection pool still has a free connection and the database answers `SELECT 1`;
+    with a sharded users table, when that holds for every shard.
+    """
+    from .database import get_engine, get_shard_engines
+
+    shard_engines = get_shard_engines()
+    if not shard_engines:
+        return _check_engine(get_engine())
+    results = {shard_id: _check_engine(engine) for shard_id, engine in shard_engines.items()}
+    return all(ready for ready, _ in results.values()), {"shards": {shard_id: detail
+                                                                   for shard_id, (_, detail) in results.items()}}
+
+
+def _check_engine(engine) -> tuple[bool, dict]:
+    # Imported here so a service without database checks (the Email Service) never loads SQLAlchemy.
+    from sqlalchemy import text
+    from sqlalchemy.pool import QueuePool
+
+    pool = engine.pool
+    detail = {"pool": pool.status()}
+    if isinstance(pool, QueuePool):
+        max_overflow = pool._max_overflow  # QueuePool has no public accessor; -1 means unbounded
+        capacity = pool.size() + max(max_overflow, 0)
+        detail.update({"checked_out": pool.checkedout(), "capacity": capacity})
+        if max_overflow >= 0 and pool.checkedout() >= capacity:
+            # Checking out another connection would block for the pool timeout.
+            detail["error"] = "connection pool exhausted"
+            return False, detail
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        detail["error"] = str(e)
+        return False, detail
+    return True, detail
+
+
+def check_downstream(base_url: str) -> Callable[[], tuple[bool, dict]]:
+    """
+    Build a check that is ready when the service at `base_url` answers its `/healthz` probe.
+    """
+    def check() -> tuple[bool, dict]:
+        import requests
+
+        url = f"{base_url.rstrip('/')}/healthz"
+        try:
+            response = requests.get(url, timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS)
+        except requests.exceptions.RequestException as e:
+            return False, {"url": url, "error": str(e)}
+        return response.status_code == 200, {"url": url, "status_code": response.status_code}
+
+    return check
+
+
+def check_hash_queue() -> tuple[bool, dict]:
+    """
+    Ready while fewer than HASH_QUEUE_MAX_WAITING requests are waiting for a password hashing slot.
+    """
+    from .crud import hash_queue
+
+    detail = {"waiting": hash_queue.waiting, "max_waiting": settings.HASH_QUEUE_MAX_WAITING,
+              "concurrency": hash_queue.concurrency}
+    return hash_queue.waiting < settings.HASH_QUEUE_MAX_WAITING, detail
+
+
+def install_health(app: FastAPI, checks: dict[str, Callable[[], tuple[bool, dict]]]) -> AdmissionState:
+    """
+    Add `GET /healthz` (liveness), `GET /readyz` (readiness) and the admission-control middleware to `app`.
+
+    - **checks**: Named readiness checks, each returning (ready, detail).
+
+    Returns the admission state so its counters can be inspected.
+    """
+    admission = AdmissionState(settings.ADMISSION_MAX_IN_FLIGHT, settings.ADMISSION_RETRY_AFTER_SECONDS)
+    app.add_middleware(AdmissionController, state=admission)
+
+    @app.get("/healthz", tags=["Health"], summary="Liveness Probe",
+             description="Report that the process is up and serving requests.")
+    def healthz():
+        return {"status": "ok"}
+
+    @app.get("/readyz", tags=["Health"], summary="Readiness Probe",
+             description="Report whether the service can take traffic: database pool, downstream services and "
+                         "internal queue depth.")
+    def readyz():
+        results = {"admission": {"ready": not admission.saturated, "in_flight": admission.in_flight,
+                                 "max_in_flight": admission.max_in_flight, "shed": admission.shed}}
+        ready = not admission.saturated
+        for name, check in checks.items():
+            try:
+                ok, detail = check()
+            except Exception as e:
+                logger.error(f"Readiness check {name} failed: {str(e)}")
+                ok, detail = False, {"error": str(e)}
+            results[name] = {"ready": ok, **detail}
+            ready = ready and ok
+        return JSONResponse({"status": "ready" if ready else "unavailable", "checks": results},
+                            status_code=200 if ready else 503)
+
+    return admission
@@ -0,0 +1,261 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+from .logging_config import get_logger
+from .metrics import registry
+
+logger = get_logger("Idempotency")
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Outcomes of `IdempotencyStore.begin`
+NEW, REPLAY, IN_FLIGHT, MISMATCH = "new", "replay", "in_flight", "mismatch"
+
+idempotency_requests = registry.counter("idempotency_requests_total",
+                                        "Requests carrying an Idempotency-Key, by outcome.", ("outcome",))
+
+
+class StoredResponse:
+    def __init__(self, status_code: int, headers: list[tuple[str, str]], body: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+
+class MemoryIdempotencyStore:
+    """
+    Per-process store holding at most `capacity` keys, each for `ttl` seconds (`lock_ttl` while in flight).
+    Only deduplicates retries that reach the same worker; use the database store with several workers.
+    """
+
+    blocking = False
+
+    def __init__(self, capacity: int, ttl: float, lock_ttl: float):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        # key -> [fingerprint, expires_at, StoredResponse | None], oldest first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def begin(self, key: str, fingerprint: str) -> tuple[str, StoredResponse | None]:
+        """
+        Claim `key` for a request whose body hashes to `fingerprint`, or report why it can't be claimed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                if entry[0] != fingerprint:
+                    return MISMATCH, None
+                return (REPLAY, entry[2]) if entry[2] is not None else (IN_FLIGHT, None)
+            self._entries.pop(key, None)
+            self._entries[key] = [fingerprint, now + self.lock_ttl, None]
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return NEW, None
+
+    def complete(self, key: str, response: StoredResponse):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1:] = [time.monotonic() + self.ttl, response]
+
+    def release(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class DatabaseIdempotencyStore:
+    """
+    Store in the `idempotency_keys` table, shared by every worker. Expired rows are deleted as new keys
+    are claimed, which keeps the table bounded by the request rate times the TTL.
+    """
+
+    blocking = True
+
+    def __init__(self, session_factory, ttl: float, lock_ttl: float):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+
+    def begin(self, key: str, fingerprint: str) -> tuple[str, StoredResponse | None]:
+        from sqlalchemy.exc import IntegrityError
+
+        from .models import IdempotencyKey
+
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            db.query(IdempotencyKey).filter(IdempotencyKey.expires_at <= now).delete(synchronize_session=False)
+            db.add(IdempotencyKey(key=key, fingerprint=fingerprint, expires_at=now + timedelta(seconds=self.lock_ttl)))
+            try:
+                db.commit()
+                return NEW, None
+            except IntegrityError:
+                db.rollback()
+            row = db.get(IdempotencyKey, key)
+            if row is None:
+                # Released between our insert and this read; let the client retry.
+                return IN_FLIGHT, None
+            if row.fingerprint != fingerprint:
+                return MISMATCH, None
+            if row.status_code is None:
+                return IN_FLIGHT, None
+            headers = [tuple(header) for header in json.loads(row.headers)]
+            return REPLAY, StoredResponse(row.status_code, headers, row.body)
+
+    def complete(self, key: str, response: StoredResponse):
+        from .models import IdempotencyKey
+
+        with self.session_factory() as db:
+            db.query(IdempotencyKey).filter(IdempotencyKey.key == key).update({
+                "status_code": response.status_code, "headers": json.dumps(response.headers), "body": response.body,
+                "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)}, synchronize_session=False)
+            db.commit()
+
+    def release(self, key: str):
+        from .models import IdempotencyKey
+
+        with self.session_factory() as db:
+            db.query(IdempotencyKey).filter(IdempotencyKey.key == key).delete(synchronize_session=False)
+            db.commit()
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware making POSTs to `paths` idempotent for clients that send an Idempotency-Key header.
+
+    The first request with a key runs and its response (unless a 5xx) is stored; repeats with the same key
+    and body get the stored response without running the handler. A repeat arriving while the first is still
+    running gets 409, one with a different body 422.
+    """
+
+    def __init__(self, app, store, paths: tuple[str, ...]):
+        self.app = app
+        self.store = store
+        self.paths = paths
+        self._header = IDEMPOTENCY_HEADER.lower().encode()
+
+    async def _call(self, method, *args):
+        if self.store.blocking:
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = next((value.decode("latin-1") for name, value in scope["headers"] if name == self._header),
+                               None)
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+
+        # Buffer the body to fingerprint it, then hand it to the app as if it had not been read.
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        key = f"{scope['path']}:{idempotency_key}"
+        fingerprint = hashlib.sha256(body + b"?" + scope.get("query_string", b"")).hexdigest()
+
+        outcome, stored = await self._call(self.store.begin, key, fingerprint)
+        idempotency_requests.inc(outcome=outcome)
+        if outcome == REPLAY:
+            await send({"type": "http.response.start", "status": stored.status_code,
+                        "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers]
+                        + [(REPLAYED_HEADER.lower().encode(), b"true")]})
+            await send({"type": "http.response.body", "body": stored.body})
+            return
+        if outcome != NEW:
+            logger.warning(f"Rejected {scope['path']} with Idempotency-Key {idempotency_key}: {outcome}")
+            conflict = outcome == IN_FLIGHT
+            detail = ("A request with this Idempotency-Key is already being processed" if conflict
+                      else "Idempotency-Key was already used with a different request")
+            response = JSONResponse({"detail": detail}, status_code=409 if conflict else 422,
+                                    headers={"Retry-After": "1"} if conflict else None)
+            await response(scope, receive, send)
+            return
+
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = {"status": None, "headers": [], "body": []}
+        finished = False
+
+        async def capture_send(message):
+            nonlocal finished
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [(name.decode("latin-1"), value.decode("latin-1"))
+                                       for name, value in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+                if not message.get("more_body", False) and not finished:
+                    finished = True
+                    # Store before background tasks run, so retries arriving meanwhile are replayed.
+                    await self._finish(key, response)
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            if not finished:
+                await self._call(self.store.release, key)
+
+    async def _finish(self, key: str, response: dict):
+        if response["status"] >= 500:
+            await self._call(self.store.release, key)
+            return
+        headers = [(name, value) for name, value in response["headers"]
+                   if name.lower() not in ("set-cookie", "traceparent")]
+        await self._call(self.store.complete, key,
+                         StoredResponse(response["status"], headers, b"".join(response["body"])))
+
+
+def create_idempotency_store():
+    if settings.IDEMPOTENCY_STORE == "database":
+        from sqlalchemy.orm import sessionmaker
+
+        from .database import get_engine
+
+        # Always DATABASE_URL, also when the users table is sharded
+        return DatabaseIdempotencyStore(sessionmaker(bind=get_engine()), settings.IDEMPOTENCY_TTL_SECONDS,
+                                        settings.IDEMPOTENCY_LOCK_SECONDS)
+    if settings.IDEMPOTENCY_STORE != "memory":
+        raise ValueError(f"Unknown IDEMPOTENCY_STORE '{settings.IDEMPOTENCY_STORE}', expected memory or database")
+    return MemoryIdempotencyStore(settings.IDEMPOTENCY_MAX_KEYS, settings.IDEMPOTENCY_TTL_SECONDS,
+                                  settings.IDEMPOTENCY_LOCK_SECONDS)
+
+
+def install_idempotency(app: FastAPI, paths: tuple[str, ...]):
+    """
+    Honour Idempotency-Key headers on POSTs to `paths` of `app`.
+
+    Returns the store, so tests can inspect it.
+    """
+    store = create_idempotency_store()
+    app.add_middleware(IdempotencyMiddleware, store=store, paths=paths)
+    return store
@@ -1,12 +1,4 @@
 import logging
-import os
-
-from dotenv import load_dotenv
-
-current_directory = os.path.dirname(os.path.abspath(__file__))
-dotenv_path = os.path.join(current_directory, f'../../.env')
-
-load_dotenv(dotenv_path)
 
 
 class ServiceLoggerAdapter(logging.LoggerAdapter):
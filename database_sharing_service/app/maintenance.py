@@ -0,0 +1,155 @@
+"""
+Background maintenance: purge (or archive) accounts whose activation email was never clicked.
+
+The job walks the inactive users through the partial index on their ids in small keyset batches, one short
+transaction per batch with a pause in between, so it never holds locks on the users table for long.
+
+    python -m database_sharing_service.app.maintenance --mode archive
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .crud import get_inactive_users, remove_stale_users
+from .database import get_engines
+from .logging_config import get_logger
+from .metrics import registry
+
+logger = get_logger("Maintenance")
+
+CLEANUP_MODES = ("delete", "archive")
+
+cleanup_rows = registry.counter("stale_account_cleanup_rows_total",
+                                "Unactivated accounts examined and removed by the stale account cleanup.", ("outcome",))
+cleanup_runs = registry.counter("stale_account_cleanup_runs_total", "Completed stale account cleanup runs.")
+
+
+class CleanupReport:
+    """
+    Rows processed by one cleanup run.
+    """
+
+    def __init__(self, mode: str, cutoff: datetime):
+        self.mode = mode
+        self.cutoff = cutoff
+        self.scanned = 0
+        self.removed = 0
+        self.batches = 0
+        self.duration_s = 0.0
+
+    def to_dict(self) -> dict:
+        return {"mode": self.mode, "cutoff": self.cutoff.isoformat(), "scanned": self.scanned,
+                "removed": self.removed, "batches": self.batches, "duration_s": round(self.duration_s, 3)}
+
+
+def cleanup_stale_accounts(engines: dict | None = None, ttl_hours: float | None = None,
+                           batch_size: int | None = None, pause: float | None = None, mode: str | None = None,
+                           now: datetime | None = None) -> CleanupReport:
+    """
+    Remove the unactivated accounts whose latest activation email is older than `ttl_hours`, from every
+    database in `engines` (default: the primary, or every shard).
+
+    - **mode**: "delete" drops the rows, "archive" moves them to `archived_users`.
+    - **pause**: Seconds to sleep between batches.
+    """
+    engines = engines or get_engines()
+    ttl_hours = settings.UNACTIVATED_ACCOUNT_TTL_HOURS if ttl_hours is None else ttl_hours
+    batch_size = batch_size or settings.CLEANUP_BATCH_SIZE
+    pause = settings.CLEANUP_BATCH_PAUSE_SECONDS if pause is None else pause
+    mode = mode or settings.CLEANUP_MODE
+    if mode not in CLEANUP_MODES:
+        raise ValueError(f"Unknown cleanup mode '{mode}', expected one of {CLEANUP_MODES}")
+    report = CleanupReport(mode, (now or datetime.utcnow()) - timedelta(hours=ttl_hours))
+    started = time.perf_counter()
+
+    for name, engine in engines.items():
+        after_id = 0
+        while True:
+            with Session(engine) as db:
+                batch = [(user.id, user.activation_sent_at)
+                         for user in get_inactive_users(db, after_id=after_id, limit=batch_size)]
+                stale = [user_id for user_id, sent_at in batch if sent_at is not None and sent_at < report.cutoff]
+                removed = remove_stale_users(db, stale, report.cutoff, archive=mode == "archive") if stale else 0
+                db.commit()
+            report.batches += 1
+            report.scanned += len(batch)
+            report.removed += removed
+            cleanup_rows.inc(len(batch), outcome="scanned")
+            cleanup_rows.inc(removed, outcome="removed")
+            if len(batch) < batch_size:
+                break
+            after_id = batch[-1][0]
+            time.sleep(pause)
+
+    report.duration_s = time.perf_counter() - started
+    cleanup_runs.inc()
+    logger.info(f"Stale account cleanup: {report.to_dict()}")
+    return report
+
+
+class CleanupScheduler:
+    """
+    Runs `cleanup_stale_accounts` every `interval` seconds on a daemon thread.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.last_report: CleanupReport | None = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.last_report = cleanup_stale_accounts()
+            except Exception as e:
+                logger.error(f"Stale account cleanup failed: {str(e)}")
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stale-account-cleanup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def install_maintenance(app: FastAPI) -> CleanupScheduler | None:
+    """
+    Schedule the stale account cleanup for the lifetime of `app` when CLEANUP_INTERVAL_SECONDS is set.
+
+    Every worker it is enabled on runs the job, so enable it on a single instance (or use the CLI from cron).
+    """
+    if settings.CLEANUP_INTERVAL_SECONDS <= 0:
+        return None
+    scheduler = CleanupScheduler(settings.CLEANUP_INTERVAL_SECONDS)
+    app.add_event_handler("startup", scheduler.start)
+    app.add_event_handler("shutdown", scheduler.stop)
+    return scheduler
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=CLEANUP_MODES, default=settings.CLEANUP_MODE)
+    parser.add_argument("--ttl-hours", type=float, default=settings.UNACTIVATED_ACCOUNT_TTL_HOURS)
+    parser.add_argument("--batch-size", type=int, default=settings.CLEANUP_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=settings.CLEANUP_BATCH_PAUSE_SECONDS)
+    args = parser.parse_args(argv)
+
+    report = cleanup_stale_accounts(ttl_hours=args.ttl_hours, batch_size=args.batch_size, pause=args.pause,
+                                    mode=args.mode)
+    print(json.dumps(report.to_dict()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,87 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String, Boolean, Index, Text, func, inspect
 from .database import Base
+from .sharding import encode_user_id
 
 
 class User(Base):
     __tablename__ = 'users'
 
     id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True, nullable=False)
+    email = Column(String, nullable=False)
     user_name = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=False)
     source = Column(String, nullable=True)
     user_identity = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # When the latest activation email went out; unactivated accounts are purged some time after it.
+    activation_sent_at = Column(DateTime, default=datetime.utcnow)
+
+    # Keep in sync with the Alembic revisions in database_sharing_service/migrations.
+    __table_args__ = (
+        # Emails are looked up case-insensitively, so uniqueness is enforced on the normalised form.
+        Index("ix_users_email_lower", func.lower(email), unique=True),
+        # Only the (small) set of not yet activated users, for activation sweeps.
+        Index("ix_users_inactive_id", id, sqlite_where=is_active == False, postgresql_where=is_active == False),
+        Index("ix_users_source", source),
+        Index("ix_users_user_identity", user_identity),
+    )
+
+    @property
+    def public_id(self) -> int:
+        """
+        The id handed out in tokens: the primary key, with the shard index embedded when the row was
+        loaded from a shard.
+        """
+        shard_id = inspect(self).identity_token
+        return self.id if shard_id is None else encode_user_id(int(shard_id), self.id)
+
+
+class ArchivedUser(Base):
+    """
+    Unactivated accounts removed by the stale account cleanup when it runs with CLEANUP_MODE=archive.
+    `user_id` is the former `users.id`; ids can be reused after a delete, so it is not unique here.
+    """
+    __tablename__ = 'archived_users'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    email = Column(String, nullable=False)
+    user_name = Column(String, nullable=False)
+    hashed_password = Column(String, nullable=False)
+    is_active = Column(Boolean, default=False)
+    source = Column(String, nullable=True)
+    user_identity = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+    activation_sent_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class IdempotencyKey(Base):
+    """
+    Responses stored by the idempotency middleware when IDEMPOTENCY_STORE=database.
+    A row without a status code is a request still being handled.
+    """
+    __tablename__ = 'idempotency_keys'
+
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    headers = Column(Text, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class UserStat(Base):
+    """
+    Number of users per (source, user_identity, is_active), maintained by crud alongside every change to `users`
+    (a NULL source or identity is stored as ''), so dashboards don't have to count the users table.
+    """
+    __tablename__ = 'user_stats'
+
+    source = Column(String, primary_key=True, default='')
+    user_identity = Column(String, primary_key=True, default='')
+    is_active = Column(Boolean, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
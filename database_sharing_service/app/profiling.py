@@ -0,0 +1,184 @@
+import heapq
+import hmac
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
+
+from .config import settings
+from .tracing import current_span, start_span
+
+# The trace of the request being handled, or None when the request is not sampled.
+_current_trace: ContextVar["Trace | None"] = ContextVar("profiling_trace", default=None)
+
+
+class Trace:
+    """
+    Timing record of a single sampled request: total duration plus one span per instrumented stage.
+    """
+    __slots__ = ("method", "path", "started_at", "duration_ms", "status_code", "spans", "_start")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.status_code = None
+        self.spans = []
+        self._start = time.perf_counter()
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+
+    def to_dict(self) -> dict:
+        totals = {}
+        for stage_name, _, _, duration_ms in self.spans:
+            totals[stage_name] = totals.get(stage_name, 0.0) + duration_ms
+        return {
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "status_code": self.status_code,
+            "duration_ms": round(self.duration_ms, 3),
+            "stage_totals_ms": {name: round(value, 3) for name, value in totals.items()},
+            "spans": [{"stage": stage_name, "name": name, "offset_ms": round(offset_ms, 3),
+                       "duration_ms": round(duration_ms, 3)}
+                      for stage_name, name, offset_ms, duration_ms in self.spans],
+        }
+
+
+@contextmanager
+def stage(stage_name: str, name: str | None = None):
+    """
+    Record the enclosed block as a `stage_name` span ("db", "hash", "http", "serialization") of the
+    current trace, and as a child span when the request is being traced across services. Costs two
+    context variable lookups when the request is neither sampled nor traced.
+    """
+    if current_span() is not None:
+        with start_span(name or stage_name, "client" if stage_name == "http" else "internal", {"stage": stage_name}):
+            with _profile(stage_name, name):
+                yield
+        return
+    with _profile(stage_name, name):
+        yield
+
+
+@contextmanager
+def _profile(stage_name: str, name: str | None):
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        trace.spans.append((stage_name, name or stage_name, (start - trace._start) * 1000, (end - start) * 1000))
+
+
+class TraceStore:
+    """
+    Keeps the `capacity` slowest traces seen so far.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.sampled = 0
+        self._heap = []
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace):
+        with self._lock:
+            self.sampled += 1
+            self._counter += 1
+            entry = (trace.duration_ms, self._counter, trace)
+            if len(self._heap) < self.capacity:
+                heapq.heappush(self._heap, entry)
+            elif trace.duration_ms > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def slowest(self, limit: int | None = None) -> list[Trace]:
+        with self._lock:
+            entries = sorted(self._heap, reverse=True)
+        return [trace for _, _, trace in entries[:limit]]
+
+    def clear(self):
+        with self._lock:
+            self._heap.clear()
+            self.sampled = 0
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that traces a `sample_rate` fraction of HTTP requests, plus every request carrying
+    the `header` header with a truthy value, and keeps the slowest ones in `store`.
+    """
+
+    def __init__(self, app, store: TraceStore, sample_rate: float, header: str):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode("latin-1")
+
+    def _should_sample(self, scope) -> bool:
+        for key, value in scope["headers"]:
+            if key == self.header:
+                return value.lower() in (b"1", b"true", b"yes")
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_sample(scope):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                trace.status_code = message["status"]
+            await send(message)
+
+        token = _current_trace.set(trace)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            trace.finish()
+            self.store.add(trace)
+
+
+def _require_admin(authorization: str = Header("")):
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Admin credentials required",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+def install_profiling(app: FastAPI, store: TraceStore | None = None) -> TraceStore | None:
+    """
+    Add the profiling middleware and the `GET /admin/profiles` endpoint to `app` when
+    PROFILING_ENABLED is set. Returns the trace store, or None when profiling is disabled.
+
+    The endpoint requires `Authorization: Bearer <ADMIN_TOKEN>` and is left out when ADMIN_TOKEN is unset.
+    """
+    if not settings.PROFILING_ENABLED:
+        return None
+    store = store or TraceStore(settings.PROFILING_TOP_N)
+    app.add_middleware(ProfilingMiddleware, store=store, sample_rate=settings.PROFILING_SAMPLE_RATE,
+                       header=settings.PROFILING_HEADER)
+
+    if not settings.ADMIN_TOKEN:
+        return store
+
+    @app.get("/admin/profiles", tags=["Admin"], summary="Slowest Request Traces",
+             description="Return the slowest sampled request traces with their per-stage spans.",
+             dependencies=[Depends(_require_admin)])
+    def get_profiles(limit: int = Query(10, ge=1, le=settings.PROFILING_TOP_N)):
+        return {"sampled": store.sampled, "traces": [trace.to_dict() for trace in store.slowest(limit)]}
+
+    return store
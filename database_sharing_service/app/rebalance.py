@@ -0,0 +1,153 @@
+"""
+Move users between shards after a shard map change.
+
+Rebalancing runs in three steps, so the services never look for a user on a shard that doesn't have it yet:
+
+1. `plan` writes the new shard map (moving as few buckets as possible). Create the schema on any new
+   shard with `DATABASE_URL=<shard url> alembic -c database_sharing_service/alembic.ini upgrade head`.
+2. `copy` upserts every user into the shard the new map assigns it to and writes the old -> new public
+   id remap (ids embed the shard, so moved users get new ids; tokens carrying the old id stop resolving).
+   Re-run it right before the switch to pick up writes made in the meantime.
+3. Point SHARD_MAP_PATH at the new map and restart the services, then `prune` deletes the rows left
+   behind on shards that no longer own them.
+
+    python -m database_sharing_service.app.rebalance plan --shards 3 --current map.json --output new_map.json
+    python -m database_sharing_service.app.rebalance copy --map new_map.json --remap-output remap.csv
+    python -m database_sharing_service.app.rebalance prune --map new_map.json
+"""
+import argparse
+import csv
+import sys
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .crud import subtract_user_stats
+from .database import _create_engine
+from .logging_config import get_logger
+from .models import User
+from .sharding import ShardMap, encode_user_id, normalize_email
+
+logger = get_logger("Rebalance")
+
+_COPIED_COLUMNS = [column.key for column in User.__table__.columns if column.key != "id"]
+
+
+def _batches(db: Session, batch_size: int):
+    # Keyset pagination, so long scans don't slow down as they advance
+    last_id = 0
+    while True:
+        batch = db.query(User).filter(User.id > last_id).order_by(User.id).limit(batch_size).all()
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def _find(db: Session, email: str):
+    return db.query(User).filter(func.lower(User.email) == normalize_email(email)).first()
+
+
+def copy_users(engines: list, target: ShardMap, batch_size: int = 500) -> list[tuple[int, int]]:
+    """
+    Upsert every user into the shard `target` assigns it to. Idempotent.
+
+    Returns (old public id, new public id) for each user copied to another shard.
+    """
+    remap = []
+    for shard, engine in enumerate(engines):
+        copied = len(remap)
+        with Session(engine) as source:
+            for batch in _batches(source, batch_size):
+                for user in batch:
+                    owner = target.shard_for_email(user.email)
+                    if owner == shard:
+                        continue
+                    with Session(engines[owner]) as destination:
+                        copy = _find(destination, user.email)
+                        if copy is None:
+                            copy = User()
+                            destination.add(copy)
+                        for key in _COPIED_COLUMNS:
+                            setattr(copy, key, getattr(user, key))
+                        destination.commit()
+                        remap.append((encode_user_id(shard, user.id), encode_user_id(owner, copy.id)))
+        logger.info(f"Shard {shard}: {len(remap) - copied} users copied")
+    return remap
+
+
+def prune_users(engines: list, target: ShardMap, batch_size: int = 500) -> int:
+    """
+    Delete the users on shards `target` doesn't assign them to, provided their owning shard has a copy.
+
+    Returns the number of users deleted.
+    """
+    deleted = 0
+    for shard, engine in enumerate(engines):
+        with Session(engine) as source:
+            stale = []
+            for batch in _batches(source, batch_size):
+                for user in batch:
+                    owner = target.shard_for_email(user.email)
+                    if owner == shard:
+                        continue
+                    with Session(engines[owner]) as destination:
+                        if _find(destination, user.email) is None:
+                            logger.warning(f"Keeping {user.email} on shard {shard}: not copied to shard {owner} yet")
+                            continue
+                    stale.append(user.id)
+            for start in range(0, len(stale), batch_size):
+                chunk = User.id.in_(stale[start:start + batch_size])
+                subtract_user_stats(source, chunk)
+                source.query(User).filter(chunk).delete(synchronize_session=False)
+                source.commit()
+            deleted += len(stale)
+            logger.info(f"Shard {shard}: {len(stale)} users pruned")
+    return deleted
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shard-urls", default=",".join(settings.DATABASE_SHARD_URLS),
+                        help="Comma separated shard database URLs, in shard index order (default: DATABASE_SHARD_URLS).")
+    parser.add_argument("--batch-size", type=int, default=500)
+    commands = parser.add_subparsers(dest="command", required=True)
+    plan = commands.add_parser("plan", help="Write a shard map for a new shard count.")
+    plan.add_argument("--shards", type=int, required=True)
+    plan.add_argument("--current", help="Shard map in use; without it the buckets are spread evenly from scratch.")
+    plan.add_argument("--output", required=True)
+    copy = commands.add_parser("copy", help="Copy users to the shards of the new map.")
+    copy.add_argument("--map", required=True)
+    copy.add_argument("--remap-output", required=True, help="CSV of old_id,new_id for every moved user.")
+    prune = commands.add_parser("prune", help="Delete users from shards the new map no longer assigns them to.")
+    prune.add_argument("--map", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "plan":
+        current = ShardMap.load(args.current) if args.current else None
+        new = current.rebalanced(args.shards) if current else ShardMap.even(args.shards)
+        new.dump(args.output)
+        moved = sum(old != owner for old, owner in zip(current.owners, new.owners)) if current else 0
+        print(f"{args.output}: {args.shards} shards, {moved} buckets move")
+        return 0
+
+    target = ShardMap.load(args.map)
+    urls = [url.strip() for url in args.shard_urls.split(",") if url.strip()]
+    if target.shard_count > len(urls):
+        parser.error(f"the map uses {target.shard_count} shards but {len(urls)} shard URLs were given")
+    engines = [_create_engine(url) for url in urls]
+    if args.command == "copy":
+        remap = copy_users(engines, target, args.batch_size)
+        with open(args.remap_output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("old_id", "new_id"))
+            writer.writerows(remap)
+        print(f"{len(remap)} users copied, id remap written to {args.remap_output}")
+    else:
+        print(f"{prune_users(engines, target, args.batch_size)} users pruned")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
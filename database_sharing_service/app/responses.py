@@ -0,0 +1,41 @@
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from . import schemas
+from .profiling import stage
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Default response class of the services: renders with orjson when it is installed and records
+    the rendering as the "serialization" profiling stage.
+
+    Routes with a `response_model` reach `render` with the dict FastAPI already serialized the result into.
+    A Pydantic model only arrives here when one is passed to the response directly (`FastJSONResponse(model)`,
+    or returned from a route without `response_model`); it is then dumped straight to JSON by pydantic-core.
+    """
+
+    def render(self, content) -> bytes:
+        with stage("serialization"):
+            if isinstance(content, BaseModel):
+                return content.__pydantic_serializer__.to_json(content)
+            if orjson is not None:
+                return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+            return super().render(content)
+
+
+# Fields of the public user representation, in schema order.
+_USER_FIELDS = tuple(schemas.User.model_fields)
+
+
+def user_response(user) -> FastJSONResponse:
+    """
+    Render a `models.User` row as `schemas.User` without validating it into a Pydantic model first;
+    the row comes from our own database, so the per-request validation buys nothing.
+    """
+    return FastJSONResponse({field: getattr(user, field) for field in _USER_FIELDS})
@@ -0,0 +1,100 @@
+import asyncio
+import socket
+import struct
+
+# Every frame is a 4-byte big-endian payload length followed by a msgpack-encoded map.
+_HEADER = struct.Struct("!I")
+MAX_FRAME_BYTES = 1 << 20
+
+
+class RPCProtocolError(Exception):
+    """
+    Raised for a malformed frame or a peer closing the connection mid-frame.
+    """
+
+
+class RPCConnectionClosed(RPCProtocolError):
+    """
+    Raised when the peer closed the connection before sending any byte of the next frame.
+    """
+
+
+def _msgpack():
+    # Imported on first use, so the services start without msgpack unless the RPC transport is enabled.
+    try:
+        import msgpack
+    except ImportError as e:
+        raise RuntimeError("The internal RPC transport requires msgpack (pip install msgpack)") from e
+    return msgpack
+
+
+def encode_frame(message: dict) -> bytes:
+    payload = _msgpack().packb(message, use_bin_type=True)
+    return _HEADER.pack(len(payload)) + payload
+
+
+def _decode_payload(payload: bytes) -> dict:
+    try:
+        message = _msgpack().unpackb(payload, raw=False)
+    except ValueError as e:
+        raise RPCProtocolError(f"Undecodable frame: {e}") from e
+    if not isinstance(message, dict):
+        raise RPCProtocolError("Frame payload is not a map")
+    return message
+
+
+def _check_length(header: bytes) -> int:
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise RPCProtocolError(f"Frame of {length} bytes exceeds {MAX_FRAME_BYTES}")
+    return length
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise RPCProtocolError("Connection closed mid-frame")
+        buffer += chunk
+    return bytes(buffer)
+
+
+def recv_frame(sock: socket.socket) -> dict:
+    """
+    Read one frame from a blocking socket. Raises RPCConnectionClosed when the peer closed the connection
+    before the frame began.
+    """
+    first = sock.recv(_HEADER.size)
+    if not first:
+        raise RPCConnectionClosed("Connection closed")
+    header = first + _recv_exactly(sock, _HEADER.size - len(first))
+    return _decode_payload(_recv_exactly(sock, _check_length(header)))
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict | None:
+    """
+    Read one frame from a stream; None when the peer closed the connection between frames.
+    """
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise RPCProtocolError("Connection closed mid-frame") from e
+        return None
+    try:
+        return _decode_payload(await reader.readexactly(_check_length(header)))
+    except asyncio.IncompleteReadError as e:
+        raise RPCProtocolError("Connection closed mid-frame") from e
+
+
+def parse_address(address: str) -> tuple[str, str | tuple[str, int]]:
+    """
+    Split an RPC address, "unix:/path/to.sock" or "host:port", into ("unix", path) or ("tcp", (host, port)).
+    """
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, separator, port = address.rpartition(":")
+    if not separator or not port.isdigit():
+        raise ValueError(f"Invalid RPC address '{address}', expected host:port or unix:/path")
+    return "tcp", (host or "127.0.0.1", int(port))
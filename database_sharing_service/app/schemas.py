@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel, EmailStr
 
 
@@ -46,3 +48,27 @@ class TokenData(BaseModel):
 class TokenRequest(BaseModel):
     email: str
     password: str
+
+
+# One counter of the user statistics
+class UserStatsGroup(BaseModel):
+    source: str | None = None
+    user_identity: str | None = None
+    is_active: bool
+    count: int
+
+
+# Schema for the pre-aggregated user statistics
+class UserStats(BaseModel):
+    total: int
+    active: int
+    inactive: int
+    by_source: dict[str, int]
+    by_user_identity: dict[str, int]
+    groups: list[UserStatsGroup]
+    refreshed_at: datetime
+
+
+# Schema for the activation status long-poll
+class ActivationStatus(BaseModel):
+    is_active: bool
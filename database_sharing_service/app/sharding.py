@@ -0,0 +1,140 @@
+import json
+import zlib
+from functools import lru_cache
+
+from .config import settings
+
+# Users are spread over BUCKETS hash buckets of their normalised email; the shard map assigns each bucket
+# to a shard, so shards can be added by moving buckets instead of rehashing every user.
+BUCKETS = 1024
+# Public user ids embed the shard index in their low SHARD_BITS bits.
+SHARD_BITS = 10
+MAX_SHARDS = 1 << SHARD_BITS
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def email_bucket(email: str) -> int:
+    """
+    Stable hash bucket of `email`; crc32 rather than `hash()`, which is salted per process.
+    """
+    return zlib.crc32(normalize_email(email).encode("utf-8")) % BUCKETS
+
+
+def encode_user_id(shard: int, local_id: int) -> int:
+    """
+    The public id of the user with primary key `local_id` on shard `shard`.
+    """
+    return (local_id << SHARD_BITS) | shard
+
+
+def decode_user_id(user_id: int) -> tuple[int, int]:
+    """
+    Split a public user id into (shard index, primary key on that shard).
+    """
+    return user_id & (MAX_SHARDS - 1), user_id >> SHARD_BITS
+
+
+class ShardMap:
+    """
+    Assignment of email hash buckets to shard indexes, stored as JSON at SHARD_MAP_PATH.
+    See `database_sharing_service/app/rebalance.py` for moving users when it changes.
+    """
+
+    def __init__(self, owners: list[int]):
+        if len(owners) != BUCKETS:
+            raise ValueError(f"A shard map assigns {BUCKETS} buckets, got {len(owners)}")
+        if any(not 0 <= owner < MAX_SHARDS for owner in owners):
+            raise ValueError(f"Shard indexes must be between 0 and {MAX_SHARDS - 1}")
+        self.owners = list(owners)
+
+    @classmethod
+    def even(cls, shard_count: int) -> "ShardMap":
+        """
+        Contiguous, equally sized bucket ranges per shard.
+        """
+        return cls([bucket * shard_count // BUCKETS for bucket in range(BUCKETS)])
+
+    @classmethod
+    def load(cls, path: str) -> "ShardMap":
+        with open(path) as f:
+            return cls(json.load(f)["buckets"])
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"buckets": self.owners}, f)
+            f.write("\n")
+
+    @property
+    def shard_count(self) -> int:
+        return max(self.owners) + 1
+
+    def shard_for_email(self, email: str) -> int:
+        return self.owners[email_bucket(email)]
+
+    def rebalanced(self, shard_count: int) -> "ShardMap":
+        """
+        A map spreading the buckets evenly over `shard_count` shards that moves as few buckets as possible:
+        only the surplus of over-full shards (and every bucket of removed shards) changes owner.
+        """
+        if not 0 < shard_count <= MAX_SHARDS:
+            raise ValueError(f"Shard count must be between 1 and {MAX_SHARDS}")
+        base, extra = divmod(BUCKETS, shard_count)
+        quota = [base + (1 if shard < extra else 0) for shard in range(shard_count)]
+        owners = list(self.owners)
+        kept = [0] * shard_count
+        unassigned = []
+        for bucket, owner in enumerate(owners):
+            if owner < shard_count and kept[owner] < quota[owner]:
+                kept[owner] += 1
+            else:
+                unassigned.append(bucket)
+        for shard in range(shard_count):
+            for _ in range(quota[shard] - kept[shard]):
+                owners[unassigned.pop()] = shard
+        return ShardMap(owners)
+
+
+@lru_cache(maxsize=None)
+def get_shard_map() -> ShardMap | None:
+    """
+    The shard map in use, or None when sharding is off (DATABASE_SHARD_URLS unset).
+    """
+    if not settings.DATABASE_SHARD_URLS:
+        return None
+    if settings.SHARD_MAP_PATH:
+        shard_map = ShardMap.load(settings.SHARD_MAP_PATH)
+    else:
+        shard_map = ShardMap.even(len(settings.DATABASE_SHARD_URLS))
+    if shard_map.shard_count > len(settings.DATABASE_SHARD_URLS):
+        raise ValueError(f"The shard map uses {shard_map.shard_count} shards but only "
+                         f"{len(settings.DATABASE_SHARD_URLS)} DATABASE_SHARD_URLS are configured")
+    return shard_map
+
+
+def shard_id_for_email(email: str) -> str | None:
+    """
+    Shard identifier (as used by the sharded session) owning `email`, or None when sharding is off.
+    """
+    shard_map = get_shard_map()
+    return None if shard_map is None else str(shard_map.shard_for_email(email))
+
+
+def locate_user_id(user_id) -> tuple[str | None, int] | None:
+    """
+    Map a public user id to (shard identifier, primary key); the shard is None when sharding is off.
+
+    Returns None for an id naming a shard that is not configured (such as one issued before sharding was
+    turned on), which can't belong to any user.
+    """
+    from .database import get_shard_engines
+
+    user_id = int(user_id)
+    if get_shard_map() is None:
+        return None, user_id
+    shard, local_id = decode_user_id(user_id)
+    if str(shard) not in get_shard_engines():
+        return None
+    return str(shard), local_id
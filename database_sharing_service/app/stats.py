@@ -0,0 +1,229 @@
+"""
+Pre-aggregated user statistics: the `user_stats` counters kept by crud, served from memory at `/stats/users`.
+
+Reconciliation recounts the users table and repairs counters that drifted. It runs every STATS_RECONCILE_SECONDS
+inside the User Service, or once from cron with
+
+    python -m database_sharing_service.app.stats
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from fastapi import FastAPI, Response
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from . import schemas
+from .config import settings
+from .crud import bump_user_stats
+from .database import get_engines
+from .logging_config import get_logger
+from .metrics import registry
+from .models import User, UserStat
+from .responses import FastJSONResponse
+
+logger = get_logger("User_Stats")
+
+# Shown for users without a source or identity in the per-dimension counts
+UNSPECIFIED = "unspecified"
+
+stats_corrections = registry.counter("user_stats_reconcile_corrections_total",
+                                     "user_stats counters found off (and fixed) by reconciliation.")
+stats_refreshed = registry.gauge("user_stats_refreshed_timestamp_seconds",
+                                 "Unix time the in-memory user statistics were last refreshed.")
+
+
+def _stored_counts(db: Session) -> Counter:
+    return Counter({(source, user_identity, is_active): count for source, user_identity, is_active, count in
+                    db.execute(select(UserStat.source, UserStat.user_identity, UserStat.is_active, UserStat.count))
+                    if count})
+
+
+# Held by the reconciling worker, so two never apply the same correction twice
+_RECONCILE_LOCK_ID = 0x75736572
+_reconcile_lock = threading.Lock()
+
+
+def _recount(db: Session) -> tuple[Counter, Counter]:
+    """
+    Count the users table and read the stored counters in a single statement, so both come from the same snapshot
+    without locking out the signups and activations committing meanwhile. Returns (actual, stored).
+    """
+    key = (func.coalesce(User.source, ""), func.coalesce(User.user_identity, ""),
+           func.coalesce(User.is_active, False))
+    counted = select(literal("users"), *key, func.count()).group_by(*key)
+    stored = select(literal("user_stats"), UserStat.source, UserStat.user_identity, UserStat.is_active,
+                    UserStat.count)
+    counts = {"users": Counter(), "user_stats": Counter()}
+    for table, source, user_identity, is_active, count in db.execute(union_all(counted, stored)):
+        counts[table][source, user_identity, bool(is_active)] += count
+    return counts["users"], counts["user_stats"]
+
+
+def _try_lock_reconciliation(db: Session) -> bool:
+    if db.get_bind().dialect.name == "postgresql":
+        # Does not conflict with the counter updates, only with another worker reconciling.
+        return db.execute(select(func.pg_try_advisory_xact_lock(_RECONCILE_LOCK_ID))).scalar()
+    return True
+
+
+def reconcile_user_stats(engines: dict | None = None) -> int:
+    """
+    Recount the users table of every database in `engines` (default: the primary, or every shard) and add the
+    difference to its `user_stats` counters, correcting drift from bulk changes made outside crud.
+
+    The difference is applied as increments, so counter updates committed since the recount are kept. A database
+    another worker is reconciling (PostgreSQL only) is skipped. Returns the number of counters that were off.
+    """
+    corrected = 0
+    with _reconcile_lock:
+        for engine in (engines or get_engines()).values():
+            with Session(engine) as db, db.begin():
+                if not _try_lock_reconciliation(db):
+                    continue
+                actual, stored = _recount(db)
+                drift = {counter: actual[counter] - stored[counter] for counter in actual.keys() | stored.keys()
+                         if actual[counter] != stored[counter]}
+                for counter, delta in drift.items():
+                    bump_user_stats(db, None, counter, delta)
+            corrected += len(drift)
+    stats_corrections.inc(corrected)
+    if corrected:
+        logger.warning(f"User statistics reconciled: {corrected} counters corrected")
+    return corrected
+
+
+class UserStatsCache:
+    """
+    The `user_stats` counters of every database in `engines`, summed and pre-rendered as the `/stats/users`
+    response body, so serving them costs neither a query nor serialization.
+    """
+
+    def __init__(self, engines: dict | None = None):
+        self.engines = engines
+        self.body: bytes | None = None
+        self.snapshot: dict | None = None
+
+    def refresh(self) -> dict:
+        counts = Counter()
+        for engine in (self.engines or get_engines()).values():
+            with Session(engine) as db:
+                counts.update(_stored_counts(db))
+        by_source, by_user_identity, by_active = Counter(), Counter(), Counter()
+        for (source, user_identity, is_active), count in counts.items():
+            by_source[source or UNSPECIFIED] += count
+            by_user_identity[user_identity or UNSPECIFIED] += count
+            by_active[is_active] += count
+        snapshot = {
+            "total": sum(counts.values()),
+            "active": by_active[True],
+            "inactive": by_active[False],
+            "by_source": dict(by_source),
+            "by_user_identity": dict(by_user_identity),
+            "groups": [{"source": source or None, "user_identity": user_identity or None, "is_active": is_active,
+                        "count": count} for (source, user_identity, is_active), count in sorted(counts.items())],
+            "refreshed_at": datetime.utcnow().isoformat(),
+        }
+        self.body = FastJSONResponse(snapshot).body
+        self.snapshot = snapshot
+        stats_refreshed.set(time.time())
+        return snapshot
+
+
+class StatsRefresher:
+    """
+    Refreshes `cache` every `refresh_interval` seconds on a daemon thread.
+    """
+
+    def __init__(self, cache: UserStatsCache, refresh_interval: float):
+        self.cache = cache
+        self.refresh_interval = refresh_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.cache.refresh()
+            except Exception as e:
+                logger.error(f"User statistics refresh failed: {str(e)}")
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="user-stats-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class ReconcileScheduler:
+    """
+    Runs `reconcile_user_stats` over `engines` every `interval` seconds on a daemon thread.
+    """
+
+    def __init__(self, interval: float, engines: dict | None = None):
+        self.interval = interval
+        self.engines = engines
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                reconcile_user_stats(self.engines)
+            except Exception as e:
+                logger.error(f"User statistics reconciliation failed: {str(e)}")
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="user-stats-reconcile", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def install_user_stats(app: FastAPI, cache: UserStatsCache | None = None) -> UserStatsCache:
+    """
+    Add `GET /stats/users` to `app`, served from a cache refreshed every STATS_REFRESH_SECONDS, and reconcile the
+    counters every STATS_RECONCILE_SECONDS. Returns the cache.
+    """
+    cache = cache or UserStatsCache()
+    refresher = StatsRefresher(cache, settings.STATS_REFRESH_SECONDS)
+    app.add_event_handler("startup", refresher.start)
+    app.add_event_handler("shutdown", refresher.stop)
+    if settings.STATS_RECONCILE_SECONDS > 0:
+        reconciler = ReconcileScheduler(settings.STATS_RECONCILE_SECONDS, cache.engines)
+        app.add_event_handler("startup", reconciler.start)
+        app.add_event_handler("shutdown", reconciler.stop)
+
+    @app.get("/stats/users", response_model=schemas.UserStats, tags=["Stats"], summary="User Statistics",
+             description="Number of users in total and by source, identity and activation, as of `refreshed_at`.")
+    def get_user_stats():
+        if cache.body is None:
+            cache.refresh()
+        return Response(cache.body, media_type="application/json")
+
+    return cache
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args(argv)
+
+    print(json.dumps({"corrected": reconcile_user_stats()}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
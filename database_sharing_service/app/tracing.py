@@ -0,0 +1,308 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi import FastAPI
+
+from .config import settings
+from .logging_config import get_logger
+
+logger = get_logger("Tracing")
+
+# https://www.w3.org/TR/trace-context/#traceparent-header
+_TRACEPARENT_RE = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+_SAMPLED_FLAG = 0x01
+
+# OTLP SpanKind values.
+_OTLP_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+_current_span: ContextVar["Span | None"] = ContextVar("tracing_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "kind", "service", "attributes",
+                 "start_time_ns", "end_time_ns", "error", "flags", "tracestate")
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: str | None, kind: str, service: str,
+                 attributes: dict | None = None, flags: int = _SAMPLED_FLAG, tracestate: str | None = None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.service = service
+        self.attributes = attributes or {}
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns = None
+        self.error = False
+        # The caller's trace flags and vendor `tracestate`, forwarded unchanged to downstream services
+        self.flags = flags
+        self.tracestate = tracestate
+
+    @property
+    def sampled(self) -> bool:
+        return bool(self.flags & _SAMPLED_FLAG)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_time_ns or time.time_ns()) - self.start_time_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "service": self.service,
+            "start_time_ns": self.start_time_ns,
+            "end_time_ns": self.end_time_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+def parse_traceparent(header: str | None) -> tuple[str, str, int] | None:
+    """
+    Parse a W3C `traceparent` header into (trace_id, parent_span_id, flags), or None if it is invalid.
+    """
+    if not header:
+        return None
+    match = _TRACEPARENT_RE.match(header.strip().lower())
+    if match is None:
+        return None
+    version, trace_id, parent_id, flags = match.groups()
+    if version == "ff" or trace_id == _INVALID_TRACE_ID or parent_id == _INVALID_SPAN_ID:
+        return None
+    return trace_id, parent_id, int(flags, 16)
+
+
+def format_traceparent(span: Span) -> str:
+    return f"00-{span.trace_id}-{span.span_id}-{span.flags:02x}"
+
+
+class InMemorySpanExporter:
+    """
+    Keeps the last `capacity` finished spans in memory, for tests and local debugging.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        self.spans = deque(maxlen=capacity)
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+    def clear(self):
+        self.spans.clear()
+
+
+class FileSpanExporter:
+    """
+    Appends every finished span as one JSON line to `path`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict())
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class OTLPSpanExporter:
+    """
+    Batches finished spans and posts them to an OpenTelemetry collector using OTLP/HTTP with JSON encoding.
+    """
+
+    def __init__(self, endpoint: str, interval: float = 5.0, max_batch: int = 512):
+        self.endpoint = endpoint.rstrip("/") + "/v1/traces"
+        self.interval = interval
+        self.max_batch = max_batch
+        self._queue = deque(maxlen=max_batch * 20)
+        self._wakeup = threading.Event()
+        import requests
+
+        self._session = requests.Session()
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        self._queue.append(span)
+        if len(self._queue) >= self.max_batch:
+            self._wakeup.set()
+
+    def flush(self):
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            try:
+                self._session.post(self.endpoint, json=self.encode(batch), timeout=5).raise_for_status()
+            except OSError as err:  # requests' RequestException derives from IOError
+                logger.warning(f"Dropping {len(batch)} spans, OTLP export failed: {err}")
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    @staticmethod
+    def encode(spans: list[Span]) -> dict:
+        by_service = {}
+        for span in spans:
+            by_service.setdefault(span.service, []).append({
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_span_id or "",
+                "name": span.name,
+                "kind": _OTLP_KINDS[span.kind],
+                "startTimeUnixNano": str(span.start_time_ns),
+                "endTimeUnixNano": str(span.end_time_ns),
+                "attributes": [{"key": key, "value": {"stringValue": str(value)}}
+                               for key, value in span.attributes.items()],
+                "status": {"code": 2 if span.error else 0},
+            })
+        return {"resourceSpans": [
+            {"resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+             "scopeSpans": [{"scope": {"name": "xsource.tracing"}, "spans": service_spans}]}
+            for service, service_spans in by_service.items()
+        ]}
+
+
+class Tracer:
+    def __init__(self, exporter=None, sample_rate: float = 1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def finish(self, span: Span):
+        span.end_time_ns = time.time_ns()
+        if span.sampled and self.exporter is not None:
+            self.exporter.export(span)
+
+
+def _build_exporter():
+    if settings.TRACING_EXPORTER == "memory":
+        return InMemorySpanExporter()
+    if settings.TRACING_EXPORTER == "file":
+        os.makedirs(os.path.dirname(os.path.abspath(settings.TRACING_FILE_PATH)), exist_ok=True)
+        return FileSpanExporter(settings.TRACING_FILE_PATH)
+    if settings.TRACING_EXPORTER == "otlp":
+        return OTLPSpanExporter(settings.TRACING_OTLP_ENDPOINT)
+    raise ValueError(f"Unknown TRACING_EXPORTER: {settings.TRACING_EXPORTER}")
+
+
+tracer = Tracer(sample_rate=settings.TRACING_SAMPLE_RATE)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name: str, kind: str = "internal", attributes: dict | None = None):
+    """
+    Open a child span of the current span for the enclosed block. A no-op, yielding None, when the
+    current request is not traced or not sampled.
+    """
+    parent = _current_span.get()
+    if parent is None or not parent.sampled:
+        yield None
+        return
+    span = Span(name, parent.trace_id, parent.span_id, kind, parent.service, attributes, parent.flags,
+                parent.tracestate)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException:
+        span.error = True
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.finish(span)
+
+
+def inject_headers(headers: dict | None = None) -> dict:
+    """
+    Return `headers` (or a new dict) with the `traceparent` and `tracestate` of the current span added, if any.
+    """
+    headers = {} if headers is None else headers
+    span = _current_span.get()
+    if span is not None:
+        headers["traceparent"] = format_traceparent(span)
+        if span.tracestate:
+            headers["tracestate"] = span.tracestate
+    return headers
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that opens a server span per HTTP request, continuing the caller's trace when a
+    valid `traceparent` header is present and otherwise starting a new trace for a sampled fraction of requests.
+    Spans of unsampled requests are not exported, but still carry the trace context to downstream services.
+    """
+
+    def __init__(self, app, service_name: str):
+        self.app = app
+        self.service_name = service_name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent, tracestate = None, []
+        for key, value in scope["headers"]:
+            if key == b"traceparent" and traceparent is None:
+                traceparent = parse_traceparent(value.decode("latin-1"))
+            elif key == b"tracestate":
+                tracestate.append(value.decode("latin-1"))
+        if traceparent is not None:
+            trace_id, parent_span_id, flags = traceparent
+        else:
+            trace_id, parent_span_id = f"{random.getrandbits(128):032x}", None
+            flags = _SAMPLED_FLAG if random.random() < tracer.sample_rate else 0
+            # A vendor's tracestate is only meaningful alongside the traceparent it came with
+            tracestate = []
+
+        span = Span(f"{scope['method']} {scope['path']}", trace_id, parent_span_id, "server", self.service_name,
+                    {"http.method": scope["method"], "http.target": scope["path"]}, flags,
+                    ",".join(tracestate) or None)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.attributes["http.status_code"] = message["status"]
+                span.error = message["status"] >= 500
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"traceparent", format_traceparent(span).encode("latin-1"))]
+            await send(message)
+
+        token = _current_span.set(span)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            span.error = True
+            raise
+        finally:
+            _current_span.reset(token)
+            tracer.finish(span)
+
+
+def install_tracing(app: FastAPI, service_name: str):
+    """
+    Add the tracing middleware to `app` and configure the span exporter when TRACING_ENABLED is set.
+    """
+    if not settings.TRACING_ENABLED:
+        return
+    if tracer.exporter is None:
+        tracer.exporter = _build_exporter()
+    app.add_middleware(TracingMiddleware, service_name=service_name)
@@ -0,0 +1,37 @@
+"""Indexes for the hot user lookups
+
+- Replaces the case-sensitive unique index on `email` with a unique index on `lower(email)`, which
+  `crud.get_user_by_email` filters on. Fails if the table holds emails differing only in case;
+  merge those accounts first.
+- Partial index on the ids of inactive users for activation sweeps.
+- Indexes for filtering by `source` and `user_identity`.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-10-21 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=True)
+    op.drop_index('ix_users_email', table_name='users')
+    op.create_index('ix_users_inactive_id', 'users', ['id'], unique=False,
+                    sqlite_where=sa.text('is_active = 0'), postgresql_where=sa.text('is_active = false'))
+    op.create_index('ix_users_source', 'users', ['source'], unique=False)
+    op.create_index('ix_users_user_identity', 'users', ['user_identity'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_users_user_identity', table_name='users')
+    op.drop_index('ix_users_source', table_name='users')
+    op.drop_index('ix_users_inactive_id', table_name='users')
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.drop_index('ix_users_email_lower', table_name='users')
@@ -0,0 +1,39 @@
+"""Pre-aggregated user counts
+
+Adds the `user_stats` table and fills it from the current users.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-12-02 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_stats',
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('user_identity', sa.String(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('source', 'user_identity', 'is_active'),
+    )
+    users = sa.table('users', sa.column('source', sa.String()), sa.column('user_identity', sa.String()),
+                     sa.column('is_active', sa.Boolean()))
+    user_stats = sa.table('user_stats', sa.column('source', sa.String()), sa.column('user_identity', sa.String()),
+                          sa.column('is_active', sa.Boolean()), sa.column('count', sa.Integer()))
+    key = (sa.func.coalesce(users.c.source, ''), sa.func.coalesce(users.c.user_identity, ''),
+           sa.func.coalesce(users.c.is_active, sa.false()))
+    op.execute(user_stats.insert().from_select(['source', 'user_identity', 'is_active', 'count'],
+                                               sa.select(*key, sa.func.count()).group_by(*key)))
+
+
+def downgrade():
+    op.drop_table('user_stats')
@@ -0,0 +1,157 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from database_sharing_service.app import models
+from database_sharing_service.app.activation_events import (ActivationHub, DatabaseBroker, LocalBroker,
+                                                            install_activation_events)
+from database_sharing_service.app.crud import encrypt_user_id
+from database_sharing_service.app.database import Base, SessionRouter
+from database_sharing_service.app.health import AdmissionState
+
+
+@pytest.fixture
+def engine(tmp_path, mocker):
+    engine = create_engine(f"sqlite:///{tmp_path / 'activation.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all([models.User(id=1, email="pending@example.com", user_name="u", hashed_password="x"),
+                    models.User(id=2, email="active@example.com", user_name="u", hashed_password="x",
+                                is_active=True)])
+        db.commit()
+    mocker.patch("database_sharing_service.app.activation_events.get_session_router",
+                 return_value=SessionRouter(sessionmaker(bind=engine)))
+    return engine
+
+
+def _activate(engine, user_id: int):
+    with Session(engine) as db:
+        db.get(models.User, user_id).is_active = True
+        db.commit()
+
+
+def _when_waiting(hub: ActivationHub, action):
+    """
+    Run `action` on another thread as soon as a client waits on `hub`.
+    """
+    def run():
+        deadline = time.monotonic() + 5
+        while not len(hub) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        action()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_waiters_share_a_subscription_per_user():
+    async def scenario():
+        hub = ActivationHub(LocalBroker(), max_waiters=3)
+        first, second = hub.subscribe(1), hub.subscribe(1)
+        assert first is second
+        assert hub.subscribe(2) is not None and hub.subscribe(3) is None
+        assert (len(hub), sorted(hub.pending())) == (3, [1, 2])
+
+        hub.publish(1)
+        await asyncio.wait((first,), timeout=1)
+        assert first.result() is True and hub.pending() == [2]
+        for user_id in (1, 1, 2):
+            hub.unsubscribe(user_id)
+        assert len(hub) == 0 and hub._waiting == {}
+
+    asyncio.run(scenario())
+
+
+def test_local_broker_reaches_every_hub():
+    async def scenario():
+        broker = LocalBroker()
+        worker_a, worker_b = ActivationHub(broker), ActivationHub(broker)
+        waiting = worker_b.subscribe(1)
+        worker_a.publish(1)
+        await asyncio.wait((waiting,), timeout=1)
+        return waiting.result()
+
+    assert asyncio.run(scenario()) is True
+
+
+def test_database_broker_notices_activations_from_other_processes(engine):
+    async def scenario():
+        broker = DatabaseBroker(interval=60, session_factory=sessionmaker(bind=engine))
+        hub = ActivationHub(broker)
+        waiting = hub.subscribe(1)
+        assert broker.poll() == set()
+        _activate(engine, 1)
+        assert broker.poll() == {1}
+        await asyncio.wait((waiting,), timeout=1)
+        return waiting.result()
+
+    assert asyncio.run(scenario()) is True
+
+
+def test_long_poll(engine):
+    app = FastAPI()
+    admission = AdmissionState(max_in_flight=1, retry_after=1)
+    hub = install_activation_events(app, admission)
+    client = TestClient(app)
+
+    assert admission.exempt_prefixes == ("/activation-status/",)
+    assert client.get(f"/activation-status/{encrypt_user_id(2)}").json() == {"is_active": True}
+    assert client.get(f"/activation-status/{encrypt_user_id(1)}", params={"wait": 0}).json() == {"is_active": False}
+    assert client.get(f"/activation-status/{encrypt_user_id(3)}").status_code == 404
+    assert client.get("/activation-status/not-an-id").status_code == 404
+
+    activator = _when_waiting(hub, lambda: (_activate(engine, 1), hub.publish(1)))
+    response = client.get(f"/activation-status/{encrypt_user_id(1)}", params={"wait": 5})
+    activator.join()
+    assert response.json() == {"is_active": True}
+    assert len(hub) == 0
+
+
+def test_event_stream(engine, mocker):
+    mocker.patch("database_sharing_service.app.activation_events.settings.ACTIVATION_HEARTBEAT_SECONDS", 0.05)
+    app = FastAPI()
+    hub = install_activation_events(app)
+    client = TestClient(app)
+
+    activator = _when_waiting(hub, lambda: (time.sleep(0.2), _activate(engine, 1), hub.publish(1)))
+    with client.stream("GET", f"/activation-status/{encrypt_user_id(1)}", params={"wait": 5},
+                       headers={"Accept": "text/event-stream"}) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+    activator.join()
+
+    events = [event for event in body.split("\n\n") if event]
+    assert events[0] == 'retry: 1000\nevent: status\ndata: {"is_active":false}'
+    assert ": keep-alive" in events
+    assert events[-1] == 'event: status\ndata: {"is_active":true}'
+    assert len(hub) == 0
+
+
+def test_event_stream_ended_before_the_first_event_releases_its_wait(engine):
+    app = FastAPI()
+    hub = install_activation_events(app)
+    path = f"/activation-status/{encrypt_user_id(1)}"
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"wait=5",
+             "headers": [(b"accept", b"text/event-stream")], "client": ("test", 1), "server": ("test", 80)}
+
+    async def disconnect():
+        return {"type": "http.disconnect"}
+
+    async def gone(message):
+        raise OSError("Client disconnected")
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(Exception):
+                await app(scope, disconnect, gone)
+
+    asyncio.run(scenario())
+    assert len(hub) == 0 and hub._waiting == {}
@@ -0,0 +1,135 @@
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from database_sharing_service.app import database
+from database_sharing_service.app.config import settings
+from database_sharing_service.app.crud import HashQueue
+from database_sharing_service.app.health import check_database, check_downstream, install_health
+
+
+def _app(mocker, checks=None, max_in_flight=2):
+    mocker.patch.object(settings, "ADMISSION_MAX_IN_FLIGHT", max_in_flight)
+    mocker.patch.object(settings, "ADMISSION_RETRY_AFTER_SECONDS", 3)
+    app = FastAPI()
+    admission = install_health(app, checks or {})
+
+    @app.get("/work")
+    def work():
+        return {"ok": True}
+
+    return app, admission
+
+
+def test_healthz_is_always_ok(mocker):
+    app, _ = _app(mocker)
+    response = TestClient(app).get("/healthz")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_readyz_reports_each_check(mocker):
+    app, _ = _app(mocker, {"database": lambda: (True, {"pool": "ok"}),
+                           "auth_service": lambda: (False, {"error": "timeout"})})
+    response = TestClient(app).get("/readyz")
+
+    assert response.status_code == 503
+    body = response.json()
+    assert body["status"] == "unavailable"
+    assert body["checks"]["database"] == {"ready": True, "pool": "ok"}
+    assert body["checks"]["auth_service"] == {"ready": False, "error": "timeout"}
+    assert body["checks"]["admission"]["ready"] is True
+
+
+def test_readyz_treats_a_raising_check_as_not_ready(mocker):
+    def broken():
+        raise RuntimeError("boom")
+
+    app, _ = _app(mocker, {"database": broken})
+    response = TestClient(app).get("/readyz")
+
+    assert response.status_code == 503
+    assert response.json()["checks"]["database"] == {"ready": False, "error": "boom"}
+
+
+def test_saturated_service_sheds_load_but_keeps_probes(mocker):
+    app, admission = _app(mocker, max_in_flight=2)
+    client = TestClient(app)
+    admission.in_flight = 2
+
+    response = client.get("/work")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert admission.shed == 1
+
+    assert client.get("/healthz").status_code == 200
+    readiness = client.get("/readyz")
+    assert readiness.status_code == 503
+    assert readiness.json()["checks"]["admission"]["in_flight"] == 2
+
+    admission.in_flight = 0
+    assert client.get("/work").status_code == 200
+
+
+def test_zero_limit_disables_shedding(mocker):
+    app, admission = _app(mocker, max_in_flight=0)
+    admission.in_flight = 1000
+
+    assert TestClient(app).get("/work").status_code == 200
+
+
+def test_check_database_detects_exhausted_pool(mocker, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'health.db'}", pool_size=1, max_overflow=0)
+    mocker.patch.object(database, "get_engine", return_value=engine)
+
+    ready, detail = check_database()
+    assert ready is True
+    assert detail["capacity"] == 1
+
+    with engine.connect():
+        ready, detail = check_database()
+    assert ready is False
+    assert detail["error"] == "connection pool exhausted"
+
+
+def test_check_downstream_unreachable(mocker):
+    mocker.patch.object(settings, "HEALTH_CHECK_TIMEOUT_SECONDS", 0.2)
+    ready, detail = check_downstream("http://127.0.0.1:9")()
+
+    assert ready is False
+    assert detail["url"] == "http://127.0.0.1:9/healthz"
+
+
+def test_hash_queue_counts_waiters():
+    queue = HashQueue(concurrency=1)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with queue.slot():
+            entered.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    entered.wait(5)
+
+    def wait():
+        with queue.slot():
+            pass
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    for _ in range(100):
+        if queue.waiting == 1:
+            break
+        threading.Event().wait(0.01)
+    assert queue.waiting == 1
+
+    release.set()
+    holder.join(5)
+    waiter.join(5)
+    assert queue.waiting == 0
@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database_sharing_service.app import models  # noqa: F401 - registers the idempotency_keys table
+from database_sharing_service.app.database import Base
+from database_sharing_service.app.idempotency import (DatabaseIdempotencyStore, IdempotencyMiddleware,
+                                                      MemoryIdempotencyStore, NEW, REPLAY, StoredResponse)
+
+
+def _memory_store(tmp_path):
+    return MemoryIdempotencyStore(capacity=100, ttl=60, lock_ttl=60)
+
+
+def _database_store(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'idempotency.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return DatabaseIdempotencyStore(sessionmaker(bind=engine), ttl=60, lock_ttl=60)
+
+
+@pytest.fixture(params=[_memory_store, _database_store], ids=["memory", "database"])
+def store(request, tmp_path):
+    return request.param(tmp_path)
+
+
+@pytest.fixture
+def app(store):
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware, store=store, paths=("/signup", "/slow"))
+    app.state.calls = 0
+
+    @app.post("/signup")
+    def signup(payload: dict):
+        app.state.calls += 1
+        if payload.get("fail"):
+            raise HTTPException(status_code=503, detail="down")
+        return {"created": payload["email"], "call": app.state.calls}
+
+    @app.post("/slow")
+    async def slow():
+        await asyncio.sleep(0.3)
+        return {"ok": True}
+
+    @app.post("/other")
+    def other():
+        app.state.calls += 1
+        return {"call": app.state.calls}
+
+    return app
+
+
+def test_repeated_key_replays_the_stored_response(app):
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "abc"}
+
+    first = client.post("/signup", json={"email": "a@example.com"}, headers=headers)
+    second = client.post("/signup", json={"email": "a@example.com"}, headers=headers)
+
+    assert first.json() == second.json() == {"created": "a@example.com", "call": 1}
+    assert app.state.calls == 1
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+
+
+def test_requests_without_a_key_or_on_other_paths_always_run(app):
+    client = TestClient(app)
+
+    client.post("/signup", json={"email": "a@example.com"})
+    client.post("/signup", json={"email": "a@example.com"})
+    client.post("/other", headers={"Idempotency-Key": "abc"})
+    client.post("/other", headers={"Idempotency-Key": "abc"})
+
+    assert app.state.calls == 4
+
+
+def test_key_reused_with_a_different_body_is_rejected(app):
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "abc"}
+    client.post("/signup", json={"email": "a@example.com"}, headers=headers)
+
+    response = client.post("/signup", json={"email": "b@example.com"}, headers=headers)
+
+    assert response.status_code == 422
+    assert app.state.calls == 1
+
+
+def test_server_errors_are_not_stored(app):
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "abc"}
+
+    assert client.post("/signup", json={"fail": True}, headers=headers).status_code == 503
+    assert client.post("/signup", json={"fail": True}, headers=headers).status_code == 503
+    assert app.state.calls == 2
+
+
+def test_concurrent_duplicate_gets_a_conflict(app):
+    import threading
+
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "slow"}
+    results = []
+    first = threading.Thread(target=lambda: results.append(client.post("/slow", headers=headers).status_code))
+    first.start()
+    time.sleep(0.1)
+
+    duplicate = client.post("/slow", headers=headers)
+    first.join()
+
+    assert duplicate.status_code == 409
+    assert duplicate.headers["Retry-After"] == "1"
+    assert results == [200]
+    assert client.post("/slow", headers=headers).headers["Idempotent-Replayed"] == "true"
+
+
+def test_memory_store_is_bounded_and_expires():
+    store = MemoryIdempotencyStore(capacity=2, ttl=0.05, lock_ttl=60)
+    for key in ("a", "b", "c"):
+        assert store.begin(key, "f") == (NEW, None)
+        store.complete(key, StoredResponse(200, [], b"{}"))
+
+    assert len(store) == 2
+    assert store.begin("a", "f") == (NEW, None)
+    assert store.begin("c", "f")[0] == REPLAY
+    time.sleep(0.06)
+    assert store.begin("c", "f") == (NEW, None)
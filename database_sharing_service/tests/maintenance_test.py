@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database_sharing_service.app import models
+from database_sharing_service.app.config import settings
+from database_sharing_service.app.database import Base
+from database_sharing_service.app.maintenance import cleanup_stale_accounts, install_maintenance
+
+NOW = datetime(2024, 11, 4, 12, 0)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cleanup.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        for i in range(7):
+            # Five stale inactive accounts, one recent inactive account and one stale but active account
+            db.add(models.User(email=f"stale{i}@example.com", user_name="u", hashed_password="x",
+                               is_active=i == 6, activation_sent_at=NOW - timedelta(hours=100 if i != 5 else 1)))
+        db.commit()
+    return engine
+
+
+def _emails(engine, model=models.User) -> set[str]:
+    with Session(engine) as db:
+        return {email for email, in db.query(model.email)}
+
+
+def test_cleanup_deletes_only_expired_inactive_accounts(engine):
+    report = cleanup_stale_accounts({"primary": engine}, ttl_hours=72, batch_size=2, pause=0, mode="delete", now=NOW)
+
+    assert _emails(engine) == {"stale5@example.com", "stale6@example.com"}
+    assert _emails(engine, models.ArchivedUser) == set()
+    assert report.to_dict() | {"duration_s": 0} == {
+        "mode": "delete", "cutoff": "2024-11-01T12:00:00", "scanned": 6, "removed": 5, "batches": 4,
+        "duration_s": 0}
+
+
+def test_cleanup_archives_accounts(engine):
+    report = cleanup_stale_accounts({"primary": engine}, ttl_hours=72, batch_size=100, pause=0, mode="archive",
+                                    now=NOW)
+
+    assert report.removed == 5
+    assert _emails(engine, models.ArchivedUser) == {f"stale{i}@example.com" for i in range(5)}
+    with Session(engine) as db:
+        assert all(user.archived_at is not None for user in db.query(models.ArchivedUser))
+
+
+def test_cleanup_archives_a_reused_user_id_again(engine):
+    cleanup_stale_accounts({"primary": engine}, ttl_hours=72, batch_size=100, pause=0, mode="archive", now=NOW)
+    with Session(engine) as db:
+        # SQLite hands the highest deleted id out again
+        db.add(models.User(id=5, email="reused@example.com", user_name="u", hashed_password="x",
+                           activation_sent_at=NOW - timedelta(hours=100)))
+        db.commit()
+
+    report = cleanup_stale_accounts({"primary": engine}, ttl_hours=72, batch_size=100, pause=0, mode="archive",
+                                    now=NOW)
+
+    assert report.removed == 1
+    with Session(engine) as db:
+        assert sorted(email for email, in db.query(models.ArchivedUser.email)
+                      .filter(models.ArchivedUser.user_id == 5)) == ["reused@example.com", "stale4@example.com"]
+
+
+def test_cleanup_keeps_accounts_activated_since_they_were_scanned(engine, mocker):
+    from database_sharing_service.app import maintenance
+
+    real_remove = maintenance.remove_stale_users
+
+    def activate_then_remove(db, user_ids, sent_before, archive=False):
+        db.query(models.User).filter(models.User.email == "stale0@example.com").update({"is_active": True})
+        return real_remove(db, user_ids, sent_before, archive)
+
+    mocker.patch.object(maintenance, "remove_stale_users", side_effect=activate_then_remove)
+
+    report = cleanup_stale_accounts({"primary": engine}, ttl_hours=72, batch_size=100, pause=0, now=NOW)
+
+    assert report.removed == 4
+    assert "stale0@example.com" in _emails(engine)
+
+
+def test_unknown_cleanup_mode_is_rejected(engine):
+    with pytest.raises(ValueError):
+        cleanup_stale_accounts({"primary": engine}, mode="truncate")
+
+
+def test_maintenance_is_disabled_by_default(mocker):
+    mocker.patch.object(settings, "CLEANUP_INTERVAL_SECONDS", 0)
+
+    assert install_maintenance(FastAPI()) is None
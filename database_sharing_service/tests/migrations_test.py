@@ -0,0 +1,103 @@
+import os
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from database_sharing_service.app import crud, models
+from database_sharing_service.app.database import Base
+
+ALEMBIC_INI = os.path.join(os.path.dirname(__file__), "..", "alembic.ini")
+
+
+@pytest.fixture
+def engine(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+def _plans(engine, call) -> list[str]:
+    """
+    Run `call(session)` and return the SQLite query plan of every statement it executed.
+    """
+    statements = []
+
+    def record(conn, cursor, sql, params, *_):
+        statements.append((sql, params))
+
+    event.listen(engine, "before_cursor_execute", record)
+    with Session(engine) as session:
+        call(session)
+    event.remove(engine, "before_cursor_execute", record)
+    with engine.connect() as connection:
+        return [" ".join(row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params))
+                for sql, params in statements]
+
+
+def test_migrations_match_the_models(engine):
+    with engine.connect() as connection:
+        diff = compare_metadata(MigrationContext.configure(connection), Base.metadata)
+
+    assert diff == []
+
+
+def test_email_lookup_is_case_insensitive_and_unique(engine):
+    with Session(engine) as session:
+        session.add(models.User(email="Test@Example.com", user_name="test", hashed_password="x"))
+        session.commit()
+
+        assert crud.get_user_by_email(session, "test@example.COM").email == "Test@Example.com"
+        assert crud.get_user_credentials(session, "test@example.COM").email == "Test@Example.com"
+
+        session.add(models.User(email="test@example.com", user_name="test", hashed_password="x"))
+        with pytest.raises(Exception, match="UNIQUE"):
+            session.commit()
+
+
+@pytest.mark.parametrize("call, index", [
+    (lambda db: crud.get_user_by_email(db, "test@example.com"), "ix_users_email_lower"),
+    (lambda db: crud.get_user_credentials(db, "test@example.com"), "ix_users_email_lower"),
+    (lambda db: crud.get_inactive_users(db, after_id=10), "ix_users_inactive_id"),
+    (lambda db: crud.count_users(db, source="web"), "ix_users_source"),
+    (lambda db: crud.count_users(db, user_identity="student"), "ix_users_user_identity"),
+])
+def test_hot_queries_use_their_index(engine, call, index):
+    plans = _plans(engine, call)
+
+    assert len(plans) == 1
+    assert f"USING INDEX {index}" in plans[0] or f"USING COVERING INDEX {index}" in plans[0]
+
+
+def test_id_lookup_uses_the_primary_key(engine):
+    plans = _plans(engine, lambda db: (crud.get_user_by_id(db, 1), crud.get_user_profile(db, 1)))
+
+    assert len(plans) == 2
+    assert all("USING INTEGER PRIMARY KEY" in plan for plan in plans)
+
+
+def test_read_lookups_return_projected_rows(engine):
+    with Session(engine) as session:
+        session.add(models.User(email="test@example.com", user_name="test", hashed_password="x", source="web"))
+        session.commit()
+        user_id = session.query(models.User.id).scalar()
+
+    with Session(engine) as session:
+        credentials = crud.get_user_credentials(session, "Test@example.com")
+        profile = crud.get_user_profile(session, user_id)
+
+        assert credentials == (user_id, "test@example.com", "x", False)
+        assert profile == ("test@example.com", "test", False, "web", None)
+        # Nothing was loaded into the identity map
+        assert len(session.identity_map) == 0
+        assert crud.get_user_credentials(session, "missing@example.com") is None
+        assert crud.get_user_profile(session, user_id + 1) is None
@@ -0,0 +1,111 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from database_sharing_service.app.config import settings
+from database_sharing_service.app.profiling import Trace, TraceStore, install_profiling, stage
+from database_sharing_service.app.responses import FastJSONResponse
+
+
+ADMIN = {"Authorization": "Bearer admin-secret"}
+
+
+def _profiled_app(mocker, sample_rate=0.0, top_n=5):
+    mocker.patch.object(settings, "PROFILING_ENABLED", True)
+    mocker.patch.object(settings, "ADMIN_TOKEN", "admin-secret")
+    mocker.patch.object(settings, "PROFILING_SAMPLE_RATE", sample_rate)
+    mocker.patch.object(settings, "PROFILING_TOP_N", top_n)
+    app = FastAPI(default_response_class=FastJSONResponse)
+    store = install_profiling(app)
+
+    @app.get("/work")
+    def work(delay: float = 0.0):
+        with stage("db", "query"):
+            time.sleep(delay)
+        with stage("hash"):
+            pass
+        return {"ok": True}
+
+    return app, store
+
+
+def test_stage_is_a_noop_without_a_sampled_request():
+    with stage("db"):
+        pass
+
+
+def test_install_profiling_disabled_by_default(mocker):
+    mocker.patch.object(settings, "PROFILING_ENABLED", False)
+    app = FastAPI()
+
+    assert install_profiling(app) is None
+    assert TestClient(app).get("/admin/profiles").status_code == 404
+
+
+def test_unsampled_requests_are_not_recorded(mocker):
+    app, store = _profiled_app(mocker, sample_rate=0.0)
+    client = TestClient(app)
+
+    assert client.get("/work").status_code == 200
+    assert store.sampled == 0
+
+
+def test_header_forces_sampling_and_records_stages(mocker):
+    app, store = _profiled_app(mocker, sample_rate=0.0)
+    client = TestClient(app)
+
+    assert client.get("/work", headers={"X-Profile": "1"}).status_code == 200
+
+    response = client.get("/admin/profiles", headers=ADMIN)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["sampled"] == 1
+    trace = body["traces"][0]
+    assert trace["path"] == "/work"
+    assert trace["status_code"] == 200
+    assert [span["stage"] for span in trace["spans"]] == ["db", "hash", "serialization"]
+    assert trace["spans"][0]["name"] == "query"
+
+
+def test_admin_endpoint_returns_slowest_first(mocker):
+    app, store = _profiled_app(mocker, sample_rate=1.0)
+    client = TestClient(app)
+
+    client.get("/work", params={"delay": 0.0})
+    client.get("/work", params={"delay": 0.05})
+
+    traces = client.get("/admin/profiles", headers=ADMIN).json()["traces"]
+    # The admin request itself is sampled too, so only look at the /work traces.
+    work = [trace for trace in traces if trace["path"] == "/work"]
+    assert work[0]["duration_ms"] >= work[1]["duration_ms"]
+    assert work[0]["stage_totals_ms"]["db"] >= 50
+
+
+def test_trace_store_keeps_only_the_slowest():
+    store = TraceStore(capacity=2)
+    for duration in (5.0, 1.0, 10.0, 3.0):
+        trace = Trace("GET", f"/{duration}")
+        trace.duration_ms = duration
+        store.add(trace)
+
+    assert store.sampled == 4
+    assert [trace.duration_ms for trace in store.slowest()] == [10.0, 5.0]
+
+
+def test_admin_endpoint_requires_the_admin_token(mocker):
+    app, _ = _profiled_app(mocker)
+    client = TestClient(app)
+
+    assert client.get("/admin/profiles").status_code == 401
+    assert client.get("/admin/profiles", headers={"Authorization": "Bearer guess"}).status_code == 401
+    assert client.get("/admin/profiles", headers=ADMIN).status_code == 200
+
+
+def test_admin_endpoint_is_left_out_without_an_admin_token(mocker):
+    mocker.patch.object(settings, "PROFILING_ENABLED", True)
+    mocker.patch.object(settings, "ADMIN_TOKEN", "")
+    app = FastAPI()
+
+    assert install_profiling(app) is not None
+    assert TestClient(app).get("/admin/profiles").status_code == 404
@@ -0,0 +1,134 @@
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from database_sharing_service.app import models
+from database_sharing_service.app.crud import get_user_by_email
+from database_sharing_service.app.database import (PRIMARY_PIN_COOKIE, PRIMARY_PIN_HEADER, Base, ReadYourWritesMiddleware,
+                                                   ReplicaPool, SessionRouter, get_read_db, get_write_db,
+                                                   _sign_pin_expiry, primary_pin_headers, primary_pin_token)
+
+
+def _database(path, user_name):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(models.User(email="test@example.com", user_name=user_name, hashed_password="x"))
+        db.commit()
+    return engine
+
+
+@pytest.fixture
+def router(tmp_path, mocker):
+    """
+    A primary and a replica SQLite file holding the same user under different names, so a read shows
+    which database served it.
+    """
+    primary = _database(tmp_path / "primary.db", "on-primary")
+    _database(tmp_path / "replica.db", "on-replica")
+    router = SessionRouter(sessionmaker(bind=primary), ReplicaPool([f"sqlite:///{tmp_path / 'replica.db'}"], 60))
+    mocker.patch("database_sharing_service.app.database.get_session_router", return_value=router)
+    return router
+
+
+@pytest.fixture
+def client(router):
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=5)
+
+    @app.get("/name")
+    def read_name(db: Session = Depends(get_read_db)):
+        return {"name": get_user_by_email(db, "test@example.com").user_name,
+                "pin_headers": primary_pin_headers()}
+
+    @app.post("/name")
+    def write_name(name: str, db: Session = Depends(get_write_db)):
+        get_user_by_email(db, "test@example.com").user_name = name
+        db.commit()
+        return {"name": name}
+
+    @app.post("/noop")
+    def noop(db: Session = Depends(get_write_db)):
+        get_user_by_email(db, "test@example.com")
+        db.commit()
+        return {}
+
+    return TestClient(app)
+
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(router):
+    with router.read_session() as db:
+        assert get_user_by_email(db, "test@example.com").user_name == "on-replica"
+    with router.write_session() as db:
+        assert get_user_by_email(db, "test@example.com").user_name == "on-primary"
+
+
+def test_without_replicas_reads_use_the_primary(router):
+    router.replicas = None
+
+    with router.read_session() as db:
+        assert get_user_by_email(db, "test@example.com").user_name == "on-primary"
+
+
+def test_unreachable_replica_falls_back_to_the_primary_and_is_skipped(tmp_path, router):
+    router.replicas = ReplicaPool([f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"], retry_after=60)
+    engine = router.replicas.engines[0]
+
+    with router.read_session() as db:
+        assert get_user_by_email(db, "test@example.com").user_name == "on-primary"
+    assert router.replicas.candidates() == []
+
+    router.replicas.retry_after = 0
+    router.replicas.mark_down(engine)
+    assert router.replicas.candidates() == [engine]
+
+
+def test_replicas_are_used_round_robin(tmp_path):
+    pool = ReplicaPool([f"sqlite:///{tmp_path / 'a.db'}", f"sqlite:///{tmp_path / 'b.db'}"], 60)
+
+    assert [pool.candidates()[0] for _ in range(4)] == [pool.engines[0], pool.engines[1]] * 2
+
+
+def test_writes_pin_the_client_to_the_primary(client):
+    assert client.get("/name").json()["name"] == "on-replica"
+
+    response = client.post("/name", params={"name": "renamed"})
+
+    assert PRIMARY_PIN_COOKIE in response.cookies
+    read = client.get("/name").json()
+    assert read == {"name": "renamed", "pin_headers": {PRIMARY_PIN_HEADER: primary_pin_token()}}
+
+
+def test_commits_without_changes_do_not_pin(client):
+    response = client.post("/noop")
+
+    assert PRIMARY_PIN_COOKIE not in response.cookies
+    assert client.get("/name").json()["name"] == "on-replica"
+
+
+def test_expired_pin_reads_from_the_replica(client):
+    client.cookies.set(PRIMARY_PIN_COOKIE, "1.0")
+
+    assert client.get("/name").json()["name"] == "on-replica"
+
+
+def test_forged_pin_cookies_are_ignored(client):
+    client.cookies.set(PRIMARY_PIN_COOKIE, "99999999999")
+    assert client.get("/name").json()["name"] == "on-replica"
+
+    # Signed, but further ahead than the sticky period a write grants
+    until = f"{time.time() + 3600:.3f}"
+    client.cookies.set(PRIMARY_PIN_COOKIE, f"{until}-{_sign_pin_expiry(until)}")
+    assert client.get("/name").json()["name"] == "on-replica"
+
+
+def test_pin_header_from_an_upstream_service_is_honoured(client):
+    assert client.get("/name", headers={PRIMARY_PIN_HEADER: primary_pin_token()}).json()["name"] == "on-primary"
+
+
+def test_pin_header_without_the_internal_token_is_ignored(client):
+    assert client.get("/name", headers={PRIMARY_PIN_HEADER: "1"}).json()["name"] == "on-replica"
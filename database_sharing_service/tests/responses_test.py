@@ -0,0 +1,28 @@
+import json
+from types import SimpleNamespace
+
+from database_sharing_service.app import schemas
+from database_sharing_service.app.responses import FastJSONResponse, user_response
+
+
+def test_fast_response_renders_plain_content():
+    response = FastJSONResponse({"status": "200", "message": "ok", 1: [True, None]})
+
+    assert json.loads(response.body) == {"status": "200", "message": "ok", "1": [True, None]}
+    assert response.headers["content-type"] == "application/json"
+
+
+def test_fast_response_renders_models_directly():
+    response = FastJSONResponse(schemas.TokenData(email="test@example.com", id="abc"))
+
+    assert json.loads(response.body) == {"email": "test@example.com", "id": "abc"}
+
+
+def test_user_response_matches_the_user_schema():
+    row = SimpleNamespace(email="test@example.com", user_name="test", is_active=False, source=None,
+                          user_identity="student", hashed_password="secret")
+
+    body = json.loads(user_response(row).body)
+
+    assert body == schemas.User.model_validate(row).model_dump()
+    assert "hashed_password" not in body
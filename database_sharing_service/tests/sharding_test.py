@@ -0,0 +1,147 @@
+import collections
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database_sharing_service.app import crud, database, models, sharding
+from database_sharing_service.app.authentication import auth_engine
+from database_sharing_service.app.config import settings
+from database_sharing_service.app.database import Base
+from database_sharing_service.app.rebalance import copy_users, prune_users
+from database_sharing_service.app.schemas import UserCreate
+from database_sharing_service.app.sharding import BUCKETS, ShardMap, decode_user_id, email_bucket, encode_user_id
+from database_sharing_service.app.stats import UserStatsCache, reconcile_user_stats
+
+EMAILS = [f"User{i}@example.com" for i in range(24)]
+
+
+def _clear_caches():
+    for getter in (sharding.get_shard_map, database.get_shard_engines, database.get_sessionmaker,
+                   database.get_session_router):
+        getter.cache_clear()
+
+
+@pytest.fixture
+def shards(tmp_path, mocker):
+    """
+    Turn sharding on over three SQLite files, with the first two owning every bucket.
+    """
+    urls = [f"sqlite:///{tmp_path / f'shard{index}.db'}" for index in range(3)]
+    for url in urls:
+        Base.metadata.create_all(bind=create_engine(url))
+    ShardMap.even(2).dump(str(tmp_path / "map.json"))
+    mocker.patch.object(settings, "DATABASE_SHARD_URLS", urls)
+    mocker.patch.object(settings, "SHARD_MAP_PATH", str(tmp_path / "map.json"))
+    mocker.patch.object(crud, "hash_password", return_value="hashed")
+    _clear_caches()
+    yield [create_engine(url) for url in urls]
+    _clear_caches()
+
+
+def _signup(emails):
+    with database.get_sessionmaker()() as db:
+        return {email: crud.create_user(db, UserCreate(email=email, user_name="user", password="x")).public_id
+                for email in emails}
+
+
+def _rows(engine) -> set[str]:
+    with Session(engine) as db:
+        return {email for email, in db.query(models.User.email)}
+
+
+def test_user_ids_round_trip_through_the_encoding():
+    assert decode_user_id(encode_user_id(5, 12345)) == (5, 12345)
+    assert encode_user_id(0, 1) != encode_user_id(1, 1)
+
+
+def test_email_bucket_is_stable_and_normalised():
+    assert email_bucket(" Test@Example.COM") == email_bucket("test@example.com")
+    # crc32 of the normalised email; must never change or users would be looked up on the wrong shard
+    assert email_bucket("test@example.com") == 906
+
+
+def test_rebalancing_moves_only_the_surplus_buckets():
+    two = ShardMap.even(2)
+
+    three = two.rebalanced(3)
+
+    assert sorted(collections.Counter(three.owners).values()) == [341, 341, 342]
+    assert sum(old != new for old, new in zip(two.owners, three.owners)) == BUCKETS // 3
+    assert three.rebalanced(3).owners == three.owners
+
+
+def test_users_are_stored_on_the_shard_owning_their_email(shards):
+    ids = _signup(EMAILS)
+
+    shard_map = sharding.get_shard_map()
+    for index, engine in enumerate(shards):
+        assert _rows(engine) == {email for email in EMAILS if shard_map.shard_for_email(email) == index}
+    assert _rows(shards[0]) and _rows(shards[1])
+    assert {decode_user_id(ids[email])[0] for email in EMAILS} == {0, 1}
+
+
+def test_lookups_go_to_the_owning_shard(shards):
+    ids = _signup(EMAILS)
+
+    with database.get_sessionmaker()() as db:
+        for email in EMAILS:
+            assert crud.get_user_by_email(db, email.upper()).public_id == ids[email]
+            assert crud.get_user_by_id(db, crud.decrypt_user_id(crud.encrypt_user_id(ids[email]))).email == email
+            assert crud.get_user_credentials(db, email.upper()).public_id == ids[email]
+            assert crud.get_user_by_email(db, f"  {email} ").public_id == ids[email]
+            assert crud.get_user_credentials(db, f"  {email} ").public_id == ids[email]
+            assert crud.get_user_profile(db, ids[email]).email == email
+        assert crud.count_users(db) == len(EMAILS)
+        assert UserStatsCache().refresh()["total"] == len(EMAILS)
+        inactive = [user for shard_id in database.get_shard_ids()
+                    for user in crud.get_inactive_users(db, limit=100, shard_id=shard_id)]
+        assert len(inactive) == len(EMAILS)
+
+
+def test_ids_naming_no_configured_shard_find_no_user(shards):
+    ids = _signup(EMAILS[:1])
+    foreign_id = encode_user_id(7, 1)
+    issued_before_sharding = 5
+
+    with database.get_sessionmaker()() as db:
+        for user_id in (foreign_id, issued_before_sharding):
+            assert crud.get_user_by_id(db, user_id) is None
+            assert crud.get_user_profile(db, user_id) is None
+        assert crud.get_active_user_ids(db, [foreign_id, issued_before_sharding, *ids.values()]) == set()
+
+
+def test_auth_tokens_carry_the_sharded_id(shards, mocker):
+    ids = _signup(EMAILS[:1])
+    mocker.patch("database_sharing_service.app.authentication.verify_password", return_value=True)
+
+    with database.get_sessionmaker()() as db:
+        user = crud.get_user_credentials(db, EMAILS[0])
+        token = auth_engine.issue_token(user, EMAILS[0], "x").access_token
+
+    assert crud.decrypt_user_id(auth_engine.validate_token(token).id) == str(ids[EMAILS[0]])
+
+
+def test_rebalance_copies_then_prunes_moved_users(shards, tmp_path, mocker):
+    old_ids = _signup(EMAILS)
+    target = sharding.get_shard_map().rebalanced(3)
+
+    remap = dict(copy_users(shards, target, batch_size=5))
+    assert copy_users(shards, target, batch_size=5) == list(remap.items())  # idempotent
+
+    moved = {email for email in EMAILS if target.shard_for_email(email) == 2}
+    assert moved and _rows(shards[2]) == moved
+
+    target.dump(str(tmp_path / "new_map.json"))
+    mocker.patch.object(settings, "SHARD_MAP_PATH", str(tmp_path / "new_map.json"))
+    _clear_caches()
+
+    assert prune_users(shards, target, batch_size=5) == len(moved)
+    assert sum(len(_rows(engine)) for engine in shards) == len(EMAILS)
+    # The counters moved along with the users
+    assert reconcile_user_stats(dict(enumerate(shards))) == 0
+    with database.get_sessionmaker()() as db:
+        for email in EMAILS:
+            new_id = remap.get(old_ids[email], old_ids[email])
+            assert crud.get_user_by_email(db, email).public_id == new_id
+            assert crud.get_user_by_id(db, new_id).email == email
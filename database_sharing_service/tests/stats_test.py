@@ -0,0 +1,136 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+
+from database_sharing_service.app import crud, models, stats
+from database_sharing_service.app.database import Base
+from database_sharing_service.app.stats import UserStatsCache, install_user_stats, reconcile_user_stats
+
+NOW = datetime(2024, 12, 2, 12, 0)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        for i in range(5):
+            db.add(models.User(email=f"user{i}@example.com", user_name="u", hashed_password="x",
+                               source="web" if i < 3 else None, user_identity="student",
+                               activation_sent_at=NOW - timedelta(hours=100)))
+        db.commit()
+    return engine
+
+
+def _counters(engine) -> dict:
+    with Session(engine) as db:
+        return {(stat.source, stat.user_identity, stat.is_active): stat.count
+                for stat in db.query(models.UserStat) if stat.count}
+
+
+def _add_user(engine, email: str):
+    with Session(engine) as db:
+        db.add(models.User(email=email, user_name="u", hashed_password="x", source="web"))
+        db.commit()
+
+
+def test_counters_follow_signups_and_activation(engine):
+    assert _counters(engine) == {("web", "student", False): 3, ("", "student", False): 2}
+
+    with Session(engine) as db:
+        user = db.query(models.User).filter(models.User.email == "user0@example.com").one()
+        user.is_active = True
+        db.commit()
+
+    assert _counters(engine) == {("web", "student", False): 2, ("web", "student", True): 1,
+                                 ("", "student", False): 2}
+
+
+def test_counters_are_rolled_back_with_the_user(engine):
+    with Session(engine) as db:
+        db.add(models.User(email="rolled-back@example.com", user_name="u", hashed_password="x", source="web"))
+        db.flush()
+        db.rollback()
+
+    assert ("web", "", False) not in _counters(engine)
+
+
+def test_bulk_removal_subtracts_from_the_counters(engine):
+    with Session(engine) as db:
+        ids = [user_id for user_id, in db.query(models.User.id).filter(models.User.source == "web")]
+        assert crud.remove_stale_users(db, ids, NOW) == 3
+        db.commit()
+
+    assert _counters(engine) == {("", "student", False): 2}
+
+
+def test_reconciliation_repairs_drift(engine):
+    with Session(engine) as db:
+        db.execute(update(models.UserStat).values(count=42))
+        db.commit()
+
+    assert reconcile_user_stats({"primary": engine}) == 2
+    assert _counters(engine) == {("web", "student", False): 3, ("", "student", False): 2}
+    assert reconcile_user_stats({"primary": engine}) == 0
+
+
+def test_reconciliation_keeps_counters_committed_during_the_recount(engine, mocker):
+    recount = stats._recount
+
+    def sign_up_meanwhile(db):
+        counts = recount(db)
+        # Lands between the recount and the correction, and must neither wait for nor be undone by it.
+        _add_user(engine, "during@example.com")
+        return counts
+
+    with Session(engine) as db:
+        db.execute(update(models.UserStat).values(count=42))
+        db.commit()
+    mocker.patch.object(stats, "_recount", side_effect=sign_up_meanwhile)
+    assert reconcile_user_stats({"primary": engine}) == 2
+    mocker.stopall()
+
+    assert _counters(engine) == {("web", "student", False): 3, ("", "student", False): 2, ("web", "", False): 1}
+    assert reconcile_user_stats({"primary": engine}) == 0
+
+
+def test_reconciliation_runs_on_its_own_schedule(engine, mocker):
+    mocker.patch.object(stats.settings, "STATS_RECONCILE_SECONDS", 0.05)
+    with Session(engine) as db:
+        db.execute(update(models.UserStat).values(count=42))
+        db.commit()
+
+    app = FastAPI()
+    install_user_stats(app, UserStatsCache({"primary": engine}))
+    with TestClient(app):
+        deadline = time.monotonic() + 5
+        while _counters(engine) != {("web", "student", False): 3, ("", "student", False): 2}:
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+
+
+def test_endpoint_serves_the_cached_snapshot(engine):
+    app = FastAPI()
+    cache = install_user_stats(app, UserStatsCache({"primary": engine}))
+    client = TestClient(app)
+
+    body = client.get("/stats/users").json()
+    assert body["total"] == 5
+    assert (body["active"], body["inactive"]) == (0, 5)
+    assert body["by_source"] == {"web": 3, "unspecified": 2}
+    assert body["by_user_identity"] == {"student": 5}
+    assert {"source": None, "user_identity": "student", "is_active": False, "count": 2} in body["groups"]
+
+    with Session(engine) as db:
+        db.add(models.User(email="new@example.com", user_name="u", hashed_password="x", source="web"))
+        db.commit()
+
+    # Served from memory until the next refresh
+    assert client.get("/stats/users").json()["total"] == 5
+    cache.refresh()
+    assert client.get("/stats/users").json()["by_source"] == {"web": 4, "unspecified": 2}
@@ -0,0 +1,164 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from database_sharing_service.app import tracing
+from database_sharing_service.app.config import settings
+from database_sharing_service.app.profiling import stage
+from database_sharing_service.app.tracing import (FileSpanExporter, InMemorySpanExporter, OTLPSpanExporter, Span,
+                                                  format_traceparent, inject_headers, install_tracing,
+                                                  parse_traceparent)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def exporter(mocker):
+    exporter = InMemorySpanExporter()
+    mocker.patch.object(settings, "TRACING_ENABLED", True)
+    mocker.patch.object(tracing.tracer, "exporter", exporter)
+    mocker.patch.object(tracing.tracer, "sample_rate", 1.0)
+    return exporter
+
+
+def _downstream_app():
+    app = FastAPI()
+    install_tracing(app, "auth_service")
+
+    @app.post("/generate-token")
+    def generate_token():
+        with stage("hash", "verify_password"):
+            pass
+        return {"access_token": "token"}
+
+    return app
+
+
+def _upstream_app(downstream: TestClient):
+    app = FastAPI()
+    install_tracing(app, "user_service")
+
+    @app.post("/login")
+    def login():
+        with stage("db", "get_user_by_email"):
+            pass
+        with stage("http", "auth.generate-token"):
+            return downstream.post("/generate-token", headers=inject_headers()).json()
+
+    return app
+
+
+def test_parse_traceparent():
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID, 0x01)
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00") == (TRACE_ID, PARENT_ID, 0x00)
+    assert parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
+
+
+def test_format_traceparent_round_trips():
+    span = Span("op", TRACE_ID, None, "internal", "svc")
+    assert parse_traceparent(format_traceparent(span)) == (TRACE_ID, span.span_id, 0x01)
+    span = Span("op", TRACE_ID, None, "internal", "svc", flags=0x03)
+    assert format_traceparent(span).endswith("-03")
+
+
+def test_inject_headers_without_active_span_is_empty():
+    assert inject_headers() == {}
+
+
+def test_incoming_traceparent_is_continued(exporter):
+    client = TestClient(_downstream_app())
+
+    response = client.post("/generate-token", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+
+    assert parse_traceparent(response.headers["traceparent"])[0] == TRACE_ID
+    server = next(span for span in exporter.spans if span.kind == "server")
+    assert server.trace_id == TRACE_ID
+    assert server.parent_span_id == PARENT_ID
+    assert server.service == "auth_service"
+
+
+def test_unsampled_traceparent_is_not_recorded(exporter):
+    client = TestClient(_downstream_app())
+
+    client.post("/generate-token", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-00"})
+
+    assert list(exporter.spans) == []
+
+
+def test_unsampled_trace_context_is_forwarded_unchanged(exporter):
+    app = FastAPI()
+    install_tracing(app, "user_service")
+
+    @app.get("/forward")
+    def forward():
+        with stage("http", "auth.generate-token"):
+            return inject_headers()
+
+    headers = TestClient(app).get("/forward", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-00",
+                                                        "tracestate": "vendor=opaque"}).json()
+
+    trace_id, _, flags = parse_traceparent(headers["traceparent"])
+    assert (trace_id, flags) == (TRACE_ID, 0x00)
+    assert headers["tracestate"] == "vendor=opaque"
+    assert list(exporter.spans) == []
+
+
+def test_spans_are_connected_across_services(exporter):
+    downstream = TestClient(_downstream_app())
+    client = TestClient(_upstream_app(downstream))
+
+    assert client.post("/login").json() == {"access_token": "token"}
+
+    spans = {(span.service, span.name): span for span in exporter.spans}
+    login = spans[("user_service", "POST /login")]
+    db = spans[("user_service", "get_user_by_email")]
+    outbound = spans[("user_service", "auth.generate-token")]
+    inbound = spans[("auth_service", "POST /generate-token")]
+    hashing = spans[("auth_service", "verify_password")]
+
+    assert len({span.trace_id for span in exporter.spans}) == 1
+    assert db.parent_span_id == login.span_id
+    assert outbound.kind == "client" and outbound.parent_span_id == login.span_id
+    assert inbound.parent_span_id == outbound.span_id
+    assert hashing.parent_span_id == inbound.span_id
+
+
+def test_tracestate_is_forwarded_across_services(exporter):
+    downstream = TestClient(_downstream_app())
+    client = TestClient(_upstream_app(downstream))
+
+    client.post("/login", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01", "tracestate": "vendor=opaque"})
+
+    assert {span.tracestate for span in exporter.spans} == {"vendor=opaque"}
+    assert {span.flags for span in exporter.spans} == {0x01}
+
+
+def test_file_exporter_writes_json_lines(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    exporter = FileSpanExporter(str(path))
+    span = Span("op", TRACE_ID, PARENT_ID, "internal", "svc", {"stage": "db"})
+    tracing.Tracer(exporter).finish(span)
+
+    record = json.loads(path.read_text().splitlines()[0])
+    assert record["trace_id"] == TRACE_ID
+    assert record["parent_span_id"] == PARENT_ID
+    assert record["attributes"] == {"stage": "db"}
+
+
+def test_otlp_encoding_groups_spans_by_service():
+    span = Span("op", TRACE_ID, PARENT_ID, "client", "user_service", {"stage": "http"})
+    span.end_time_ns = span.start_time_ns + 1000
+
+    payload = OTLPSpanExporter.encode([span])
+
+    resource = payload["resourceSpans"][0]
+    assert resource["resource"]["attributes"][0]["value"]["stringValue"] == "user_service"
+    encoded = resource["scopeSpans"][0]["spans"][0]
+    assert encoded["traceId"] == TRACE_ID
+    assert encoded["parentSpanId"] == PARENT_ID
+    assert encoded["kind"] == 3
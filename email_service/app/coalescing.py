@@ -0,0 +1,146 @@
+import asyncio
+import inspect
+import time
+from collections import deque
+
+from database_sharing_service.app.logging_config import get_logger
+from database_sharing_service.app.metrics import registry
+
+logger = get_logger("Email_Coalescer")
+
+# Outcomes of `EmailCoalescer.submit`
+SEND_NOW, QUEUED, RATE_LIMITED = "send_now", "queued", "rate_limited"
+
+RATE_WINDOW_SECONDS = 3600
+# Forget recipients without a send in the last hour every this many submissions, bounding memory.
+SWEEP_EVERY = 1000
+
+email_messages = registry.counter("email_messages_total",
+                                  "Emails by template and fate: sent, superseded by a newer one, or rate limited.",
+                                  ("template", "outcome"))
+
+
+class _Window:
+    def __init__(self):
+        self.pending = None  # (message, send) of the latest message submitted during the window
+        self.timer = None  # the asyncio.TimerHandle closing the window
+
+
+class EmailCoalescer:
+    """
+    Throttles emails per (recipient, template).
+
+    The first message for a key goes out at once and opens a `window`-second window. Messages submitted
+    during the window replace each other, and only the latest is sent when the window closes (opening
+    the next one), so a user clicking "forgot password" ten times gets at most two emails, the second
+    carrying the newest token. On top of that no recipient gets more than `max_per_hour` emails an hour.
+
+    Lives on the event loop of one worker; it is not thread-safe and does not coordinate workers. Call `flush`
+    on shutdown, so messages still waiting for their window are sent rather than lost.
+    """
+
+    def __init__(self, window: float, max_per_hour: int, clock=time.monotonic):
+        self.window = window
+        self.max_per_hour = max_per_hour
+        self.clock = clock
+        self._windows: dict[tuple[str, str], _Window] = {}
+        self._sent: dict[str, deque] = {}
+        self._submissions = 0
+        # Sends started when a window closed; referenced until done, as the event loop keeps only weak references
+        self._sending: set[asyncio.Future] = set()
+
+    def _recent_sends(self, recipient: str) -> deque:
+        sent = self._sent.setdefault(recipient, deque())
+        horizon = self.clock() - RATE_WINDOW_SECONDS
+        while sent and sent[0] <= horizon:
+            sent.popleft()
+        return sent
+
+    def _sweep(self):
+        for recipient in list(self._sent):
+            if not self._recent_sends(recipient):
+                del self._sent[recipient]
+
+    def _take_send_slot(self, recipient: str) -> bool:
+        sent = self._recent_sends(recipient)
+        if self.max_per_hour and len(sent) >= self.max_per_hour:
+            return False
+        sent.append(self.clock())
+        return True
+
+    def retry_after(self, recipient: str) -> int:
+        """
+        Seconds until `recipient` may receive another email.
+        """
+        sent = self._recent_sends(recipient.lower())
+        if not self.max_per_hour or len(sent) < self.max_per_hour:
+            return 0
+        return max(1, int(sent[0] + RATE_WINDOW_SECONDS - self.clock()))
+
+    def _open_window(self, key: tuple[str, str]):
+        window = self._windows[key] = _Window()
+        window.timer = asyncio.get_running_loop().call_later(self.window, self._close_window, key)
+
+    def _close_window(self, key: tuple[str, str]):
+        window = self._windows.pop(key, None)
+        if window is None or window.pending is None:
+            return
+        if self._send_pending(key, window):
+            self._open_window(key)
+
+    def _send_pending(self, key: tuple[str, str], window: _Window) -> bool:
+        message, send = window.pending
+        if not self._take_send_slot(key[0]):
+            email_messages.inc(template=key[1], outcome="rate_limited")
+            return False
+        email_messages.inc(template=key[1], outcome="sent")
+        result = send(message)
+        if inspect.isawaitable(result):
+            task = asyncio.ensure_future(result)
+            self._sending.add(task)
+            task.add_done_callback(self._send_done)
+        return True
+
+    def _send_done(self, task):
+        self._sending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Sending a coalesced email failed: {task.exception()}")
+
+    async def flush(self):
+        """
+        Send the messages still waiting for their window to close, and wait for every send in flight.
+        """
+        windows, self._windows = self._windows, {}
+        for key, window in windows.items():
+            window.timer.cancel()
+            if window.pending is not None:
+                logger.info(f"Sending queued {key[1]} email to {key[0]} before shutdown")
+                self._send_pending(key, window)
+        if self._sending:
+            await asyncio.wait(set(self._sending))
+
+    def submit(self, recipient: str, template: str, message, send) -> str:
+        """
+        Decide what to do with `message` for `recipient`.
+
+        Returns SEND_NOW when the caller should send it, QUEUED when it will be sent with `send` at the end of
+        the current window (unless superseded first), or RATE_LIMITED when it is dropped.
+        """
+        self._submissions += 1
+        if self._submissions % SWEEP_EVERY == 0:
+            self._sweep()
+        recipient = recipient.lower()
+        key = (recipient, template)
+        window = self._windows.get(key)
+        if window is not None:
+            if window.pending is not None:
+                email_messages.inc(template=template, outcome="superseded")
+            window.pending = (message, send)
+            return QUEUED
+        if not self._take_send_slot(recipient):
+            email_messages.inc(template=template, outcome="rate_limited")
+            return RATE_LIMITED
+        email_messages.inc(template=template, outcome="sent")
+        if self.window > 0:
+            self._open_window(key)
+        return SEND_NOW
@@ -1,11 +1,17 @@
-import uvicorn
-from fastapi import FastAPI, BackgroundTasks
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+from fastapi import FastAPI, BackgroundTasks, HTTPException
 from pydantic import EmailStr
 
 from database_sharing_service.app import schemas
 from database_sharing_service.app.config import settings
+from database_sharing_service.app.health import install_health
+from database_sharing_service.app.idempotency import install_idempotency
 from database_sharing_service.app.logging_config import get_logger
+from database_sharing_service.app.metrics import install_metrics
+from database_sharing_service.app.profiling import install_profiling
+from database_sharing_service.app.responses import FastJSONResponse
+from database_sharing_service.app.tracing import install_tracing
+from email_service.app.coalescing import RATE_LIMITED, SEND_NOW, EmailCoalescer
+from email_service.app.transports import OutgoingEmail, get_transport
 
 email_app = FastAPI(
     title="Email Service API",
@@ -17,21 +23,39 @@ email_app = FastAPI(
             "description": "Operations related to sending emails for account activation and password resets.",
         },
     ],
+    default_response_class=FastJSONResponse,
 )
 
 logger = get_logger("Email_Service")
+install_profiling(email_app)
+install_tracing(email_app, "email_service")
+install_metrics(email_app)
+install_idempotency(email_app, ("/send-activation-email", "/send-password-reset-email"))
+email_admission = install_health(email_app, {})
+coalescer = EmailCoalescer(settings.EMAIL_COALESCE_WINDOW_SECONDS, settings.EMAIL_MAX_PER_RECIPIENT_PER_HOUR)
+
+
+async def close_transport():
+    if get_transport.cache_info().currsize:
+        await get_transport().close()
 
-# Configuring the email connection using FastAPI-Mail
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.MAIL_USERNAME,
-    MAIL_PASSWORD=settings.MAIL_PASSWORD,
-    MAIL_FROM=settings.MAIL_FROM,
-    MAIL_PORT=settings.SMTP_PORT,
-    MAIL_SERVER=settings.SMTP_SERVER,
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True
-)
+
+# Queued messages go out before the transport closes
+email_app.add_event_handler("shutdown", coalescer.flush)
+email_app.add_event_handler("shutdown", close_transport)
+
+
+def dispatch(email: str, template: str, message: OutgoingEmail, background_tasks: BackgroundTasks):
+    """
+    Send `message` after the response, or leave it to the coalescer; 429 when the recipient's cap is reached.
+    """
+    outcome = coalescer.submit(email, template, message, get_transport().send)
+    if outcome == RATE_LIMITED:
+        logger.warning(f"Dropped {template} email to {email}: recipient rate limit reached")
+        raise HTTPException(status_code=429, detail="Too many emails to this recipient",
+                            headers={"Retry-After": str(coalescer.retry_after(email))})
+    if outcome == SEND_NOW:
+        background_tasks.add_task(get_transport().send, message)
 
 
 @email_app.post("/send-activation-email", response_model=schemas.Message, tags=["Emails"],
@@ -49,14 +73,13 @@ async def send_activation_email(email: EmailStr, token: str, background_tasks: B
     logger.info(f"Sending activation email to: {email}")
     # todo: update the activation link when we decided on which URL to use
     activation_link = f"https://frontend-i-xtech.azurewebsites.net/activate/{token}"
-    message = MessageSchema(
+    message = OutgoingEmail(
         subject="Activate Your Account",
         recipients=[email],
         body=f"Please activate your account by clicking <a href='{activation_link}'>here</a>.",
         subtype="html"
     )
-    fm = FastMail(conf)
-    background_tasks.add_task(fm.send_message, message)
+    dispatch(email, "activation", message, background_tasks)
     logger.info(f"Activation email queued for sending to: {email}")
     return {"status": "200", "message": "Activation email sent"}
 
@@ -75,17 +98,18 @@ async def send_password_reset_email(email: str, token: str, background_tasks: Ba
     """
     logger.info(f"Sending password reset email to: {email}")
     reset_link = f"https://frontend-i-xtech.azurewebsites.net/reset/{token}"
-    message = MessageSchema(
+    message = OutgoingEmail(
         subject="Reset Your Password",
         recipients=[email],
         body=f"Please reset your password by clicking <a href='{reset_link}'>here</a>.",
         subtype="html"
     )
-    fm = FastMail(conf)
-    background_tasks.add_task(fm.send_message, message)
+    dispatch(email, "password_reset", message, background_tasks)
     logger.info(f"Password reset email queued for sending to: {email}")
     return {"status": "200", "message": "Password reset email sent"}
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("main:email_app", host="0.0.0.0", port=8003, reload=True)
@@ -0,0 +1,243 @@
+import asyncio
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from email.message import EmailMessage
+from functools import lru_cache
+
+from database_sharing_service.app.config import settings
+from database_sharing_service.app.logging_config import get_logger
+from database_sharing_service.app.metrics import registry
+
+logger = get_logger("Email_Transport")
+
+transport_messages = registry.counter("email_transport_messages_total",
+                                      "Messages handed to an email transport, by outcome (sent or failed).",
+                                      ("transport", "outcome"))
+transport_send_seconds = registry.counter("email_transport_send_seconds_total",
+                                          "Seconds spent sending; divide by messages for the mean send time.",
+                                          ("transport",))
+transport_connections = registry.counter("email_transport_connections_total",
+                                         "SMTP connections opened by pooled transports.", ("transport",))
+
+
+class OutgoingEmail:
+    def __init__(self, recipients: list[str], subject: str, body: str, subtype: str = "html"):
+        self.recipients = recipients
+        self.subject = subject
+        self.body = body
+        self.subtype = subtype
+
+    def to_mime(self, sender: str) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = sender
+        message["To"] = ", ".join(self.recipients)
+        message["Subject"] = self.subject
+        message.set_content(self.body, subtype=self.subtype)
+        return message
+
+
+class EmailTransport(ABC):
+    """
+    Delivers `OutgoingEmail`s. Subclasses implement `_send`; `send` adds the per-transport metrics.
+    """
+
+    name = "base"
+
+    async def send(self, message: OutgoingEmail):
+        started = time.perf_counter()
+        try:
+            await self._send(message)
+        except Exception:
+            transport_messages.inc(transport=self.name, outcome="failed")
+            raise
+        finally:
+            transport_send_seconds.inc(time.perf_counter() - started, transport=self.name)
+        transport_messages.inc(transport=self.name, outcome="sent")
+
+    @abstractmethod
+    async def _send(self, message: OutgoingEmail):
+        ...
+
+    async def close(self):
+        pass
+
+
+class FastMailTransport(EmailTransport):
+    """
+    FastAPI-Mail, which opens (and authenticates) a new SMTP connection for every message.
+    """
+
+    name = "fastapi_mail"
+
+    def __init__(self):
+        from fastapi_mail import ConnectionConfig, FastMail
+
+        # Configuring the email connection using FastAPI-Mail
+        conf = ConnectionConfig(
+            MAIL_USERNAME=settings.MAIL_USERNAME,
+            MAIL_PASSWORD=settings.MAIL_PASSWORD,
+            MAIL_FROM=settings.MAIL_FROM,
+            MAIL_PORT=settings.SMTP_PORT,
+            MAIL_SERVER=settings.SMTP_SERVER,
+            MAIL_STARTTLS=settings.MAIL_STARTTLS,
+            MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
+            USE_CREDENTIALS=settings.MAIL_USE_CREDENTIALS
+        )
+        self.mailer = FastMail(conf)
+
+    async def _send(self, message: OutgoingEmail):
+        from fastapi_mail import MessageSchema
+
+        await self.mailer.send_message(MessageSchema(subject=message.subject, recipients=message.recipients,
+                                                     body=message.body, subtype=message.subtype))
+
+
+class SMTPPoolTransport(EmailTransport):
+    """
+    Keeps up to `size` authenticated aiosmtplib connections open and reuses them across messages, so a
+    send costs one MAIL/RCPT/DATA exchange instead of a TCP (and TLS) handshake, EHLO and AUTH.
+
+    Connections are opened lazily and checked out one message at a time, so at most `size` messages are
+    in flight. A connection the server dropped (idle timeout) is reopened and the message retried once.
+    Bound to the event loop of the worker that first uses it.
+    """
+
+    name = "smtp_pool"
+
+    def __init__(self, hostname: str, port: int, size: int, username: str | None = None,
+                 password: str | None = None, sender: str = "", use_tls: bool = False,
+                 start_tls: bool = False, timeout: float = 30):
+        self.hostname = hostname
+        self.port = port
+        self.size = size
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self._idle: asyncio.Queue | None = None
+
+    def _pool(self) -> asyncio.Queue:
+        if self._idle is None:
+            # Slots start empty (None) and are connected on first checkout.
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                self._idle.put_nowait(None)
+        return self._idle
+
+    async def _connect(self):
+        import aiosmtplib
+
+        client = aiosmtplib.SMTP(hostname=self.hostname, port=self.port, use_tls=self.use_tls,
+                                 start_tls=self.start_tls, timeout=self.timeout)
+        await client.connect()
+        if self.username:
+            await client.login(self.username, self.password)
+        transport_connections.inc(transport=self.name)
+        return client
+
+    async def _send(self, message: OutgoingEmail):
+        import aiosmtplib
+
+        mime = message.to_mime(self.sender)
+        pool = self._pool()
+        client = await pool.get()
+        try:
+            for attempt in (1, 2):
+                if client is None or not client.is_connected:
+                    client = await self._connect()
+                try:
+                    await client.send_message(mime)
+                    return
+                except aiosmtplib.SMTPServerDisconnected:
+                    client = None
+                    if attempt == 2:
+                        raise
+                    logger.info(f"SMTP connection to {self.hostname}:{self.port} dropped, reconnecting")
+        except Exception:
+            if client is not None and client.is_connected:
+                # Reset the half-finished transaction so the connection can be reused.
+                try:
+                    await client.rset()
+                except aiosmtplib.SMTPException:
+                    client.close()
+                    client = None
+            raise
+        finally:
+            pool.put_nowait(client)
+
+    async def close(self):
+        if self._idle is None:
+            return
+        while not self._idle.empty():
+            client = self._idle.get_nowait()
+            if client is not None and client.is_connected:
+                try:
+                    await client.quit()
+                except Exception:
+                    client.close()
+        self._idle = None
+
+
+class MemoryTransport(EmailTransport):
+    """
+    Keeps the last `capacity` messages in `sent` instead of delivering them; for tests and benchmarks.
+    """
+
+    name = "memory"
+
+    def __init__(self, capacity: int = 1000):
+        self.sent = deque(maxlen=capacity)
+
+    async def _send(self, message: OutgoingEmail):
+        self.sent.append(message)
+
+
+class FileTransport(EmailTransport):
+    """
+    Writes each message as an .eml file into `directory` instead of delivering it.
+    """
+
+    name = "file"
+
+    def __init__(self, directory: str, sender: str = ""):
+        self.directory = directory
+        self.sender = sender
+        os.makedirs(directory, exist_ok=True)
+
+    def _write(self, data: bytes):
+        path = os.path.join(self.directory, f"{time.time_ns()}-{uuid.uuid4().hex[:8]}.eml")
+        with open(path, "wb") as handle:
+            handle.write(data)
+
+    async def _send(self, message: OutgoingEmail):
+        await asyncio.to_thread(self._write, message.to_mime(self.sender).as_bytes())
+
+
+def create_transport() -> EmailTransport:
+    kind = settings.EMAIL_TRANSPORT
+    if kind == "fastapi_mail":
+        return FastMailTransport()
+    if kind == "smtp_pool":
+        return SMTPPoolTransport(settings.SMTP_SERVER, settings.SMTP_PORT, settings.SMTP_POOL_SIZE,
+                                 username=settings.MAIL_USERNAME if settings.MAIL_USE_CREDENTIALS else None,
+                                 password=settings.MAIL_PASSWORD, sender=settings.MAIL_FROM,
+                                 use_tls=settings.MAIL_SSL_TLS, start_tls=settings.MAIL_STARTTLS)
+    if kind == "memory":
+        return MemoryTransport()
+    if kind == "file":
+        return FileTransport(settings.EMAIL_FILE_SINK_DIR, sender=settings.MAIL_FROM)
+    raise ValueError(f"Unknown EMAIL_TRANSPORT '{kind}', expected fastapi_mail, smtp_pool, memory or file")
+
+
+@lru_cache(maxsize=None)
+def get_transport() -> EmailTransport:
+    """
+    Build the configured transport on first use; fastapi_mail and aiosmtplib are slow to import and only needed
+    to send.
+    """
+    return create_transport()
@@ -0,0 +1,100 @@
+import asyncio
+
+from database_sharing_service.app.metrics import registry
+from email_service.app.coalescing import QUEUED, RATE_LIMITED, SEND_NOW, EmailCoalescer
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _outcomes(template: str) -> dict:
+    counter = registry.counter("email_messages_total", "", ("template", "outcome"))
+    return {outcome: counter.value(template=template, outcome=outcome)
+            for outcome in ("sent", "superseded", "rate_limited")}
+
+
+def test_messages_within_the_window_collapse_into_the_latest():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def scenario():
+        coalescer = EmailCoalescer(window=0.05, max_per_hour=0)
+        outcomes = [coalescer.submit("User@example.com", "test_collapse", f"token-{i}", send) for i in range(5)]
+        # A different template is coalesced separately
+        outcomes.append(coalescer.submit("user@example.com", "test_collapse_other", "other", send))
+        await asyncio.sleep(0.2)
+        return outcomes
+
+    outcomes = asyncio.run(scenario())
+
+    assert outcomes == [SEND_NOW, QUEUED, QUEUED, QUEUED, QUEUED, SEND_NOW]
+    # The caller sends the first message itself; the coalescer only sends the latest queued one.
+    assert sent == ["token-4"]
+    assert _outcomes("test_collapse") == {"sent": 2, "superseded": 3, "rate_limited": 0}
+
+
+def test_window_closes_quietly_without_pending_messages():
+    async def scenario():
+        coalescer = EmailCoalescer(window=0.01, max_per_hour=0)
+        first = coalescer.submit("a@example.com", "test_quiet", "m1", None)
+        await asyncio.sleep(0.05)
+        return first, coalescer.submit("a@example.com", "test_quiet", "m2", None)
+
+    assert asyncio.run(scenario()) == (SEND_NOW, SEND_NOW)
+
+
+def test_recipient_rate_cap():
+    clock = _Clock()
+    coalescer = EmailCoalescer(window=0, max_per_hour=2, clock=clock)
+
+    outcomes = [coalescer.submit("a@example.com", "test_cap", "m", None) for _ in range(3)]
+
+    assert outcomes == [SEND_NOW, SEND_NOW, RATE_LIMITED]
+    assert coalescer.submit("b@example.com", "test_cap", "m", None) == SEND_NOW
+    assert coalescer.retry_after("A@example.com") == 3600
+    clock.now += 3600
+    assert coalescer.submit("a@example.com", "test_cap", "m", None) == SEND_NOW
+    assert _outcomes("test_cap")["rate_limited"] == 1
+
+
+def test_queued_message_is_dropped_when_the_cap_is_reached():
+    sent = []
+
+    async def scenario():
+        coalescer = EmailCoalescer(window=0.02, max_per_hour=1)
+        coalescer.submit("a@example.com", "test_cap_queued", "first", sent.append)
+        coalescer.submit("a@example.com", "test_cap_queued", "second", sent.append)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+
+    assert sent == []
+    assert _outcomes("test_cap_queued") == {"sent": 1, "superseded": 0, "rate_limited": 1}
+
+
+def test_flush_sends_queued_messages_and_waits_for_them():
+    sent = []
+
+    async def send(message):
+        await asyncio.sleep(0.01)
+        sent.append(message)
+
+    async def scenario():
+        coalescer = EmailCoalescer(window=60, max_per_hour=0)
+        coalescer.submit("a@example.com", "test_flush", "first", send)
+        coalescer.submit("a@example.com", "test_flush", "second", send)
+        coalescer.submit("b@example.com", "test_flush", "only", send)
+        await coalescer.flush()
+        return coalescer
+
+    coalescer = asyncio.run(scenario())
+
+    assert sent == ["second"]
+    assert coalescer._windows == {} and coalescer._sending == set()
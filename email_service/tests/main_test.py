@@ -44,3 +44,17 @@ def test_send_password_reset_email_success():
         assert response.status_code == 200
         assert response.json()["message"] == "Password reset email sent"
         mock_send.assert_called_once()
+
+
+def test_send_password_reset_email_rate_limited(mocker):
+    from email_service.app.coalescing import EmailCoalescer
+
+    mocker.patch("email_service.app.main.coalescer", EmailCoalescer(window=0, max_per_hour=1))
+    with patch.object(FastMail, "send_message", return_value=None) as mock_send:
+        params = {"email": "limited@example.com", "token": "fake_token"}
+        assert client.post("/send-password-reset-email", params=params).status_code == 200
+        response = client.post("/send-password-reset-email", params=params)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    mock_send.assert_called_once()
@@ -0,0 +1,94 @@
+import asyncio
+import email
+
+import pytest
+
+from benchmarks.fake_smtp import FakeSMTPServer
+from database_sharing_service.app.config import settings
+from database_sharing_service.app.metrics import registry
+from email_service.app.transports import (EmailTransport, FileTransport, MemoryTransport, OutgoingEmail,
+                                          SMTPPoolTransport, create_transport)
+
+
+def _message(i=0):
+    return OutgoingEmail(recipients=[f"user{i}@example.com"], subject="Hello", body="<b>hi</b>")
+
+
+@pytest.fixture
+def smtp_server():
+    server = FakeSMTPServer().start()
+    yield server
+    server.stop()
+
+
+def test_pool_reuses_connections(smtp_server):
+    transport = SMTPPoolTransport(smtp_server.host, smtp_server.port, size=2, username="user", password="secret",
+                                  sender="noreply@example.com")
+
+    async def run():
+        await asyncio.gather(*(transport.send(_message(i)) for i in range(20)))
+        await transport.close()
+
+    asyncio.run(run())
+
+    assert smtp_server.messages_received == 20
+    assert smtp_server.sessions_opened == 2
+
+
+def test_pool_reconnects_after_the_server_drops_the_connection(smtp_server):
+    transport = SMTPPoolTransport(smtp_server.host, smtp_server.port, size=1, sender="noreply@example.com")
+
+    async def run():
+        await transport.send(_message())
+        client = transport._idle.get_nowait()
+        client.close()
+        transport._idle.put_nowait(client)
+        await transport.send(_message())
+        await transport.close()
+
+    asyncio.run(run())
+
+    assert smtp_server.messages_received == 2
+    assert smtp_server.sessions_opened == 2
+
+
+def test_memory_transport_records_messages_and_metrics():
+    transport = MemoryTransport(capacity=2)
+    messages = registry.counter("email_transport_messages_total", "", ("transport", "outcome"))
+    before = messages.value(transport="memory", outcome="sent")
+
+    async def run():
+        for i in range(3):
+            await transport.send(_message(i))
+
+    asyncio.run(run())
+
+    assert [message.recipients for message in transport.sent] == [["user1@example.com"], ["user2@example.com"]]
+    assert messages.value(transport="memory", outcome="sent") == before + 3
+
+
+def test_file_transport_writes_eml_files(tmp_path):
+    transport = FileTransport(str(tmp_path / "sink"), sender="noreply@example.com")
+
+    asyncio.run(transport.send(_message()))
+
+    [path] = (tmp_path / "sink").iterdir()
+    parsed = email.message_from_bytes(path.read_bytes())
+    assert parsed["To"] == "user0@example.com"
+    assert parsed["Subject"] == "Hello"
+    assert parsed.get_content_type() == "text/html"
+
+
+def test_unknown_transport_is_rejected(mocker):
+    mocker.patch.object(settings, "EMAIL_TRANSPORT", "pigeon")
+
+    with pytest.raises(ValueError):
+        create_transport()
+
+
+def test_transports_must_implement_send():
+    class Incomplete(EmailTransport):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
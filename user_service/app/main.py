@@ -1,18 +1,29 @@
+from datetime import datetime
+
 from fastapi import FastAPI, HTTPException, Depends, Query, responses, Path, Form
 from fastapi.responses import RedirectResponse
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from database_sharing_service.app import schemas
+from database_sharing_service.app.activation_events import install_activation_events
 from database_sharing_service.app.config import settings
-from database_sharing_service.app.crud import *
-from database_sharing_service.app.database import get_db
+from database_sharing_service.app.crud import (create_user, decrypt_user_id, generate_active_token,
+                                               generate_reset_token, get_user_by_email, get_user_profile,
+                                               hash_password)
+from database_sharing_service.app.database import get_read_db, get_write_db, install_read_routing
+from database_sharing_service.app.health import (check_database, check_downstream, check_hash_queue,
+                                                 install_health)
+from database_sharing_service.app.idempotency import install_idempotency
 from database_sharing_service.app.logging_config import get_logger
-from user_service.clients.auth_client import AuthClient
+from database_sharing_service.app.maintenance import install_maintenance
+from database_sharing_service.app.metrics import install_metrics
+from database_sharing_service.app.profiling import install_profiling
+from database_sharing_service.app.responses import FastJSONResponse, user_response
+from database_sharing_service.app.stats import install_user_stats
+from database_sharing_service.app.tracing import install_tracing
+from user_service.clients.auth_client import create_auth_client
 from user_service.clients.email_client import EmailClient
 
-import uvicorn
-
 user_app = FastAPI(
     title="User Service API",
     description="API for managing users, including registration, login, and profile management.",
@@ -27,18 +38,34 @@ user_app = FastAPI(
             "description": "Operations related to user authentication, such as token generation and validation.",
         },
     ],
+    default_response_class=FastJSONResponse,
 )
 
 logger = get_logger("User_Service")
-
-auth_client = AuthClient()
+install_profiling(user_app)
+install_tracing(user_app, "user_service")
+install_metrics(user_app)
+install_read_routing(user_app)
+install_idempotency(user_app, ("/signup", "/password-reset-request", "/resend-activation"))
+readiness_checks = {
+    "database": check_database,
+    "hash_queue": check_hash_queue,
+    "email_service": check_downstream(settings.EMAIL_SERVICE_URL),
+}
+if settings.AUTH_MODE == "remote":
+    readiness_checks["auth_service"] = check_downstream(settings.AUTH_SERVICE_URL)
+user_admission = install_health(user_app, readiness_checks)
+stale_account_cleanup = install_maintenance(user_app)
+user_stats = install_user_stats(user_app)
+activation_events = install_activation_events(user_app, user_admission)
+
+auth_client = create_auth_client()
 email_client = EmailClient()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 @user_app.post("/signup", response_model=schemas.Message, tags=["Users"], summary="User Registration",
                description="Register a new user with an email, user name, password, source, and user_identity.")
-def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
+def signup(user: schemas.UserCreate, db: Session = Depends(get_write_db)):
     """
     Register a new user in the system.
 
@@ -68,7 +95,7 @@ def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
 @user_app.post("/login", response_model=schemas.TokenResponse, tags=["Authentication"], summary="User Login",
                description="Authenticate a user and return a JWT token.")
-def login(user: schemas.TokenRequest, db: Session = Depends(get_db)):
+def login(user: schemas.TokenRequest):
     """
     Authenticate a user and return a JWT token.
 
@@ -88,7 +115,7 @@ def login(user: schemas.TokenRequest, db: Session = Depends(get_db)):
 
 @user_app.post("/password-reset-request", tags=["Users"], summary="Request Password Reset",
                description="Request a password reset link by providing the user's email address.")
-def request_password_reset(email: str = Form(...), db: Session = Depends(get_db)):
+def request_password_reset(email: str = Form(...), db: Session = Depends(get_read_db)):
     """
     Request a password reset link.
 
@@ -113,9 +140,40 @@ def request_password_reset(email: str = Form(...), db: Session = Depends(get_db)
     return {"status": "200", "message": "Email sent"}
 
 
+@user_app.post("/resend-activation", response_model=schemas.Message, tags=["Users"],
+               summary="Resend Activation Email",
+               description="Send a new activation link to a user who has not activated their account yet.")
+def resend_activation(email: str = Form(...), db: Session = Depends(get_write_db)):
+    """
+    Send a new activation link.
+
+    - **email**: The email address of the account to activate.
+
+    Sends a fresh activation link if the account exists and is not active yet.
+    """
+    logger.info(f"Resending activation email to: {email}")
+    user = get_user_by_email(db, email)
+    if user is None:
+        logger.warning(f"Resend activation failed: Email does not exist: {email}")
+        raise HTTPException(status_code=404, detail="User not found")
+    if user.is_active:
+        raise HTTPException(status_code=400, detail="User already activated")
+
+    token = generate_active_token(user.email, 10)
+    if not token:
+        raise HTTPException(status_code=500, detail="Failed to generate activation token")
+    email_client.send_activation_email(user.email, token)
+    # Restarts the retention period of the stale account cleanup
+    user.activation_sent_at = datetime.utcnow()
+    db.commit()
+    logger.info(f"Activation email resent to: {user.email}")
+
+    return {"status": "200", "message": "Activation email sent"}
+
+
 @user_app.get("/activate", tags=["Users"], summary="Activate User Account",
               description="Activate a user account using the token sent to the user's email.")
-def activate_user(token: str = Query(...), db: Session = Depends(get_db)):
+def activate_user(token: str = Query(...), db: Session = Depends(get_write_db)):
     logger.info(f"User account activating for token: {token}")
     """
     Activate a user account using the token sent to the user's email.
@@ -140,8 +198,10 @@ def activate_user(token: str = Query(...), db: Session = Depends(get_db)):
         if user.is_active:
             return responses.RedirectResponse(url="/already-verified")  # Redirect if user is already verified
 
+        user_id = user.public_id
         user.is_active = True
         db.commit()
+        activation_events.publish(user_id)  # Wakes clients waiting on /activation-status
 
         logger.info(f"User account activated: {email}")
         return RedirectResponse(url="/activation-success")  # Redirect to a success page
@@ -153,7 +213,8 @@ def activate_user(token: str = Query(...), db: Session = Depends(get_db)):
 
 @user_app.post("/password-reset", tags=["Users"], summary="Reset User Password",
                description="Reset the user's password using a valid reset token.")
-def reset_password(token: str = Form(...), new_password: str = Form(...), db: Session = Depends(get_db)):
+def reset_password(token: str = Form(...), new_password: str = Form(...),
+                   db: Session = Depends(get_write_db)):
     """
     Reset the user's password using the reset token.
 
@@ -174,7 +235,7 @@ def reset_password(token: str = Form(...), new_password: str = Form(...), db: Se
         if user is None:
             raise HTTPException(status_code=404, detail="User not found")
 
-        user.hashed_password = pwd_context.hash(new_password)
+        user.hashed_password = hash_password(new_password)
         db.commit()
 
         logger.info(f"User password reset: {email}")
@@ -188,7 +249,7 @@ def reset_password(token: str = Form(...), new_password: str = Form(...), db: Se
 @user_app.get("/user/{user_id}", response_model=schemas.User, tags=["Users"], summary="Get User by ID",
               description="Retrieve user details by their unique user ID.")
 async def query_user_by_id(user_id: str = Path(..., description="The ID of the user to retrieve"),
-                           db: Session = Depends(get_db)):
+                           db: Session = Depends(get_read_db)):
     """
     Retrieve user details by their unique user ID.
 
@@ -198,12 +259,14 @@ async def query_user_by_id(user_id: str = Path(..., description="The ID of the u
     """
     user_id = decrypt_user_id(user_id)
     logger.info(f"Fetching user with ID: {user_id}")
-    user = get_user_by_id(db, user_id=user_id)
+    user = get_user_profile(db, user_id=user_id)
     if user is None:
         logger.warning(f"User with ID {user_id} not found.")
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return user_response(user)
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("main:user_app", host="0.0.0.0", port=8001, reload=True)
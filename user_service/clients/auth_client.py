@@ -2,6 +2,8 @@ import requests
 
 from database_sharing_service.app.config import settings
 from database_sharing_service.app.logging_config import get_logger
+from database_sharing_service.app.profiling import stage
+from user_service.clients.resilience import CircuitOpenError, ResilientHTTP
 
 logger = get_logger("AuthClient")
 
@@ -9,6 +11,7 @@ logger = get_logger("AuthClient")
 class AuthClient:
     def __init__(self, base_url: str = settings.AUTH_SERVICE_URL):
         self.base_url = base_url
+        self.http = ResilientHTTP("auth_service", base_url)
 
     def authenticate_user(self, email: str, password: str):
         """
@@ -19,14 +22,19 @@ class AuthClient:
 
         Returns the generated JWT token generate by endpoint of the Auth Service.
         """
-        url = f"{self.base_url}/generate-token"
         try:
-            response = requests.post(url, json={"email": email, "password": password})
+            # Minting a token has no side effects on the Auth Service, so it is safe to retry.
+            with stage("http", "auth.generate-token"):
+                response = self.http.request("POST", "/generate-token", idempotent=True,
+                                             json={"email": email, "password": password})
             response.raise_for_status()
             return response.json().get("access_token")
         except requests.exceptions.HTTPError as http_err:
             logger.error(f"HTTP error occurred: {http_err} - Status Code: {http_err.response.status_code}")
             return None
+        except CircuitOpenError as err:
+            logger.error(f"Auth Service unavailable: {err}")
+            return None
         except requests.exceptions.RequestException as err:
             logger.error(f"Request error occurred: {err}")
             return None
@@ -39,14 +47,37 @@ class AuthClient:
 
         Returns the extracted user information if the token is valid by validate-token endpoint.
         """
-        url = f"{self.base_url}/validate-token"
         try:
-            response = requests.post(url, params={"token": token})
+            with stage("http", "auth.validate-token"):
+                response = self.http.request("POST", "/validate-token", idempotent=True,
+                                             hedge_delay=settings.AUTH_VALIDATE_HEDGE_DELAY_SECONDS,
+                                             params={"token": token})
             response.raise_for_status()
             return response.json()
         except requests.exceptions.HTTPError as http_err:
             logger.error(f"HTTP error occurred: {http_err} - Status Code: {http_err.response.status_code}")
             return None
+        except CircuitOpenError as err:
+            logger.error(f"Auth Service unavailable: {err}")
+            return None
         except requests.exceptions.RequestException as err:
             logger.error(f"Request error occurred: {err}")
             return None
+
+
+def create_auth_client():
+    """
+    Build the auth client selected by AUTH_MODE: "remote" calls the Auth Service over HTTP, "rpc" over its
+    internal msgpack RPC socket (AUTH_RPC_ADDRESS), "local" runs the same authentication logic in-process.
+    """
+    if settings.AUTH_MODE == "local":
+        from user_service.clients.local_auth_client import LocalAuthClient
+
+        return LocalAuthClient()
+    if settings.AUTH_MODE == "rpc":
+        from user_service.clients.rpc_auth_client import RPCAuthClient
+
+        return RPCAuthClient()
+    if settings.AUTH_MODE == "remote":
+        return AuthClient()
+    raise ValueError(f"Unknown AUTH_MODE: {settings.AUTH_MODE}")
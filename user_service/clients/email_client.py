@@ -1,21 +1,37 @@
+import uuid
+
 import requests
 from database_sharing_service.app.config import settings
+from database_sharing_service.app.idempotency import IDEMPOTENCY_HEADER
+from database_sharing_service.app.logging_config import get_logger
+from database_sharing_service.app.profiling import stage
+from user_service.clients.resilience import CircuitOpenError, ResilientHTTP
+
+logger = get_logger("EmailClient")
 
 
 class EmailClient:
     def __init__(self, base_url: str = settings.EMAIL_SERVICE_URL):
         self.base_url = base_url
+        self.http = ResilientHTTP("email_service", base_url)
 
-    def send_activation_email(self, email: str, token: str):
-        response = requests.post(
-            f"{self.base_url}/send-activation-email",
-            params={"email": email, "token": token}
-        )
+    def _send(self, path: str, email: str, token: str) -> bool:
+        # The Email Service stores the response under the key, so retries never send the email twice.
+        headers = {IDEMPOTENCY_HEADER: uuid.uuid4().hex}
+        try:
+            with stage("http", f"email.{path.lstrip('/')}"):
+                response = self.http.request("POST", path, idempotent=True, params={"email": email, "token": token},
+                                             headers=headers)
+        except CircuitOpenError as err:
+            logger.error(f"Email Service unavailable: {err}")
+            return False
+        except requests.exceptions.RequestException as err:
+            logger.error(f"Request error occurred: {err}")
+            return False
         return response.status_code == 200
 
+    def send_activation_email(self, email: str, token: str):
+        return self._send("/send-activation-email", email, token)
+
     def send_password_reset_email(self, email: str, token: str):
-        response = requests.post(
-            f"{self.base_url}/send-password-reset-email",
-            params={"email": email, "token": token}
-        )
-        return response.status_code == 200
+        return self._send("/send-password-reset-email", email, token)
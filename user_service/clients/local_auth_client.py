@@ -0,0 +1,46 @@
+from database_sharing_service.app.authentication import AuthenticationError, auth_engine
+from database_sharing_service.app.crud import get_user_credentials
+from database_sharing_service.app.database import get_session_router
+from database_sharing_service.app.logging_config import get_logger
+
+logger = get_logger("LocalAuthClient")
+
+
+class LocalAuthClient:
+    """
+    Drop-in replacement for AuthClient that runs the Auth Service logic in-process, saving the HTTP
+    round trip when the User Service shares the Auth Service's database and SECRET_KEY.
+    """
+
+    def authenticate_user(self, email: str, password: str):
+        """
+        Generate a JWT token for the given credentials.
+
+        - **email**: The email address for which to generate the token.
+        - **password**: The password for the given email.
+
+        Returns the generated JWT token, or None if the credentials are invalid.
+        """
+        db = get_session_router().read_session()
+        try:
+            user = get_user_credentials(db, email)
+            return auth_engine.issue_token(user, email, password).access_token
+        except AuthenticationError as e:
+            logger.error(f"Authentication failed - Status Code: {e.status_code}")
+            return None
+        finally:
+            db.close()
+
+    def validate_token(self, token: str):
+        """
+        Validate a JWT token.
+
+        - **token**: The JWT token to validate.
+
+        Returns the extracted user information, or None if the token is invalid.
+        """
+        try:
+            return auth_engine.validate_token(token).model_dump()
+        except AuthenticationError as e:
+            logger.error(f"Token validation failed - Status Code: {e.status_code}")
+            return None
@@ -0,0 +1,215 @@
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+import requests
+
+from database_sharing_service.app.config import settings
+from database_sharing_service.app.database import primary_pin_headers
+from database_sharing_service.app.logging_config import get_logger
+from database_sharing_service.app.metrics import registry
+from database_sharing_service.app.tracing import inject_headers
+
+logger = get_logger("Resilience")
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+circuit_state = registry.gauge("client_circuit_state",
+                               "Circuit breaker state per downstream (0 closed, 1 half-open, 2 open).",
+                               ("downstream",))
+circuit_transitions = registry.counter("client_circuit_transitions_total",
+                                       "Circuit breaker state changes per downstream.", ("downstream", "state"))
+client_requests = registry.counter("client_requests_total",
+                                   "Outbound requests per downstream and outcome.", ("downstream", "outcome"))
+
+# Shared by every client for hedged requests; sized for two in-flight attempts per worker thread.
+_hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a downstream whose circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Per-downstream circuit breaker.
+
+    Opens after `failure_threshold` consecutive failures, rejects calls for `recovery_timeout`
+    seconds, then lets a single probe call through (half-open): its success closes the
+    circuit, its failure re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        circuit_state.set(_STATE_VALUES[CLOSED], downstream=name)
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logger.warning(f"Circuit for {self.name} is now {state}")
+            self.state = state
+            circuit_state.set(_STATE_VALUES[state], downstream=self.name)
+            circuit_transitions.inc(downstream=self.name, state=state)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    @contextmanager
+    def guard(self):
+        """
+        Wrap a call admitted by `allow`: any exception escaping it is recorded as a failure, so a half-open
+        probe that raises unexpectedly re-opens the circuit instead of leaving it half-open for good.
+        """
+        try:
+            yield
+        except BaseException:
+            self.record_failure()
+            raise
+
+
+class RetryPolicy:
+    """
+    Bounded retries with "full jitter" exponential backoff.
+    """
+
+    def __init__(self, max_attempts: int, backoff: float, backoff_max: float):
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+
+
+def _shed(response: requests.Response) -> bool:
+    return response.status_code == 503 and "Retry-After" in response.headers
+
+
+class ResilientHTTP:
+    """
+    HTTP caller for one downstream service: pooled connections, connect/read timeouts, a circuit
+    breaker, bounded retries for idempotent calls and optional hedging.
+
+    4xx responses are returned as-is and count as successes for the breaker; connection errors,
+    timeouts and 5xx responses count as failures and are retried when the call is idempotent.
+    A 503 with `Retry-After` is the downstream shedding load: it is returned as-is, neither retried
+    (which would multiply the load on an overloaded service) nor counted against the breaker.
+    """
+
+    def __init__(self, downstream: str, base_url: str, retry: RetryPolicy | None = None,
+                 breaker: CircuitBreaker | None = None, timeout: tuple[float, float] | None = None):
+        self.downstream = downstream
+        self.base_url = base_url
+        self.retry = retry or RetryPolicy(settings.CLIENT_RETRY_ATTEMPTS, settings.CLIENT_RETRY_BACKOFF_SECONDS,
+                                          settings.CLIENT_RETRY_BACKOFF_MAX_SECONDS)
+        self.breaker = breaker or CircuitBreaker(downstream, settings.CIRCUIT_FAILURE_THRESHOLD,
+                                                 settings.CIRCUIT_RECOVERY_SECONDS)
+        self.timeout = timeout or (settings.CLIENT_CONNECT_TIMEOUT_SECONDS, settings.CLIENT_READ_TIMEOUT_SECONDS)
+        self.session = requests.Session()
+
+    def _attempt(self, method: str, path: str, **kwargs) -> requests.Response:
+        if not self.breaker.allow():
+            client_requests.inc(downstream=self.downstream, outcome="rejected")
+            raise CircuitOpenError(f"Circuit for {self.downstream} is open")
+        with self.breaker.guard():
+            headers = inject_headers(dict(kwargs.pop("headers", None) or {}))
+            headers.update(primary_pin_headers())
+            try:
+                response = self.session.request(method, f"{self.base_url}{path}", headers=headers,
+                                                timeout=self.timeout, **kwargs)
+            except requests.exceptions.RequestException:
+                client_requests.inc(downstream=self.downstream, outcome="error")
+                raise
+        if _shed(response):
+            self.breaker.record_success()
+            client_requests.inc(downstream=self.downstream, outcome="shed")
+        elif response.status_code >= 500:
+            self.breaker.record_failure()
+            client_requests.inc(downstream=self.downstream, outcome="server_error")
+        else:
+            self.breaker.record_success()
+            client_requests.inc(downstream=self.downstream, outcome="ok")
+        return response
+
+    def _hedged_attempt(self, method: str, path: str, hedge_delay: float, **kwargs) -> requests.Response:
+        """
+        Send the request and, if it has not answered within `hedge_delay` seconds, a second copy;
+        return whichever completes first without raising.
+        """
+        futures = [_hedge_executor.submit(contextvars.copy_context().run, self._attempt, method, path, **kwargs)]
+        done, _ = wait(futures, timeout=hedge_delay)
+        if not done:
+            client_requests.inc(downstream=self.downstream, outcome="hedged")
+            futures.append(_hedge_executor.submit(contextvars.copy_context().run, self._attempt, method, path,
+                                                  **kwargs))
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def request(self, method: str, path: str, idempotent: bool = False, hedge_delay: float = 0.0,
+                **kwargs) -> requests.Response:
+        """
+        Call `path` on the downstream.
+
+        - **idempotent**: Retry on connection errors, timeouts and 5xx responses other than load shedding.
+        - **hedge_delay**: When positive, hedge each attempt after this many seconds (idempotent calls only).
+
+        Raises CircuitOpenError when the breaker is open, or the last requests exception.
+        """
+        attempts = self.retry.max_attempts if idempotent else 1
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                if idempotent and hedge_delay > 0:
+                    response = self._hedged_attempt(method, path, hedge_delay, **kwargs)
+                else:
+                    response = self._attempt(method, path, **kwargs)
+            except CircuitOpenError:
+                raise
+            except requests.exceptions.RequestException:
+                if last:
+                    raise
+            else:
+                if response.status_code < 500 or _shed(response) or last:
+                    return response
+            time.sleep(self.retry.delay(attempt))
@@ -0,0 +1,145 @@
+import itertools
+import queue
+import socket
+
+from database_sharing_service.app.config import settings
+from database_sharing_service.app.database import primary_pin_token, reads_pinned_to_primary
+from database_sharing_service.app.logging_config import get_logger
+from database_sharing_service.app.profiling import stage
+from database_sharing_service.app.rpc import (RPCConnectionClosed, RPCProtocolError, encode_frame, parse_address,
+                                              recv_frame)
+from user_service.clients.resilience import CircuitBreaker, CircuitOpenError, client_requests
+
+logger = get_logger("RPCAuthClient")
+
+# Failures showing the server closed a pooled connection before taking the request, so resending is safe.
+_STALE_CONNECTION_ERRORS = (RPCConnectionClosed, ConnectionResetError, BrokenPipeError)
+
+
+class RPCAuthClient:
+    """
+    Drop-in replacement for AuthClient that calls the Auth Service's internal RPC server (`AUTH_RPC_LISTEN`)
+    over persistent TCP or Unix socket connections with msgpack frames instead of JSON over HTTP.
+
+    Keeps up to `pool_size` idle connections; each call checks one out, so concurrent callers use separate
+    connections. A call on a pooled connection that the server has closed meanwhile (EOF or reset before any
+    response byte) is retried once on a fresh connection; timeouts and other failures are not retried.
+    """
+
+    downstream = "auth_service_rpc"
+
+    def __init__(self, address: str = settings.AUTH_RPC_ADDRESS, pool_size: int = settings.AUTH_RPC_POOL_SIZE,
+                 timeout: float = settings.CLIENT_READ_TIMEOUT_SECONDS):
+        self.address = address
+        self.family, self.target = parse_address(address)
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(self.downstream, settings.CIRCUIT_FAILURE_THRESHOLD,
+                                      settings.CIRCUIT_RECOVERY_SECONDS)
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._ids = itertools.count()
+
+    def _connect(self) -> socket.socket:
+        if self.family == "unix":
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(settings.CLIENT_CONNECT_TIMEOUT_SECONDS)
+        try:
+            sock.connect(self.target)
+        except OSError:
+            sock.close()
+            raise
+        sock.settimeout(self.timeout)
+        return sock
+
+    def _release(self, sock: socket.socket):
+        try:
+            self._idle.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def call(self, method: str, params: dict) -> dict:
+        """
+        Send one request and return the response map (`status` plus `result` or `detail`).
+
+        Raises CircuitOpenError while the breaker is open, OSError or RPCProtocolError when the server
+        can't be reached or answers garbage.
+        """
+        if not self.breaker.allow():
+            client_requests.inc(downstream=self.downstream, outcome="rejected")
+            raise CircuitOpenError(f"Circuit for {self.downstream} is open")
+        with self.breaker.guard():
+            frame = encode_frame({"id": next(self._ids), "method": method, "params": params,
+                                  "primary": primary_pin_token() if reads_pinned_to_primary() else None})
+            try:
+                sock, pooled = self._idle.get_nowait(), True
+            except queue.Empty:
+                sock, pooled = None, False
+            while True:
+                try:
+                    if sock is None:
+                        sock = self._connect()
+                    sock.sendall(frame)
+                    response = recv_frame(sock)
+                    break
+                except (OSError, RPCProtocolError) as err:
+                    if sock is not None:
+                        sock.close()
+                    if pooled and isinstance(err, _STALE_CONNECTION_ERRORS):
+                        sock, pooled = None, False
+                        continue
+                    client_requests.inc(downstream=self.downstream, outcome="error")
+                    raise
+        self._release(sock)
+        if response.get("status", 500) >= 500:
+            self.breaker.record_failure()
+            client_requests.inc(downstream=self.downstream, outcome="server_error")
+        else:
+            self.breaker.record_success()
+            client_requests.inc(downstream=self.downstream, outcome="success")
+        return response
+
+    def _result(self, method: str, params: dict):
+        try:
+            with stage("http", f"auth.rpc.{method}"):
+                response = self.call(method, params)
+        except CircuitOpenError as err:
+            logger.error(f"Auth Service unavailable: {err}")
+            return None
+        except (OSError, RPCProtocolError) as err:
+            logger.error(f"RPC error occurred: {err}")
+            return None
+        if response["status"] != 200:
+            logger.error(f"RPC {method} failed: {response.get('detail')} - Status Code: {response['status']}")
+            return None
+        return response["result"]
+
+    def authenticate_user(self, email: str, password: str):
+        """
+        Generate a JWT token for the given credentials.
+
+        - **email**: The email address for which to generate the token.
+        - **password**: The password for the given email.
+
+        Returns the generated JWT token, or None if the credentials are invalid.
+        """
+        result = self._result("generate_token", {"email": email, "password": password})
+        return None if result is None else result.get("access_token")
+
+    def validate_token(self, token: str):
+        """
+        Validate a JWT token.
+
+        - **token**: The JWT token to validate.
+
+        Returns the extracted user information, or None if the token is invalid.
+        """
+        return self._result("validate_token", {"token": token})
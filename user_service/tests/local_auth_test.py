@@ -0,0 +1,72 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from auth_service.app import auth_app
+from database_sharing_service.app import models
+from database_sharing_service.app.config import settings
+from database_sharing_service.app.crud import decrypt_user_id, generate_auth_token, hash_password
+from database_sharing_service.app.database import Base, SessionRouter
+from user_service.clients.auth_client import AuthClient, create_auth_client
+from user_service.clients.local_auth_client import LocalAuthClient
+from user_service.clients.rpc_auth_client import RPCAuthClient
+
+mock_password = "123456"
+
+
+@pytest.fixture
+def local_client(mocker, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'auth.db'}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        db.add(models.User(email="test@example.com", user_name="string", hashed_password=hash_password(mock_password)))
+        db.commit()
+    mocker.patch("user_service.clients.local_auth_client.get_session_router",
+                 return_value=SessionRouter(session_factory))
+    return LocalAuthClient()
+
+
+def test_local_authenticate_user_success(local_client):
+    token = local_client.authenticate_user("test@example.com", mock_password)
+
+    assert local_client.validate_token(token)["email"] == "test@example.com"
+
+
+def test_local_authenticate_user_invalid_credentials(local_client):
+    assert local_client.authenticate_user("test@example.com", "wrong") is None
+    assert local_client.authenticate_user("missing@example.com", mock_password) is None
+
+
+def test_local_validate_token_matches_auth_service():
+    token = generate_auth_token(7, "test@example.com", settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    remote = TestClient(auth_app).post("/validate-token", params={"token": token}).json()
+    local = LocalAuthClient().validate_token(token)
+
+    # The encrypted id differs per call (Fernet uses a random IV); compare the decrypted payloads.
+    assert local["email"] == remote["email"]
+    assert decrypt_user_id(local["id"]) == decrypt_user_id(remote["id"]) == "7"
+    assert local.keys() == remote.keys()
+
+
+def test_local_validate_token_rejects_invalid_and_expired_tokens():
+    client = LocalAuthClient()
+
+    assert client.validate_token("invalidtoken") is None
+    assert client.validate_token(generate_auth_token(1, "test@example.com", -1)) is None
+
+
+def test_create_auth_client_follows_auth_mode(mocker):
+    mocker.patch.object(settings, "AUTH_MODE", "local")
+    assert isinstance(create_auth_client(), LocalAuthClient)
+
+    mocker.patch.object(settings, "AUTH_MODE", "remote")
+    assert isinstance(create_auth_client(), AuthClient)
+
+    mocker.patch.object(settings, "AUTH_MODE", "rpc")
+    assert isinstance(create_auth_client(), RPCAuthClient)
+
+    mocker.patch.object(settings, "AUTH_MODE", "bogus")
+    with pytest.raises(ValueError):
+        create_auth_client()
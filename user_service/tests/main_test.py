@@ -241,7 +241,7 @@ def test_password_reset_invalid_jwt():
 
 
 def test_get_user_by_id_success(mocker):
-    mock_get_user_by_id = mocker.patch("user_service.app.main.get_user_by_id", return_value=mock_user)
+    mock_get_user_by_id = mocker.patch("user_service.app.main.get_user_profile", return_value=mock_user)
     mock_encrypt_user_id = encrypt_user_id(mock_user.id)
     response = client.get(f"/user/{mock_encrypt_user_id}")
 
@@ -258,7 +258,7 @@ def test_get_user_by_id_success(mocker):
 
 
 def test_get_user_by_id_user_not_found(mocker):
-    mock_get_user_by_id = mocker.patch("user_service.app.main.get_user_by_id", return_value=None)
+    mock_get_user_by_id = mocker.patch("user_service.app.main.get_user_profile", return_value=None)
     mock_encrypt_user_id = encrypt_user_id(mock_user.id)
     response = client.get(f"/user/{mock_encrypt_user_id}")
 
@@ -266,3 +266,44 @@ def test_get_user_by_id_user_not_found(mocker):
     assert response.json() == {"detail": "User not found"}
 
     mock_get_user_by_id.assert_called_once_with(mocker.ANY, user_id=decrypt_user_id(mock_encrypt_user_id))
+
+
+def test_resend_activation_success(mocker):
+    inactive_user = models.User(id=2, email="inactive@example.com", user_name="string", hashed_password="x",
+                                is_active=False)
+    mock_get_user_by_email = mocker.patch("user_service.app.main.get_user_by_email", return_value=inactive_user)
+    mock_generate_active_token = mocker.patch("user_service.app.main.generate_active_token", return_value=active_token)
+    mock_send_activation_email = mocker.patch("user_service.app.main.email_client.send_activation_email")
+    mock_commit = mocker.patch("sqlalchemy.orm.Session.commit")
+
+    response = client.post("/resend-activation", data={"email": inactive_user.email})
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "200", "message": "Activation email sent"}
+    mock_get_user_by_email.assert_called_once_with(mocker.ANY, inactive_user.email)
+    mock_generate_active_token.assert_called_once_with(inactive_user.email, 10)
+    mock_send_activation_email.assert_called_once_with(inactive_user.email, active_token)
+    mock_commit.assert_called_once()
+    assert inactive_user.activation_sent_at is not None
+
+
+def test_resend_activation_already_active(mocker):
+    active_user = models.User(id=3, email="active@example.com", user_name="string", hashed_password="x",
+                              is_active=True)
+    mocker.patch("user_service.app.main.get_user_by_email", return_value=active_user)
+    mock_send_activation_email = mocker.patch("user_service.app.main.email_client.send_activation_email")
+
+    response = client.post("/resend-activation", data={"email": active_user.email})
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "User already activated"}
+    mock_send_activation_email.assert_not_called()
+
+
+def test_resend_activation_user_not_found(mocker):
+    mocker.patch("user_service.app.main.get_user_by_email", return_value=None)
+
+    response = client.post("/resend-activation", data={"email": "missing@example.com"})
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "User not found"}
@@ -0,0 +1,197 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from database_sharing_service.app.metrics import registry
+from user_service.clients.auth_client import AuthClient
+from user_service.clients.email_client import EmailClient
+from user_service.clients.resilience import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError,
+                                             ResilientHTTP, RetryPolicy)
+
+
+def _response(status_code, json=None):
+    response = MagicMock(status_code=status_code)
+    response.json.return_value = json or {}
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=response)
+    return response
+
+
+def _http(name, attempts=3, threshold=5, recovery=60.0):
+    return ResilientHTTP(name, "http://downstream", retry=RetryPolicy(attempts, 0.0, 0.0),
+                         breaker=CircuitBreaker(name, threshold, recovery), timeout=(0.1, 0.1))
+
+
+def test_breaker_opens_after_threshold_and_probes_when_half_open():
+    breaker = CircuitBreaker("test-breaker", failure_threshold=2, recovery_timeout=0.05)
+
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+
+    time.sleep(0.06)
+    assert breaker.allow() is True
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time while half-open.
+    assert breaker.allow() is False
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow() is True
+
+
+def test_failed_half_open_probe_reopens_the_circuit():
+    breaker = CircuitBreaker("test-reopen", failure_threshold=1, recovery_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow() is True
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+
+
+def test_half_open_probe_raising_unexpectedly_reopens_the_circuit(mocker):
+    http = _http("test-probe-raises", attempts=1, threshold=1, recovery=0.01)
+    http.breaker.record_failure()
+    time.sleep(0.02)
+    mocker.patch.object(http.session, "request", side_effect=ValueError("unexpected"))
+
+    with pytest.raises(ValueError):
+        http.request("GET", "/readyz")
+
+    assert http.breaker.state == OPEN
+    time.sleep(0.02)
+    # A new probe is let through once the recovery timeout passed again
+    assert http.breaker.allow() is True
+
+
+def test_idempotent_calls_retry_server_errors(mocker):
+    http = _http("test-retry")
+    request = mocker.patch.object(http.session, "request", side_effect=[_response(503), _response(200)])
+
+    assert http.request("POST", "/validate-token", idempotent=True).status_code == 200
+    assert request.call_count == 2
+    assert request.call_args.kwargs["timeout"] == (0.1, 0.1)
+
+
+def test_idempotent_calls_retry_connection_errors_then_give_up(mocker):
+    http = _http("test-give-up", attempts=2)
+    request = mocker.patch.object(http.session, "request", side_effect=requests.exceptions.ConnectionError())
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        http.request("POST", "/generate-token", idempotent=True)
+    assert request.call_count == 2
+
+
+def test_non_idempotent_calls_are_not_retried(mocker):
+    http = _http("test-no-retry")
+    request = mocker.patch.object(http.session, "request", return_value=_response(503))
+
+    assert http.request("POST", "/send-activation-email").status_code == 503
+    assert request.call_count == 1
+
+
+def test_shed_load_is_neither_retried_nor_held_against_the_breaker(mocker):
+    http = _http("test-shed", threshold=1)
+    shed = _response(503)
+    shed.headers = requests.structures.CaseInsensitiveDict({"Retry-After": "1"})
+    request = mocker.patch.object(http.session, "request", return_value=shed)
+
+    for _ in range(3):
+        assert http.request("POST", "/generate-token", idempotent=True).status_code == 503
+    assert request.call_count == 3
+    assert http.breaker.state == CLOSED
+
+
+def test_client_errors_do_not_trip_the_breaker(mocker):
+    http = _http("test-4xx", threshold=1)
+    mocker.patch.object(http.session, "request", return_value=_response(400))
+
+    for _ in range(3):
+        assert http.request("POST", "/generate-token", idempotent=True).status_code == 400
+    assert http.breaker.state == CLOSED
+
+
+def test_open_circuit_rejects_without_calling(mocker):
+    http = _http("test-open", attempts=1, threshold=1)
+    request = mocker.patch.object(http.session, "request", side_effect=requests.exceptions.Timeout())
+
+    with pytest.raises(requests.exceptions.Timeout):
+        http.request("POST", "/generate-token", idempotent=True)
+    with pytest.raises(CircuitOpenError):
+        http.request("POST", "/generate-token", idempotent=True)
+    assert request.call_count == 1
+    assert registry.gauge("client_circuit_state", "", ("downstream",)).value(downstream="test-open") == 2
+
+
+def test_hedged_request_returns_the_fastest_attempt(mocker):
+    http = _http("test-hedge")
+    calls = []
+    lock = threading.Lock()
+
+    def slow_then_fast(*args, **kwargs):
+        with lock:
+            calls.append(time.monotonic())
+            first = len(calls) == 1
+        time.sleep(1.0 if first else 0.0)
+        return _response(200, {"attempt": 1 if first else 2})
+
+    mocker.patch.object(http.session, "request", side_effect=slow_then_fast)
+
+    started = time.monotonic()
+    response = http.request("POST", "/validate-token", idempotent=True, hedge_delay=0.05)
+
+    assert response.json() == {"attempt": 2}
+    assert time.monotonic() - started < 0.5
+    assert len(calls) == 2
+
+
+def test_auth_client_returns_none_when_circuit_is_open(mocker):
+    client = AuthClient("http://downstream")
+    mocker.patch.object(client.http, "request", side_effect=CircuitOpenError("open"))
+
+    assert client.authenticate_user("test@example.com", "password") is None
+    assert client.validate_token("token") is None
+
+
+def test_auth_client_returns_token(mocker):
+    client = AuthClient("http://downstream")
+    mocker.patch.object(client.http.session, "request", return_value=_response(200, {"access_token": "abc"}))
+
+    assert client.authenticate_user("test@example.com", "password") == "abc"
+
+
+def test_email_client_swallows_transport_errors(mocker):
+    client = EmailClient("http://downstream")
+    mocker.patch.object(client.http.session, "request", side_effect=requests.exceptions.ConnectionError())
+
+    assert client.send_activation_email("test@example.com", "token") is False
+
+
+def test_metrics_render_prometheus_text():
+    counter = registry.counter("test_render_total", "A test counter.", ("kind",))
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+
+    text = registry.render()
+
+    assert "# TYPE test_render_total counter" in text
+    assert 'test_render_total{kind="a"} 3.0' in text
+
+
+def test_email_client_retries_with_the_same_idempotency_key(mocker):
+    client = EmailClient("http://downstream")
+    client.http.retry = RetryPolicy(3, 0.0, 0.0)
+    request = mocker.patch.object(client.http.session, "request", side_effect=[_response(503), _response(200)])
+
+    assert client.send_activation_email("test@example.com", "token") is True
+    keys = {call.kwargs["headers"]["Idempotency-Key"] for call in request.call_args_list}
+    assert request.call_count == 2
+    assert len(keys) == 1
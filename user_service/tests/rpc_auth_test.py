@@ -0,0 +1,147 @@
+import asyncio
+import json
+import socket
+import threading
+
+import pytest
+
+from auth_service.app.rpc import AuthRPCServer
+from database_sharing_service.app.crud import generate_auth_token
+from database_sharing_service.app.rpc import encode_frame, recv_frame
+from user_service.clients.resilience import OPEN
+from user_service.clients.rpc_auth_client import RPCAuthClient
+
+
+@pytest.fixture
+def rpc_address(tmp_path):
+    pytest.importorskip("msgpack")
+    address = f"unix:{tmp_path / 'auth.sock'}"
+    server = AuthRPCServer(address)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait(timeout=5)
+    yield address
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+
+
+def test_validate_token_over_a_reused_connection(rpc_address):
+    client = RPCAuthClient(rpc_address, pool_size=1)
+    token = generate_auth_token(7, "test@example.com", 5)
+
+    for _ in range(3):
+        assert client.validate_token(token)["email"] == "test@example.com"
+    assert client.validate_token("invalid") is None
+    assert client._idle.qsize() == 1
+    client.close()
+
+
+def test_unreachable_server_returns_none(tmp_path):
+    pytest.importorskip("msgpack")
+    client = RPCAuthClient(f"unix:{tmp_path / 'missing.sock'}")
+
+    assert client.validate_token("token") is None
+    assert client.authenticate_user("test@example.com", "password") is None
+
+
+class _JSONCodec:
+    """
+    Stands in for msgpack, so the connection pool is tested where msgpack is not installed.
+    """
+
+    @staticmethod
+    def packb(message, use_bin_type=True):
+        return json.dumps(message).encode()
+
+    @staticmethod
+    def unpackb(payload, raw=False):
+        return json.loads(payload)
+
+
+@pytest.fixture
+def echo_server(tmp_path, mocker):
+    """
+    A Unix socket server answering every request with status 200; yields its address and the requests seen.
+    """
+    mocker.patch("database_sharing_service.app.rpc._msgpack", return_value=_JSONCodec)
+    path = str(tmp_path / "echo.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+    requests = []
+
+    def serve():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            with conn:
+                request = recv_frame(conn)
+                requests.append(request)
+                conn.sendall(encode_frame({"id": request["id"], "status": 200, "result": {"email": "a@b.c"}}))
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield f"unix:{path}", requests
+    listener.close()
+
+
+def _stale_connection() -> socket.socket:
+    ours, theirs = socket.socketpair()
+    theirs.close()
+    return ours
+
+
+def test_stale_pooled_connection_is_retried_once_on_a_fresh_one(echo_server):
+    address, requests = echo_server
+    client = RPCAuthClient(address, pool_size=2)
+    client._idle.put(_stale_connection())
+    client._idle.put(_stale_connection())
+
+    assert client.validate_token("token") == {"email": "a@b.c"}
+    assert len(requests) == 1
+    # The retry went to a fresh connection, not to the other stale one
+    assert client._idle.qsize() == 2
+    client.close()
+
+
+def test_timeout_on_a_pooled_connection_is_not_retried(echo_server):
+    address, requests = echo_server
+    client = RPCAuthClient(address, pool_size=2, timeout=0.05)
+    silent = []
+    for _ in range(2):
+        ours, theirs = socket.socketpair()
+        ours.settimeout(0.05)
+        silent.append(theirs)
+        client._idle.put(ours)
+
+    assert client.validate_token("token") is None
+    assert requests == []
+    assert client._idle.qsize() == 1
+    assert client.breaker.failures == 1
+    client.close()
+
+
+def test_probe_failing_to_encode_reopens_the_circuit(tmp_path, mocker):
+    mocker.patch("user_service.clients.rpc_auth_client.encode_frame", side_effect=TypeError("unpackable"))
+    client = RPCAuthClient(f"unix:{tmp_path / 'auth.sock'}")
+    client.breaker.recovery_timeout = 0
+    client.breaker.record_failure()
+    client.breaker._transition(OPEN)
+
+    with pytest.raises(TypeError):
+        client.call("validate_token", {"token": "token"})
+
+    assert client.breaker.state == OPEN
+    assert client.breaker.allow() is True